@@ -3,10 +3,11 @@ import numpy as np
 import scipy.optimize as opt
 from dask import delayed, compute
 import dask.multiprocessing
-from ogusa import tax, household, firm, utils, fiscal
+from ogusa import tax, household, firm, utils, fiscal, kernels
 from ogusa import aggregates as aggr
 from ogusa.constants import SHOW_RUNTIME
 import os
+import time
 import warnings
 
 
@@ -23,6 +24,11 @@ Set flag for enforcement of solution check
 '''
 ENFORCE_SOLUTION_CHECKS = True
 
+'''
+Set number of past iterations used by the Anderson outer loop solver
+'''
+ANDERSON_DEPTH = 5
+
 '''
 ------------------------------------------------------------------------
     Define Functions
@@ -97,7 +103,127 @@ def euler_equation_solver(guesses, *args):
     return errors
 
 
-def inner_loop(outer_loop_vars, p, client):
+def euler_equation_solver_compiled(guesses, *args):
+    '''
+    Finds the euler errors for certain b and n, one ability type at a
+    time, with the compiled kernels.  Returns the same errors as
+    euler_equation_solver.
+
+    Args:
+        guesses (Numpy array): initial guesses for b and n, lenth 2S
+        args (tuple): tuple of arguments (r, w, bq, TR, factor, j, p,
+            hh)
+        w (scalar): real wage rate
+        bq (Numpy array): bequest amounts by age, length S
+        tr (scalar): government transfer amount by age, length S
+        factor (scalar): scaling factor converting model units to dollars
+        p (OG-USA Specifications object): model parameters
+        hh (HHParams): compiled kernel parameters returned by
+            kernels.get_hh_params
+
+    Returns:
+        errros (Numpy array): errors from FOCs, length 2S
+
+    '''
+    (r, w, bq, tr, factor, j, p, hh) = args
+
+    guesses = np.asarray(guesses, dtype=float)
+    theta = tax.replacement_rate_vals(guesses[p.S:], w, factor, j, p)
+    errors = kernels.euler_errors_SS(
+        guesses[:p.S], guesses[p.S:], r, w, np.asarray(bq, dtype=float),
+        np.asarray(tr, dtype=float), factor, theta[0], j, hh)
+
+    return errors
+
+
+def euler_equation_jacobian(guesses, *args):
+    '''
+    Finds the Jacobian of the euler errors returned by
+    euler_equation_solver with respect to b and n, one ability type at a
+    time.
+
+    Args:
+        guesses (Numpy array): initial guesses for b and n, lenth 2S
+        args (tuple): tuple of arguments (r, w, bq, TR, factor, j, p),
+            followed by the compiled kernel parameters when used with
+            euler_equation_solver_compiled
+        w (scalar): real wage rate
+        bq (Numpy array): bequest amounts by age, length S
+        tr (scalar): government transfer amount by age, length S
+        factor (scalar): scaling factor converting model units to dollars
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        jac (Numpy array): Jacobian of errors from FOCs, size = 2Sx2S
+
+    '''
+    (r, w, bq, tr, factor, j, p) = args[:7]
+
+    b_guess = np.array(guesses[:p.S])
+    n_guess = np.array(guesses[p.S:])
+    b_s = np.array([0] + list(b_guess[:-1]))
+    b_splus1 = b_guess
+
+    theta = tax.replacement_rate_vals(n_guess, w, factor, j, p)
+    theta_n = tax.replacement_rate_vals_deriv(n_guess, w, factor, j, p)
+
+    derivs1 = household.FOC_savings_deriv(
+        r, w, b_s, b_splus1, n_guess, bq, factor, tr, theta, p.e[:, j],
+        p.rho, p.tau_c[-1, :, j], p.etr_params[-1, :, :],
+        p.mtry_params[-1, :, :], None, j, p, 'SS')
+    derivs2 = household.FOC_labor_deriv(
+        r, w, b_s, b_splus1, n_guess, bq, factor, tr, theta, p.chi_n,
+        p.e[:, j], p.tau_c[-1, :, j], p.etr_params[-1, :, :],
+        p.mtrx_params[-1, :, :], None, j, p, 'SS')
+
+    jac = np.zeros((2 * p.S, 2 * p.S))
+    for rows, (d_b, d_b_splus1, d_n, d_theta) in zip(
+            (slice(None, p.S), slice(p.S, None)), (derivs1, derivs2)):
+        # b_s is b_splus1 of the previous age
+        jac[rows, :p.S] = d_b_splus1
+        jac[rows, :p.S - 1] += d_b[:, 1:]
+        jac[rows, p.S:] = d_n + np.outer(d_theta, theta_n)
+
+    # Errors set to constants for constraint violations
+    taxes = tax.total_taxes(r, w, b_s, n_guess, bq, factor, tr, theta,
+                            None, j, False, 'SS', p.e[:, j],
+                            p.etr_params[-1, :, :], p)
+    cons = household.get_cons(r, w, b_s, b_splus1, n_guess, bq, taxes,
+                              p.e[:, j], p.tau_c[-1, :, j], p)
+    mask1 = ((b_guess <= 0) | np.isnan(b_guess) | (cons < 0))
+    mask2 = ((n_guess < 0) | (n_guess > p.ltilde) | np.isnan(n_guess))
+    jac[np.hstack((mask1, mask2)), :] = 0.0
+
+    return jac
+
+
+def get_shared_params(p, client):
+    '''
+    Sends the model parameters, and the compiled kernel parameters if
+    hh_backend is 'numba', to the dask workers once, so that the
+    household problems solved in each iteration of the SS use the
+    workers' copies instead of serializing them again.
+
+    Args:
+        p (OG-USA Specifications object): model parameters
+        client (Dask client object): client
+
+    Returns:
+        shared_params (tuple): futures of the model parameters and the
+            compiled kernel parameters, or the parameters themselves if
+            client is None
+
+    '''
+    if p.hh_backend == 'numba':
+        hh_params = kernels.get_hh_params(p)
+    else:
+        hh_params = None
+    shared_params = utils.scatter_to_workers(client, p, hh_params)
+
+    return shared_params
+
+
+def inner_loop(outer_loop_vars, p, client, shared_params=None):
     '''
     This function solves for the inner loop of the SS.  That is, given
     the guesses of the outer loop variables (r, w, TR, factor) this
@@ -116,6 +242,8 @@ def inner_loop(outer_loop_vars, p, client):
         w (scalar): real wage rate
         p (OG-USA Specifications object): model parameters
         client (Dask client object): client
+        shared_params (tuple): parameters sent to the dask workers by
+            get_shared_params, sent from p if None
 
     Returns:
         (tuple): results from household solution:
@@ -158,15 +286,28 @@ def inner_loop(outer_loop_vars, p, client):
     bq = household.get_bq(BQ, None, p, 'SS')
     tr = household.get_tr(TR, None, p, 'SS')
 
+    if p.hh_jacobian == 'analytic':
+        fprime = euler_equation_jacobian
+    else:
+        fprime = None
+    if shared_params is None:
+        shared_params = get_shared_params(p, client)
+    p_shared, hh_shared = shared_params
+    if p.hh_backend == 'numba':
+        solver = euler_equation_solver_compiled
+        hh_args = (hh_shared,)
+    else:
+        solver = euler_equation_solver
+        hh_args = ()
     lazy_values = []
     for j in range(p.J):
         guesses = np.append(bssmat[:, j], nssmat[:, j])
-        euler_params = (r_hh, w, bq[:, j], tr[:, j], factor, j, p)
-        lazy_values.append(delayed(opt.fsolve)(euler_equation_solver,
-                                               guesses * .9,
-                                               args=euler_params,
-                                               xtol=MINIMIZER_TOL,
-                                               full_output=True))
+        euler_params = (r_hh, w, bq[:, j], tr[:, j], factor, j,
+                        p_shared) + hh_args
+        lazy_values.append(delayed(opt.fsolve)(
+            solver, guesses * .9, args=euler_params,
+            fprime=fprime, xtol=MINIMIZER_TOL,
+            full_output=True))
     if client:
         futures = client.compute(lazy_values, num_workers=p.num_workers)
         results = client.gather(futures)
@@ -228,11 +369,72 @@ def inner_loop(outer_loop_vars, p, client):
         new_w, new_TR, Y, new_factor, new_BQ, average_income_model
 
 
+def anderson_update(outer_vars, new_outer_vars, x_hist, g_hist, nu, p):
+    '''
+    Updates the guesses of the outer loop variables of SS_solver by
+    Anderson mixing.  The history is restarted when the distance grows
+    and the damped update is used when the mixed update is not a valid
+    guess.  Unless p.baseline_spending or p.budget_balance, Y is set to
+    TR / alpha_T as in SS_fsolve, so that both find the same steady
+    state.
+
+    Args:
+        outer_vars (tuple): guesses of (r, BQ, TR, factor, Y)
+        new_outer_vars (tuple): values of (r, BQ, TR, factor, Y)
+            implied by the guesses
+        x_hist (list): past stacked guesses, updated in place
+        g_hist (list): past stacked implied values, updated in place
+        nu (scalar): weight on the implied values in the update
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        (r, BQ, TR, factor, Y) (tuple): updated guesses, where TR is
+            unchanged if p.baseline_spending
+
+    '''
+    r, BQ, TR, factor, Y = outer_vars
+    new_r, new_BQ, new_TR, new_factor, new_Y = new_outer_vars
+    if p.baseline_spending:
+        x = np.hstack((r, BQ, Y, factor))
+        g = np.hstack((new_r, new_BQ, new_Y, new_factor))
+    else:
+        x = np.hstack((r, BQ, TR, factor))
+        g = np.hstack((new_r, new_BQ, new_TR, new_factor))
+    scale = np.maximum(np.abs(x), 1e-8)
+    if (len(x_hist) > 0 and np.abs((g - x) / scale).max() >
+            np.abs((g_hist[-1] - x_hist[-1]) / scale).max()):
+        del x_hist[:], g_hist[:]
+    x_hist.append(x)
+    g_hist.append(g)
+    del x_hist[:-(ANDERSON_DEPTH + 1)], g_hist[:-(ANDERSON_DEPTH + 1)]
+    x_new = utils.anderson_mix(x_hist, g_hist, nu, scale)
+    if (not np.isfinite(x_new).all() or x_new[0] + p.delta <= 0 or
+            (x_new[1:-2] <= 0).any() or x_new[-1] <= 0):
+        del x_hist[:-1], g_hist[:-1]
+        x_new = utils.convex_combo(g, x, nu)
+    r = x_new[0]
+    if np.ndim(BQ) == 0:
+        BQ = x_new[1]
+    else:
+        BQ = x_new[1:-2]
+    if p.baseline_spending:
+        Y = x_new[-2]
+    else:
+        TR = x_new[-2]
+        if not p.budget_balance:
+            Y = TR / p.alpha_T[-1]
+    factor = x_new[-1]
+
+    return r, BQ, TR, factor, Y
+
+
 def SS_solver(bmat, nmat, r, BQ, TR, factor, Y, p, client,
-              fsolve_flag=False):
+              fsolve_flag=False, shared_params=None):
     '''
     Solves for the steady state distribution of capital, labor, as well
-    as w, r, TR and the scaling factor, using functional iteration.
+    as w, r, TR and the scaling factor, using functional iteration.  The
+    guesses are updated by damping or, if p.SS_solver is 'anderson', by
+    Anderson mixing.
 
     Args:
         bmat (Numpy array): initial guess at savings, size = SxJ
@@ -244,6 +446,10 @@ def SS_solver(bmat, nmat, r, BQ, TR, factor, Y, p, client,
         Y (scalar): real GDP
         p (OG-USA Specifications object): model parameters
         client (Dask client object): client
+        fsolve_flag (bool): whether the outer loop variables were
+            already solved for by SS_fsolve
+        shared_params (tuple): parameters sent to the dask workers by
+            get_shared_params, sent from p if None
 
     Returns:
         output (dictionary): dictionary with steady state solution
@@ -257,6 +463,11 @@ def SS_solver(bmat, nmat, r, BQ, TR, factor, Y, p, client,
     nu_ss = p.nu
     if fsolve_flag:  # case where already solved via SS_fsolve
         maxiter_ss = 1
+    if shared_params is None:
+        shared_params = get_shared_params(p, client)
+    x_hist = []
+    g_hist = []
+    tick = time.time()
     while (dist > p.mindist_SS) and (iteration < maxiter_ss):
         # Solve for the steady state levels of b and n, given w, r,
         # Y and factor
@@ -268,13 +479,22 @@ def SS_solver(bmat, nmat, r, BQ, TR, factor, Y, p, client,
         (euler_errors, new_bmat, new_nmat, new_r, new_r_gov, new_r_hh,
          new_w, new_TR, new_Y, new_factor, new_BQ,
          average_income_model) =\
-            inner_loop(outer_loop_vars, p, client)
+            inner_loop(outer_loop_vars, p, client, shared_params)
 
-        r = utils.convex_combo(new_r, r, nu_ss)
-        factor = utils.convex_combo(new_factor, factor, nu_ss)
-        BQ = utils.convex_combo(new_BQ, BQ, nu_ss)
+        if p.SS_solver == 'anderson' and not fsolve_flag:
+            r, BQ, TR, factor, Y = anderson_update(
+                (r, BQ, TR, factor, Y),
+                (new_r, new_BQ, new_TR, new_factor, new_Y), x_hist,
+                g_hist, nu_ss, p)
+        else:
+            r = utils.convex_combo(new_r, r, nu_ss)
+            factor = utils.convex_combo(new_factor, factor, nu_ss)
+            BQ = utils.convex_combo(new_BQ, BQ, nu_ss)
+            if p.baseline_spending:
+                Y = utils.convex_combo(new_Y, Y, nu_ss)
+            else:
+                TR = utils.convex_combo(new_TR, TR, nu_ss)
         if p.baseline_spending:
-            Y = utils.convex_combo(new_Y, Y, nu_ss)
             if Y != 0:
                 dist = np.array([utils.pct_diff_func(new_r, r)] +
                                 list(utils.pct_diff_func(new_BQ, BQ)) +
@@ -290,7 +510,6 @@ def SS_solver(bmat, nmat, r, BQ, TR, factor, Y, p, client,
                                 [utils.pct_diff_func(new_factor,
                                                      factor)]).max()
         else:
-            TR = utils.convex_combo(new_TR, TR, nu_ss)
             dist = np.array([utils.pct_diff_func(new_r, r)] +
                             list(utils.pct_diff_func(new_BQ, BQ)) +
                             [utils.pct_diff_func(new_TR, TR)] +
@@ -304,6 +523,13 @@ def SS_solver(bmat, nmat, r, BQ, TR, factor, Y, p, client,
                 print('New value of nu:', nu_ss)
         iteration += 1
         print('Iteration: %02d' % iteration, ' Distance: ', dist)
+    if not fsolve_flag:
+        if p.SS_solver == 'anderson':
+            method = 'anderson'
+        else:
+            method = 'damped'
+        print('SS outer loop (' + method + '):', iteration,
+              'iterations,', round(time.time() - tick, 2), 'seconds')
 
     # Generate the SS values of variables, including euler errors
     bssmat_s = np.append(np.zeros((1, p.J)), bmat[:-1, :], axis=0)
@@ -437,7 +663,8 @@ def SS_fsolve(guesses, *args):
         guesses (list): initial guesses outer loop variables (r, BQ,
             TR, factor)
         args (tuple): tuple of arguments (bssmat, nssmat, TR_ss,
-            factor_ss, p, client)
+            factor_ss, p, client), optionally followed by the parameters
+            sent to the dask workers by get_shared_params
         bssmat (Numpy array): initial guess at savings, size = SxJ
         nssmat (Numpy array): initial guess at labor supply, size = SxJ
         TR_ss (scalar): lump sum transfer amount
@@ -450,7 +677,8 @@ def SS_fsolve(guesses, *args):
             implied outer loop variables
 
     '''
-    (bssmat, nssmat, TR_ss, factor_ss, p, client) = args
+    (bssmat, nssmat, TR_ss, factor_ss, p, client) = args[:6]
+    shared_params = args[6] if len(args) > 6 else None
 
     # Rename the inputs
     r = guesses[0]
@@ -485,7 +713,7 @@ def SS_fsolve(guesses, *args):
     # factor
     (euler_errors, bssmat, nssmat, new_r, new_r_gov, new_r_hh, new_w,
      new_TR, new_Y, new_factor, new_BQ, average_income_model) =\
-        inner_loop(outer_loop_vars, p, client)
+        inner_loop(outer_loop_vars, p, client, shared_params)
 
     # Create list of errors in general equilibrium variables
     error1 = new_r - r
@@ -525,6 +753,8 @@ def run_SS(p, client=None):
             results
 
     '''
+    # Send the parameters to the dask workers once for all iterations
+    shared_params = get_shared_params(p, client)
     # For initial guesses of w, r, TR, and factor, we use values that
     # are close to some steady state values.
     if p.baseline:
@@ -543,27 +773,39 @@ def run_SS(p, client=None):
         TRguess = 0.057
         factorguess = 139355.154
         BQguess = aggr.get_BQ(rguess, b_guess, None, p, 'SS', False)
-        ss_params_baseline = (b_guess, n_guess, None, None, p, client)
+        ss_params_baseline = (b_guess, n_guess, None, None, p, client,
+                              shared_params)
         if p.use_zeta:
             BQguess = 0.12231465279007188
             guesses = [rguess] + list([BQguess]) + [TRguess, factorguess]
         else:
             guesses = [rguess] + list(BQguess) + [TRguess, factorguess]
-        [solutions_fsolve, infodict, ier, message] =\
-            opt.fsolve(SS_fsolve, guesses, args=ss_params_baseline,
-                       xtol=p.mindist_SS, full_output=True)
-        if ENFORCE_SOLUTION_CHECKS and not ier == 1:
-            raise RuntimeError('Steady state equilibrium not found')
-        rss = solutions_fsolve[0]
-        BQss = solutions_fsolve[1:-2]
-        TR_ss = solutions_fsolve[-2]
-        factor_ss = solutions_fsolve[-1]
-        Yss = TR_ss/p.alpha_T[-1]  # may not be right - if budget_balance
-        # = True, but that's ok - will be fixed in SS_solver
-        fsolve_flag = True
-        # Return SS values of variables
-        output = SS_solver(b_guess, n_guess, rss, BQss, TR_ss,
-                           factor_ss, Yss, p, client, fsolve_flag)
+        if p.SS_solver == 'anderson':
+            # Solve for the outer loop variables by Anderson-accelerated
+            # functional iteration
+            output = SS_solver(b_guess, n_guess, rguess, BQguess,
+                               TRguess, factorguess,
+                               TRguess / p.alpha_T[-1], p, client, False,
+                               shared_params)
+        else:
+            [solutions_fsolve, infodict, ier, message] =\
+                opt.fsolve(SS_fsolve, guesses, args=ss_params_baseline,
+                           xtol=p.mindist_SS, full_output=True)
+            print('SS outer loop (fsolve):', infodict['nfev'],
+                  'function evaluations')
+            if ENFORCE_SOLUTION_CHECKS and not ier == 1:
+                raise RuntimeError('Steady state equilibrium not found')
+            rss = solutions_fsolve[0]
+            BQss = solutions_fsolve[1:-2]
+            TR_ss = solutions_fsolve[-2]
+            factor_ss = solutions_fsolve[-1]
+            Yss = TR_ss/p.alpha_T[-1]  # may not be right - if budget_balance
+            # = True, but that's ok - will be fixed in SS_solver
+            fsolve_flag = True
+            # Return SS values of variables
+            output = SS_solver(b_guess, n_guess, rss, BQss, TR_ss,
+                               factor_ss, Yss, p, client, fsolve_flag,
+                               shared_params)
     else:
         # Use the baseline solution to get starting values for the reform
         baseline_ss_dir = os.path.join(
@@ -590,44 +832,57 @@ def run_SS(p, client=None):
                 rguess = 0.09
             TRguess = 0.12
             factorguess = 70000
+            factor = factorguess
+            Yguess = TRguess / p.alpha_T[-1]
             BQguess = aggr.get_BQ(rguess, b_guess, None, p, 'SS', False)
-        if p.baseline_spending:
-            TR_ss = TRguess
-            ss_params_reform = (b_guess, n_guess, TR_ss, factor, p, client)
-            if p.use_zeta:
-                guesses = [rguess] + list([BQguess]) + [Yguess]
-            else:
-                guesses = [rguess] + list(BQguess) + [Yguess]
-            [solutions_fsolve, infodict, ier, message] =\
-                opt.fsolve(SS_fsolve, guesses,
-                           args=ss_params_reform, xtol=p.mindist_SS,
-                           full_output=True)
-            rss = solutions_fsolve[0]
-            BQss = solutions_fsolve[1:-1]
-            Yss = solutions_fsolve[-1]
+        if p.SS_solver == 'anderson':
+            # Solve for the outer loop variables by Anderson-accelerated
+            # functional iteration, starting from the baseline solution
+            output = SS_solver(b_guess, n_guess, rguess, BQguess,
+                               TRguess, factor, Yguess, p, client,
+                               False, shared_params)
         else:
-            ss_params_reform = (b_guess, n_guess, None, factor, p, client)
-            if p.use_zeta:
-                guesses = [rguess] + list([BQguess]) + [TRguess]
+            if p.baseline_spending:
+                TR_ss = TRguess
+                ss_params_reform = (b_guess, n_guess, TR_ss, factor, p, client,
+                                    shared_params)
+                if p.use_zeta:
+                    guesses = [rguess] + list([BQguess]) + [Yguess]
+                else:
+                    guesses = [rguess] + list(BQguess) + [Yguess]
+                [solutions_fsolve, infodict, ier, message] =\
+                    opt.fsolve(SS_fsolve, guesses,
+                               args=ss_params_reform, xtol=p.mindist_SS,
+                               full_output=True)
+                rss = solutions_fsolve[0]
+                BQss = solutions_fsolve[1:-1]
+                Yss = solutions_fsolve[-1]
             else:
-                guesses = [rguess] + list(BQguess) + [TRguess]
-            [solutions_fsolve, infodict, ier, message] =\
-                opt.fsolve(SS_fsolve, guesses,
-                           args=ss_params_reform, xtol=p.mindist_SS,
-                           full_output=True)
-            rss = solutions_fsolve[0]
-            BQss = solutions_fsolve[1:-1]
-            TR_ss = solutions_fsolve[-1]
-            Yss = TR_ss/p.alpha_T[-1]  # may not be right - if
-            # budget_balance = True, but that's ok - will be fixed in
-            # SS_solver
-        if ENFORCE_SOLUTION_CHECKS and not ier == 1:
-            raise RuntimeError('Steady state equilibrium not found')
-        # Return SS values of variables
-        fsolve_flag = True
-        # Return SS values of variables
-        output = SS_solver(b_guess, n_guess, rss, BQss, TR_ss, factor,
-                           Yss, p, client, fsolve_flag)
+                ss_params_reform = (b_guess, n_guess, None, factor, p, client,
+                                    shared_params)
+                if p.use_zeta:
+                    guesses = [rguess] + list([BQguess]) + [TRguess]
+                else:
+                    guesses = [rguess] + list(BQguess) + [TRguess]
+                [solutions_fsolve, infodict, ier, message] =\
+                    opt.fsolve(SS_fsolve, guesses,
+                               args=ss_params_reform, xtol=p.mindist_SS,
+                               full_output=True)
+                rss = solutions_fsolve[0]
+                BQss = solutions_fsolve[1:-1]
+                TR_ss = solutions_fsolve[-1]
+                Yss = TR_ss/p.alpha_T[-1]  # may not be right - if
+                # budget_balance = True, but that's ok - will be fixed in
+                # SS_solver
+            print('SS outer loop (fsolve):', infodict['nfev'],
+                  'function evaluations')
+            if ENFORCE_SOLUTION_CHECKS and not ier == 1:
+                raise RuntimeError('Steady state equilibrium not found')
+            # Return SS values of variables
+            fsolve_flag = True
+            # Return SS values of variables
+            output = SS_solver(b_guess, n_guess, rss, BQss, TR_ss, factor,
+                               Yss, p, client, fsolve_flag, shared_params)
         if output['Gss'] < 0.:
             warnings.warn('Warning: The combination of the tax policy '
                           + 'you specified and your target debt-to-GDP '
@@ -1,13 +1,15 @@
 # imports
 import numpy as np
 import pickle
+import time
 import scipy.optimize as opt
 from dask import delayed, compute
 import dask.multiprocessing
-from ogusa import tax, utils, household, firm, fiscal
+from ogusa import tax, utils, household, firm, fiscal, kernels
 from ogusa import aggregates as aggr
 from ogusa.constants import SHOW_RUNTIME
 import os
+import hashlib
 import warnings
 
 
@@ -24,6 +26,27 @@ Set flag for enforcement of solution check
 '''
 ENFORCE_SOLUTION_CHECKS = True
 
+'''
+Set number of past iterations used by the Anderson outer loop solver
+'''
+ANDERSON_DEPTH = 5
+
+'''
+Set names of the variables saved in checkpoints of the TPI outer loop
+'''
+CHECKPOINT_VARS = ['r', 'w', 'BQ', 'TR', 'Y', 'K', 'L', 'D', 'guesses_b',
+                   'guesses_n', 'TPIiter', 'TPIdist', 'TPIdist_vec']
+
+'''
+Set names of the parameters that control how the TPI solution is
+computed but not which solution is computed, so they are left out of the
+fingerprint of the model in TPI checkpoints
+'''
+CHECKPOINT_UNCHECKED_PARAMS = ['nu', 'maxiter', 'mindist_SS', 'mindist_TPI',
+                               'hh_solver_TPI', 'hh_jacobian', 'hh_backend',
+                               'SS_solver', 'TPI_checkpoint_interval',
+                               'reform_TPI_guess']
+
 
 def get_initial_SS_values(p):
     '''
@@ -227,7 +250,576 @@ def twist_doughnut(guesses, r, w, bq, tr, theta, factor, j, s, t,
     return list(error1.flatten()) + list(error2.flatten())
 
 
-def inner_loop(guesses, outer_loop_vars, initial_values, j, ind, p):
+def twist_doughnut_compiled(guesses, r, w, bq, tr, theta, factor, j, s,
+                            t, tau_c, etr_params, mtrx_params,
+                            mtry_params, initial_b, p, hh):
+    '''
+    Solves the upper triangle of time path iterations with the compiled
+    kernels.  Returns the same errors as twist_doughnut.
+
+    Args:
+        guesses (Numpy array): initial guesses for b and n, length 2s
+        r (scalar): real interest rate
+        w (scalar): real wage rate
+        bq (Numpy array): bequest amounts by age, length s
+        tr (scalar): government transfer amount
+        theta (Numpy array): retirement replacement rates, length J
+        factor (scalar): scaling factor converting model units to dollars
+        j (int): index of ability type
+        s (int): years of life remaining
+        t (int): model period
+        tau_c (Numpy array): consumption tax rates, size = sxJ
+        etr_params (Numpy array): ETR function parameters,
+            size = sxsxnum_params
+        mtrx_params (Numpy array): labor income MTR function parameters,
+            size = sxsxnum_params
+        mtry_params (Numpy array): capital income MTR function
+            parameters, size = sxsxnum_params
+        initial_b (Numpy array): savings of agents alive at T=0,
+            size = SxJ
+        p (OG-USA Specifications object): model parameters
+        hh (HHParams): compiled kernel parameters returned by
+            kernels.get_hh_params
+
+    Returns:
+        euler errors (Numpy array): errors from first order conditions,
+            length 2s
+
+    '''
+    guesses = np.asarray(guesses, dtype=float)
+    length = int(len(guesses) / 2)
+    if length == p.S:
+        b_first = 0.0
+    else:
+        b_first = initial_b[-(s + 3), j]
+
+    return kernels.euler_errors_TPI(
+        guesses[:length], guesses[length:], b_first, r, w, bq, tr,
+        theta, factor, j, t, tau_c, etr_params, mtrx_params,
+        mtry_params, hh)
+
+
+def twist_doughnut_jacobian(guesses, r, w, bq, tr, theta, factor, j, s,
+                            t, tau_c, etr_params, mtrx_params,
+                            mtry_params, initial_b, p, hh=None):
+    '''
+    Finds the Jacobian of the errors returned by twist_doughnut with
+    respect to b and n.
+
+    Args:
+        guesses (Numpy array): initial guesses for b and n, length 2s
+        r (scalar): real interest rate
+        w (scalar): real wage rate
+        bq (Numpy array): bequest amounts by age, length s
+        tr (scalar): government transfer amount
+        theta (Numpy array): retirement replacement rates, length J
+        factor (scalar): scaling factor converting model units to dollars
+        j (int): index of ability type
+        s (int): years of life remaining
+        t (int): model period
+        tau_c (Numpy array): consumption tax rates, size = sxJ
+        etr_params (Numpy array): ETR function parameters,
+            size = sxsxnum_params
+        mtrx_params (Numpy array): labor income MTR function parameters,
+            size = sxsxnum_params
+        mtry_params (Numpy array): capital income MTR function
+            parameters, size = sxsxnum_params
+        initial_b (Numpy array): savings of agents alive at T=0,
+            size = SxJ
+        p (OG-USA Specifications object): model parameters
+        hh (HHParams): not used, allows the arguments of
+            twist_doughnut_compiled
+
+    Returns:
+        jac (Numpy array): Jacobian of errors from first order
+            conditions, size = 2sx2s
+
+    '''
+    length = int(len(guesses) / 2)
+    b_guess = np.array(guesses[:length])
+    n_guess = np.array(guesses[length:])
+
+    if length == p.S:
+        b_s = np.array([0] + list(b_guess[:-1]))
+    else:
+        b_s = np.array([(initial_b[-(s + 3), j])] + list(b_guess[:-1]))
+
+    b_splus1 = b_guess
+    w_s = w[t:t + length]
+    r_s = r[t:t + length]
+    n_s = n_guess
+    chi_n_s = p.chi_n[-length:]
+    e_s = p.e[-length:, j]
+    rho_s = p.rho[-length:]
+
+    derivs1 = household.FOC_savings_deriv(
+        r_s, w_s, b_s, b_splus1, n_s, bq, factor, tr, theta, e_s, rho_s,
+        tau_c, etr_params, mtry_params, t, j, p, 'TPI')
+    derivs2 = household.FOC_labor_deriv(
+        r_s, w_s, b_s, b_splus1, n_s, bq, factor, tr, theta, chi_n_s,
+        e_s, tau_c, etr_params, mtrx_params, t, j, p, 'TPI')
+
+    jac = np.zeros((2 * length, 2 * length))
+    for rows, (d_b, d_b_splus1, d_n, _) in zip(
+            (slice(None, length), slice(length, None)),
+            (derivs1, derivs2)):
+        # b_s is b_splus1 of the previous age
+        jac[rows, :length] = d_b_splus1
+        jac[rows, :length - 1] += d_b[:, 1:]
+        jac[rows, length:] = d_n
+
+    return jac
+
+
+def twist_doughnut_cohorts(b, n, r, w, bq, tr, theta, factor, j, t,
+                           ages, tau_c, etr_params, mtrx_params,
+                           mtry_params, p):
+    '''
+    Computes the errors from the first order conditions returned by
+    twist_doughnut for many cohorts at once.  Each row holds the
+    lifetime of one cohort.  Ages before the first age solved for a
+    cohort are not solved; the savings in those entries are the
+    initial savings, which enter the budget constraint of the first
+    age solved.
+
+    Args:
+        b (Numpy array): savings by cohort and age, size = NxS
+        n (Numpy array): labor supply by cohort and age, size = NxS
+        r (Numpy array): real interest rate, length T+S
+        w (Numpy array): real wage rate, length T+S
+        bq (Numpy array): bequest amounts by cohort and age,
+            size = NxS
+        tr (Numpy array): government transfers by cohort and age,
+            size = NxS
+        theta (Numpy array): retirement replacement rate of each
+            cohort, length N
+        factor (scalar): scaling factor converting model units to dollars
+        j (int): index of ability type
+        t (Numpy array): model period in which the first age solved for
+            each cohort is lived, length N
+        ages (Numpy array): first age solved for each cohort, length N
+        tau_c (Numpy array): consumption tax rates by cohort and age,
+            size = NxS
+        etr_params (Numpy array): ETR function parameters by cohort and
+            age, size = NxSxnum_params
+        mtrx_params (Numpy array): labor income MTR function parameters
+            by cohort and age, size = NxSxnum_params
+        mtry_params (Numpy array): capital income MTR function
+            parameters by cohort and age, size = NxSxnum_params
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        errors (Numpy array): errors from first order conditions, zero
+            for ages not solved, size = Nx2S
+
+    '''
+    age = np.arange(p.S).reshape(1, p.S)
+    ages = ages.reshape(-1, 1)
+    t = t.reshape(-1, 1)
+    solved = age >= ages
+    periods = np.maximum(t + age - ages, 0)
+    r_s = r[periods]
+    w_s = w[periods]
+    e_s = p.e[:, j]
+    b_s = np.zeros_like(b)
+    b_s[:, 1:] = b[:, :-1]
+    # retirement benefits start at the same age as in total_taxes
+    retire = p.retire[t] - p.S
+    length = p.S - ages
+    retire = np.where(retire < 0, np.maximum(length + retire, 0), retire)
+    retired = (age - ages) >= retire
+
+    T_I = (tax.ETR_income(r_s, w_s, b_s, n, factor, e_s, etr_params, p)
+           * (r_s * b_s + w_s * e_s * n))
+    T_P = p.tau_payroll[periods] * w_s * e_s * n
+    T_P -= (retired * (theta.reshape(-1, 1) *
+                       p.replacement_rate_adjust[t]) * w_s)
+    T_BQ = p.tau_bq[periods] * bq
+    T_W = (tax.ETR_wealth(b_s, p.h_wealth[periods], p.m_wealth[periods],
+                          p.p_wealth[periods]) * b_s)
+    taxes = T_I + T_P + T_BQ + T_W - tr
+    cons = household.get_cons(r_s, w_s, b_s, b, n, bq, taxes, e_s, tau_c,
+                              p)
+    MU_c = household.marg_ut_cons(cons, p.sigma).reshape(cons.shape)
+
+    deriv = ((1 + r_s) - (
+        r_s * tax.MTR_income(r_s, w_s, b_s, n, factor, True, e_s,
+                             etr_params, mtry_params, p)) -
+             tax.MTR_wealth(b_s, p.h_wealth[t], p.m_wealth[t],
+                            p.p_wealth[t]))
+    savings_ut = (p.rho * np.exp(-p.sigma * p.g_y) * p.chi_b[j] *
+                  b ** (-p.sigma))
+    error1 = np.zeros_like(b)
+    error1[:, :-1] = (MU_c[:, :-1] * (1 / (1 + tau_c[:, :-1])) - p.beta *
+                      (1 - p.rho[:-1]) * deriv[:, 1:] * MU_c[:, 1:] *
+                      (1 / (1 + tau_c[:, 1:])) * np.exp(-p.sigma * p.g_y)
+                      - savings_ut[:, :-1])
+    error1[:, -1] = (MU_c[:, -1] * (1 / (1 + tau_c[:, -1])) -
+                     savings_ut[:, -1])
+
+    deriv = (1 - p.tau_payroll[periods] -
+             tax.MTR_income(r_s, w_s, b_s, n, factor, False, e_s,
+                            etr_params, mtrx_params, p))
+    error2 = (MU_c * (1 / (1 + tau_c)) * w_s * deriv * e_s -
+              household.marg_ut_labor(n, p.chi_n, p).reshape(n.shape))
+
+    # Check and punish constraint violations
+    error2 += 1e12 * ((n < 0).astype(float) + (n > p.ltilde) +
+                      (b <= 0) + (b < 0))
+
+    errors = np.where(np.hstack((solved, solved)),
+                      np.hstack((error1, error2)), 0.0)
+
+    return errors
+
+
+def twist_doughnut_cohorts_jacobian(b, n, r, w, bq, tr, theta, factor, j,
+                                    t, ages, tau_c, etr_params,
+                                    mtrx_params, mtry_params, p):
+    '''
+    Computes the Jacobians of the errors returned by
+    twist_doughnut_cohorts with respect to savings and labor supply for
+    many cohorts at once.  The errors at each age depend only on
+    savings one age either side and on labor supply at that age and
+    the next.
+
+    Args:
+        b (Numpy array): savings by cohort and age, size = NxS
+        n (Numpy array): labor supply by cohort and age, size = NxS
+        r (Numpy array): real interest rate, length T+S
+        w (Numpy array): real wage rate, length T+S
+        bq (Numpy array): bequest amounts by cohort and age,
+            size = NxS
+        tr (Numpy array): government transfers by cohort and age,
+            size = NxS
+        theta (Numpy array): retirement replacement rate of each
+            cohort, length N
+        factor (scalar): scaling factor converting model units to dollars
+        j (int): index of ability type
+        t (Numpy array): model period in which the first age solved for
+            each cohort is lived, length N
+        ages (Numpy array): first age solved for each cohort, length N
+        tau_c (Numpy array): consumption tax rates by cohort and age,
+            size = NxS
+        etr_params (Numpy array): ETR function parameters by cohort and
+            age, size = NxSxnum_params
+        mtrx_params (Numpy array): labor income MTR function parameters
+            by cohort and age, size = NxSxnum_params
+        mtry_params (Numpy array): capital income MTR function
+            parameters by cohort and age, size = NxSxnum_params
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        jac (Numpy array): Jacobians of errors with respect to
+            (b, n), zero in the rows of ages not solved,
+            size = Nx2Sx2S
+
+    '''
+    N, S = b.shape
+    age = np.arange(S).reshape(1, S)
+    ages = ages.reshape(-1, 1)
+    t = t.reshape(-1, 1)
+    solved = age >= ages
+    periods = np.maximum(t + age - ages, 0)
+    r_s = r[periods]
+    w_s = w[periods]
+    e_s = p.e[:, j]
+    b_s = np.zeros_like(b)
+    b_s[:, 1:] = b[:, :-1]
+    # retirement benefits start at the same age as in total_taxes
+    retire = p.retire[t] - p.S
+    length = p.S - ages
+    retire = np.where(retire < 0, np.maximum(length + retire, 0), retire)
+    retired = (age - ages) >= retire
+    h_wealth = p.h_wealth[periods]
+    m_wealth = p.m_wealth[periods]
+    p_wealth = p.p_wealth[periods]
+
+    income = r_s * b_s + w_s * e_s * n
+    etr = tax.ETR_income(r_s, w_s, b_s, n, factor, e_s, etr_params, p)
+    etr_b, etr_n = tax.ETR_income_deriv(r_s, w_s, b_s, n, factor, e_s,
+                                        etr_params, p)
+    T_P = p.tau_payroll[periods] * w_s * e_s * n
+    T_P -= (retired * (theta.reshape(-1, 1) *
+                       p.replacement_rate_adjust[t]) * w_s)
+    taxes = (etr * income + T_P + p.tau_bq[periods] * bq +
+             tax.ETR_wealth(b_s, h_wealth, m_wealth, p_wealth) * b_s - tr)
+    taxes_b = (etr_b * income + etr * r_s +
+               tax.MTR_wealth(b_s, h_wealth, m_wealth, p_wealth))
+    taxes_n = (etr_n * income + etr * w_s * e_s +
+               p.tau_payroll[periods] * w_s * e_s)
+    cons = household.get_cons(r_s, w_s, b_s, b, n, bq, taxes, e_s, tau_c,
+                              p)
+    # marginal utility of consumption net of consumption taxes and its
+    # derivatives with respect to b_s, b (b_splus1), and n
+    MU = household.marg_ut_cons(cons, p.sigma).reshape(cons.shape) / (
+        1 + tau_c)
+    dMU_dc = (household.marg_ut_cons_deriv(cons, p.sigma).reshape(
+        cons.shape) / ((1 + tau_c) ** 2))
+    MU_b = dMU_dc * ((1 + r_s) - taxes_b)
+    MU_b_splus1 = dMU_dc * -np.exp(p.g_y)
+    MU_n = dMU_dc * (w_s * e_s - taxes_n)
+
+    h_wealth_t = p.h_wealth[t]
+    m_wealth_t = p.m_wealth[t]
+    p_wealth_t = p.p_wealth[t]
+    deriv = ((1 + r_s) - (
+        r_s * tax.MTR_income(r_s, w_s, b_s, n, factor, True, e_s,
+                             etr_params, mtry_params, p)) -
+             tax.MTR_wealth(b_s, h_wealth_t, m_wealth_t, p_wealth_t))
+    mtry_b, mtry_n = tax.MTR_income_deriv(r_s, w_s, b_s, n, factor, True,
+                                          e_s, etr_params, mtry_params, p)
+    deriv_b = (-r_s * mtry_b -
+               tax.MTR_wealth_deriv(b_s, h_wealth_t, m_wealth_t,
+                                    p_wealth_t))
+    deriv_n = -r_s * mtry_n
+    savings_ut = (p.rho * np.exp(-p.sigma * p.g_y) * p.chi_b[j] *
+                  b ** (-p.sigma))
+    beta = p.beta * (1 - p.rho[:-1]) * np.exp(-p.sigma * p.g_y)
+
+    tau_payroll = p.tau_payroll[periods]
+    deriv_n_labor = (1 - tau_payroll -
+                     tax.MTR_income(r_s, w_s, b_s, n, factor, False, e_s,
+                                    etr_params, mtrx_params, p))
+    mtrx_b, mtrx_n = tax.MTR_income_deriv(r_s, w_s, b_s, n, factor,
+                                          False, e_s, etr_params,
+                                          mtrx_params, p)
+    we = w_s * e_s
+
+    # derivatives of errors at each age with respect to b_s, b, and n
+    # at the same age (error1 also depends on those at the next age)
+    d1_b = MU_b
+    d1_b_splus1 = MU_b_splus1 + p.sigma * savings_ut / b
+    d1_n = MU_n
+    d1_b_next = -beta * (deriv_b[:, 1:] * MU[:, 1:] +
+                         deriv[:, 1:] * MU_b[:, 1:])
+    d1_b_splus1_next = -beta * deriv[:, 1:] * MU_b_splus1[:, 1:]
+    d1_n_next = -beta * (deriv_n[:, 1:] * MU[:, 1:] +
+                         deriv[:, 1:] * MU_n[:, 1:])
+    d2_b = we * (MU_b * deriv_n_labor - MU * mtrx_b)
+    d2_b_splus1 = we * MU_b_splus1 * deriv_n_labor
+    d2_n = (we * (MU_n * deriv_n_labor - MU * mtrx_n) -
+            household.marg_ut_labor_deriv(n, p.chi_n, p).reshape(n.shape))
+
+    # b_s at each age is b at the previous age, errors at ages not
+    # solved are zero
+    jac = np.zeros((N, 2 * S, 2 * S))
+    idx = np.arange(S)
+    jac[:, idx, idx] = solved * d1_b_splus1
+    jac[:, idx[:-1], idx[:-1]] += solved[:, :-1] * d1_b_next
+    jac[:, idx[1:], idx[:-1]] = solved[:, 1:] * d1_b[:, 1:]
+    jac[:, idx[:-1], idx[1:]] = solved[:, :-1] * d1_b_splus1_next
+    jac[:, idx, S + idx] = solved * d1_n
+    jac[:, idx[:-1], S + idx[1:]] = solved[:, :-1] * d1_n_next
+    jac[:, S + idx, idx] = solved * d2_b_splus1
+    jac[:, S + idx[1:], idx[:-1]] = solved[:, 1:] * d2_b[:, 1:]
+    jac[:, S + idx, S + idx] = solved * d2_n
+
+    return jac
+
+
+def cohort_jacobian(errors_func, b, n, errors, rows):
+    '''
+    Computes forward difference approximations of the Jacobians of the
+    errors returned by twist_doughnut_cohorts with respect to savings
+    and labor supply.  The errors at each age depend only on savings
+    one age either side and on labor supply at that age and the next,
+    so columns that do not share a row are perturbed together and the
+    Jacobians of all cohorts are found in five evaluations of the
+    errors.
+
+    Args:
+        errors_func (function): returns errors given b and n for the
+            cohorts in rows
+        b (Numpy array): savings by cohort and age, size = NxS
+        n (Numpy array): labor supply by cohort and age, size = NxS
+        errors (Numpy array): errors at b and n, size = Nx2S
+        rows (Numpy array): indices of the cohorts in b and n
+
+    Returns:
+        jac (Numpy array): Jacobians of errors with respect to
+            (b, n), size = Nx2Sx2S
+
+    '''
+    N, S = b.shape
+    jac = np.zeros((N, 2 * S, 2 * S))
+    age = np.arange(S)
+    for x, offsets, stride in ((b, (-1, 0, 1), 3), (n, (-1, 0), 2)):
+        # rows of the errors from the FOC for labor supply affected
+        row_offsets = (offsets, (0, 1)) if x is b else (offsets, (0,))
+        h = np.sqrt(np.finfo(float).eps) * np.maximum(np.abs(x), 1.0)
+        for start in range(stride):
+            cols = age[start::stride]
+            x_h = x.copy()
+            x_h[:, cols] += h[:, cols]
+            h_cols = x_h[:, cols] - x[:, cols]
+            if x is b:
+                diff = errors_func(x_h, n, rows) - errors
+                col = cols
+            else:
+                diff = errors_func(b, x_h, rows) - errors
+                col = S + cols
+            for block, block_offsets in enumerate(row_offsets):
+                for offset in block_offsets:
+                    keep = (cols + offset >= 0) & (cols + offset < S)
+                    row = block * S + cols[keep] + offset
+                    jac[:, row, col[keep]] =\
+                        diff[:, row] / h_cols[:, keep]
+
+    return jac
+
+
+def solve_cohorts(errors_func, b, n, solved, p, jacobian_func=None,
+                  maxiter=100):
+    '''
+    Solves the household problems of many cohorts at once with Newton's
+    method, using the Jacobians from jacobian_func or, if that is None,
+    the finite difference Jacobians from cohort_jacobian.  Steps are
+    shortened to keep labor supply and savings within their bounds and
+    halved until they reduce the errors of each cohort.
+
+    Args:
+        errors_func (function): returns errors given b and n for the
+            cohorts with indices rows, see twist_doughnut_cohorts
+        b (Numpy array): initial guess at savings, size = NxS
+        n (Numpy array): initial guess at labor supply, size = NxS
+        solved (Numpy array): boolean, True for ages solved for each
+            cohort, size = NxS
+        p (OG-USA Specifications object): model parameters
+        jacobian_func (function): returns Jacobians of the errors given
+            b and n for the cohorts with indices rows, see
+            twist_doughnut_cohorts_jacobian
+        maxiter (int): maximum number of Newton iterations
+
+    Returns:
+        (tuple): solution results:
+
+            * b (Numpy array): savings, size = NxS
+            * n (Numpy array): labor supply, size = NxS
+            * errors (Numpy array): errors from FOCs, size = Nx2S
+            * converged (Numpy array): boolean, True for cohorts
+                solved to tolerance, length N
+
+    '''
+    N, S = b.shape
+    b = b.copy()
+    n = n.copy()
+    solved2 = np.hstack((solved, solved))
+    # errors for ages not solved are zero, so fix those variables
+    fixed = np.zeros((N, 2 * S, 2 * S))
+    idx = np.arange(2 * S)
+    fixed[:, idx, idx] = ~solved2
+    errors = errors_func(b, n, np.arange(N))
+    dist = np.sqrt((errors ** 2).sum(1))
+    converged = dist == 0
+    failed = ~np.isfinite(dist)
+    for _ in range(maxiter):
+        active = ~(converged | failed)
+        if not active.any():
+            break
+        act = np.where(active)[0]
+        if jacobian_func is None:
+            jac = cohort_jacobian(errors_func, b[act], n[act],
+                                  errors[act], act)
+        else:
+            jac = jacobian_func(b[act], n[act], act)
+        jac += fixed[act]
+        try:
+            step = -np.linalg.solve(jac, errors[active][..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            failed |= active
+            break
+        step[~solved2[active]] = 0.0
+        x_b = b[act]
+        x_n = n[act]
+        x_size = np.sqrt((x_b ** 2).sum(1) + (x_n ** 2).sum(1))
+        done = (np.sqrt((step ** 2).sum(1)) <= MINIMIZER_TOL * x_size)
+        converged[act[done]] = True
+        failed[act[~np.isfinite(step).all(1)]] = True
+        active = ~(converged | failed)
+        keep = active[act]
+        act = act[keep]
+        step = step[keep]
+        x_b = x_b[keep]
+        x_n = x_n[keep]
+        x_size = x_size[keep]
+        db = step[:, :S]
+        dn = step[:, S:]
+        # largest step that keeps variables within bounds
+        with np.errstate(divide='ignore', invalid='ignore'):
+            limit = np.minimum.reduce([
+                np.where(db < 0, -0.99 * x_b / db, np.inf),
+                np.where(dn < 0, -0.99 * x_n / dn, np.inf),
+                np.where(dn > 0, 0.99 * (p.ltilde - x_n) / dn, np.inf)])
+        alpha = np.minimum(1.0, limit.min(1))
+        new_b = x_b.copy()
+        new_n = x_n.copy()
+        new_errors = errors[act]
+        new_dist = dist[act]
+        trying = np.ones(alpha.shape, dtype=bool)
+        for _ in range(30):
+            new_b[trying] = x_b[trying] + alpha[trying, None] * db[trying]
+            new_n[trying] = x_n[trying] + alpha[trying, None] * dn[trying]
+            new_errors[trying] = errors_func(new_b[trying], new_n[trying],
+                                             act[trying])
+            new_dist[trying] = np.sqrt((new_errors[trying] ** 2).sum(1))
+            trying &= ~(new_dist < dist[act])
+            if not trying.any():
+                break
+            alpha[trying] /= 2
+        failed[act[trying]] = True
+        step_size = np.sqrt(((alpha[:, None] * step) ** 2).sum(1))
+        b[act] = new_b
+        n[act] = new_n
+        errors[act] = new_errors
+        dist[act] = new_dist
+        converged[act] = (~trying & ((step_size <= MINIMIZER_TOL * x_size)
+                                     | (new_dist == 0)))
+    failed |= ~converged
+
+    return b, n, errors, ~failed
+
+
+def get_cohort_params(p):
+    '''
+    Get the consumption tax rates and tax function parameters faced by
+    each cohort over its lifetime.  These do not change over TPI
+    iterations, so they are computed once per run rather than once per
+    household problem solved.
+
+    Args:
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        (tuple): values by cohort and age, row c + S - 1 is for the
+            cohort that is age zero in period c (see
+            utils.get_cohort_diagonals):
+
+            * tau_c (Numpy array): consumption tax rates,
+                size = (T+2S-1)xSxJ
+            * etr_params (Numpy array): ETR function parameters,
+                size = (T+2S-1)xSxnum_params
+            * mtrx_params (Numpy array): labor income MTR function
+                parameters, size = (T+2S-1)xSxnum_params
+            * mtry_params (Numpy array): capital income MTR function
+                parameters, size = (T+2S-1)xSxnum_params
+
+    '''
+    cohort_params = [np.ascontiguousarray(
+        utils.get_cohort_diagonals(p.tau_c, p.S))]
+    for params in [p.etr_params, p.mtrx_params, p.mtry_params]:
+        # tax parameters after period T are those of the last period
+        params_TP = np.zeros((p.T + p.S, p.S, params.shape[2]))
+        params_TP[:p.T, :, :] = params
+        params_TP[p.T:, :, :] = params[-1, :, :]
+        cohort_params.append(np.ascontiguousarray(
+            utils.get_cohort_diagonals(params_TP, p.S)))
+
+    return tuple(cohort_params)
+
+
+def inner_loop(guesses, outer_loop_vars, initial_values, j, ind, p,
+               cohort_params=None, hh_params=None):
     '''
     Given path of economic aggregates and factor prices, solves
     household problem.  This has been termed the inner-loop (in
@@ -252,6 +844,11 @@ def inner_loop(guesses, outer_loop_vars, initial_values, j, ind, p):
         j (int): index of ability type
         ind (Numpy array): integers from 0 to S-1
         p (OG-USA Specifications object): model parameters
+        cohort_params (tuple): tax rates and parameters by cohort
+            returned by get_cohort_params, computed from p if None
+        hh_params (HHParams): compiled kernel parameters returned by
+            kernels.get_hh_params, computed from p if None and
+            hh_backend is 'numba'
 
     Returns:
         (tuple): household solution results:
@@ -266,6 +863,17 @@ def inner_loop(guesses, outer_loop_vars, initial_values, j, ind, p):
         initial_values
     guesses_b, guesses_n = guesses
     r, w, r_hh, BQ, TR, theta = outer_loop_vars
+    if cohort_params is None:
+        cohort_params = get_cohort_params(p)
+    tau_c_diags, etr_diags, mtrx_diags, mtry_diags = cohort_params
+    if p.hh_backend == 'numba':
+        if hh_params is None:
+            hh_params = kernels.get_hh_params(p)
+        solver = twist_doughnut_compiled
+        hh_args = (hh_params,)
+    else:
+        solver = twist_doughnut
+        hh_args = ()
 
     # compute w
     w[:p.T] = firm.get_w_from_r(r[:p.T], p, 'TPI')
@@ -273,6 +881,10 @@ def inner_loop(guesses, outer_loop_vars, initial_values, j, ind, p):
     bq = household.get_bq(BQ, None, p, 'TPI')
     # compute tr
     tr = household.get_tr(TR, None, p, 'TPI')
+    bq_diags = np.ascontiguousarray(
+        utils.get_cohort_diagonals(bq[:, :, j], p.S))
+    tr_diags = np.ascontiguousarray(
+        utils.get_cohort_diagonals(tr[:, :, j], p.S))
 
     # initialize arrays
     b_mat = np.zeros((p.T + p.S, p.S))
@@ -288,105 +900,237 @@ def inner_loop(guesses, outer_loop_vars, initial_values, j, ind, p):
                                   factor, j, initial_b, p),
                             xtol=MINIMIZER_TOL))
 
-    for s in range(p.S - 2):  # Upper triangle
-        ind2 = np.arange(s + 2)
-        b_guesses_to_use = np.diag(guesses_b[:p.S, :], p.S - (s + 2))
-        n_guesses_to_use = np.diag(guesses_n[:p.S, :], p.S - (s + 2))
-        theta_to_use = theta[j] * p.replacement_rate_adjust[:p.S]
-        bq_to_use = np.diag(bq[:p.S, :, j], p.S - (s + 2))
-        tr_to_use = np.diag(tr[:p.S, :, j], p.S - (s + 2))
-        tau_c_to_use = np.diag(p.tau_c[:p.S, :, j], p.S - (s + 2))
-
-        length_diag =\
-            np.diag(p.etr_params[:p.S, :, 0], p.S-(s + 2)).shape[0]
-        etr_params_to_use = np.zeros((length_diag, p.etr_params.shape[2]))
-        mtrx_params_to_use = np.zeros((length_diag, p.mtrx_params.shape[2]))
-        mtry_params_to_use = np.zeros((length_diag, p.mtry_params.shape[2]))
-        for i in range(p.etr_params.shape[2]):
-            etr_params_to_use[:, i] =\
-                np.diag(p.etr_params[:p.S, :, i], p.S - (s + 2))
-            mtrx_params_to_use[:, i] =\
-                np.diag(p.mtrx_params[:p.S, :, i], p.S - (s + 2))
-            mtry_params_to_use[:, i] =\
-                np.diag(p.mtry_params[:p.S, :, i], p.S - (s + 2))
-
-        solutions = opt.fsolve(twist_doughnut,
-                               list(b_guesses_to_use) +
-                               list(n_guesses_to_use),
-                               args=(r_hh, w, bq_to_use, tr_to_use,
-                                     theta_to_use, factor, j, s, 0,
-                                     tau_c_to_use,
-                                     etr_params_to_use,
-                                     mtrx_params_to_use,
-                                     mtry_params_to_use, initial_b, p),
-                               xtol=MINIMIZER_TOL)
-
-        b_vec = solutions[:int(len(solutions) / 2)]
-        b_mat[ind2, p.S - (s + 2) + ind2] = b_vec
-        n_vec = solutions[int(len(solutions) / 2):]
-        n_mat[ind2, p.S - (s + 2) + ind2] = n_vec
-
-    for t in range(0, p.T):
-        b_guesses_to_use = .75 * \
-            np.diag(guesses_b[t:t + p.S, :])
-        n_guesses_to_use = np.diag(guesses_n[t:t + p.S, :])
-        theta_to_use = theta[j] * p.replacement_rate_adjust[t:t + p.S]
-        bq_to_use = np.diag(bq[t:t + p.S, :, j])
-        tr_to_use = np.diag(tr[t:t + p.S, :, j])
-        tau_c_to_use = np.diag(p.tau_c[t:t + p.S, :, j])
-
-        # initialize array of diagonal elements
-        etr_params_TP = np.zeros((p.T + p.S, p.S,  p.etr_params.shape[2]))
-        etr_params_TP[:p.T, :, :] = p.etr_params
-        etr_params_TP[p.T:, :, :] = p.etr_params[-1, :, :]
-
-        mtrx_params_TP = np.zeros((p.T + p.S, p.S,  p.mtrx_params.shape[2]))
-        mtrx_params_TP[:p.T, :, :] = p.mtrx_params
-        mtrx_params_TP[p.T:, :, :] = p.mtrx_params[-1, :, :]
-
-        mtry_params_TP = np.zeros((p.T + p.S, p.S,  p.mtry_params.shape[2]))
-        mtry_params_TP[:p.T, :, :] = p.mtry_params
-        mtry_params_TP[p.T:, :, :] = p.mtry_params[-1, :, :]
-
-        length_diag =\
-            np.diag(etr_params_TP[t:t + p.S, :, 0]).shape[0]
-        etr_params_to_use = np.zeros((length_diag, p.etr_params.shape[2]))
-        mtrx_params_to_use = np.zeros((length_diag, p.mtrx_params.shape[2]))
-        mtry_params_to_use = np.zeros((length_diag, p.mtry_params.shape[2]))
-
-        for i in range(p.etr_params.shape[2]):
-            etr_params_to_use[:, i] = np.diag(etr_params_TP[t:t + p.S, :, i])
-            mtrx_params_to_use[:, i] = np.diag(mtrx_params_TP[t:t + p.S, :, i])
-            mtry_params_to_use[:, i] = np.diag(mtry_params_TP[t:t + p.S, :, i])
-
+    # Cohort c + S - 1 is age zero in period c, so cohorts 1 to S - 2
+    # are those in the upper triangle, alive in period 0 for the last
+    # c + 1 ages of their lives.  With the newton solver, the problems
+    # of all cohorts but the one in the first doughnut ring are solved
+    # together.
+    cohorts = np.arange(1, p.T + p.S - 1)
+    start = cohorts - (p.S - 1)
+    t_solve = np.maximum(start, 0)
+    ages = np.maximum(-start, 0)
+    solved = ind.reshape(1, p.S) >= ages.reshape(-1, 1)
+    b_guess = np.array(
+        utils.get_cohort_diagonals(guesses_b[:p.T + p.S, :], p.S)[cohorts])
+    n_guess = np.array(
+        utils.get_cohort_diagonals(guesses_n[:p.T + p.S, :], p.S)[cohorts])
+    b_guess[start >= 0] *= .75
+    # savings before the first age solved are the initial savings
+    b_guess = np.where(solved, b_guess, initial_b[:, j])
+    n_guess = np.where(solved, n_guess, initial_n[:, j])
+    theta_to_use = theta[j] * p.replacement_rate_adjust[t_solve + j]
+
+    bq_to_use = bq_diags[cohorts]
+    tr_to_use = tr_diags[cohorts]
+    tau_c_to_use = tau_c_diags[cohorts, :, j]
+    etr_params_to_use = etr_diags[cohorts]
+    mtrx_params_to_use = mtrx_diags[cohorts]
+    mtry_params_to_use = mtry_diags[cohorts]
+
+    def errors_func(b, n, rows):
+        return twist_doughnut_cohorts(
+            b, n, r_hh, w, bq_to_use[rows], tr_to_use[rows],
+            theta_to_use[rows], factor, j, t_solve[rows], ages[rows],
+            tau_c_to_use[rows], etr_params_to_use[rows],
+            mtrx_params_to_use[rows], mtry_params_to_use[rows], p)
+
+    def jacobian_func(b, n, rows):
+        return twist_doughnut_cohorts_jacobian(
+            b, n, r_hh, w, bq_to_use[rows], tr_to_use[rows],
+            theta_to_use[rows], factor, j, t_solve[rows], ages[rows],
+            tau_c_to_use[rows], etr_params_to_use[rows],
+            mtrx_params_to_use[rows], mtry_params_to_use[rows], p)
+
+    if p.hh_jacobian == 'analytic':
+        fprime = twist_doughnut_jacobian
+    else:
+        jacobian_func = None
+        fprime = None
+    if p.hh_solver_TPI == 'newton':
+        b_sol, n_sol, errors, converged = solve_cohorts(
+            errors_func, b_guess, n_guess, solved, p, jacobian_func)
+    else:
+        b_sol = b_guess
+        n_sol = n_guess
+        errors = np.zeros((len(cohorts), 2 * p.S))
+        converged = np.zeros(len(cohorts), dtype=bool)
+
+    # Solve the cohorts not solved together one at a time
+    for c in np.where(~converged)[0]:
+        row = cohorts[c]
+        age0 = ages[c]
+        if start[c] < 0:  # Upper triangle
+            s = p.S - age0 - 2
+            b_guesses_to_use = np.diag(guesses_b[:p.S, :], age0)
+            n_guesses_to_use = np.diag(guesses_n[:p.S, :], age0)
+            theta_to_use_c = theta[j] * p.replacement_rate_adjust[:p.S]
+            t = 0
+        else:
+            s = None
+            t = start[c]
+            b_guesses_to_use = .75 * np.diag(guesses_b[t:t + p.S, :])
+            n_guesses_to_use = np.diag(guesses_n[t:t + p.S, :])
+            theta_to_use_c = (theta[j] *
+                              p.replacement_rate_adjust[t:t + p.S])
         [solutions, infodict, ier, message] =\
-            opt.fsolve(twist_doughnut, list(b_guesses_to_use) +
+            opt.fsolve(solver, list(b_guesses_to_use) +
                        list(n_guesses_to_use),
-                       args=(r_hh, w, bq_to_use, tr_to_use,
-                             theta_to_use, factor,
-                             j, None, t, tau_c_to_use,
-                             etr_params_to_use, mtrx_params_to_use,
-                             mtry_params_to_use, initial_b, p),
-                       xtol=MINIMIZER_TOL, full_output=True)
-        euler_errors[t, :] = infodict['fvec']
-
-        b_vec = solutions[:p.S]
-        b_mat[t + ind, ind] = b_vec
-        n_vec = solutions[p.S:]
-        n_mat[t + ind, ind] = n_vec
+                       args=(r_hh, w, bq_diags[row, age0:],
+                             tr_diags[row, age0:], theta_to_use_c, factor,
+                             j, s, t, tau_c_diags[row, age0:, j],
+                             etr_diags[row, age0:, :],
+                             mtrx_diags[row, age0:, :],
+                             mtry_diags[row, age0:, :], initial_b,
+                             p) + hh_args,
+                       fprime=fprime, xtol=MINIMIZER_TOL,
+                       full_output=True)
+        length = p.S - age0
+        b_sol[c, age0:] = solutions[:length]
+        n_sol[c, age0:] = solutions[length:]
+        errors[c, age0:p.S] = infodict['fvec'][:length]
+        errors[c, p.S + age0:] = infodict['fvec'][length:]
+
+    periods = start.reshape(-1, 1) + ind.reshape(1, p.S)
+    age_idx = np.tile(ind, (len(cohorts), 1))
+    b_mat[periods[solved], age_idx[solved]] = b_sol[solved]
+    n_mat[periods[solved], age_idx[solved]] = n_sol[solved]
+    euler_errors[:, :] = errors[start >= 0]
 
     print('Type ', j, ' max euler error = ', euler_errors.max())
 
     return euler_errors, b_mat, n_mat
 
 
-def run_TPI(p, client=None):
+def get_baseline_path_guess(x_base, x_ss_base, x_ss, p):
+    '''
+    Get a guess of the time path of a variable in the reform from its
+    path in the baseline.  The baseline path is shifted by the
+    difference between the reform and baseline steady states, phased in
+    over the first T periods with the weights of the 'ratio' shape in
+    utils.get_initial_path.
+
+    Args:
+        x_base (Numpy array): baseline time path, with at least T
+            periods in the first dimension
+        x_ss_base (scalar or Numpy array): baseline steady state value
+        x_ss (scalar or Numpy array): reform steady state value, same
+            shape as x_ss_base
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        xpath (Numpy array): guess of the reform time path, with T + S
+            periods in the first dimension
+
+    '''
+    x_ss = np.asarray(x_ss)
+    weights = 1 - 1 / (np.linspace(0, p.T, p.T) + 1)
+    weights = weights.reshape((p.T,) + (1,) * x_ss.ndim)
+    xpath = x_base[:p.T] + weights * (x_ss - x_ss_base)
+    ending_x_tail = np.tile(x_ss.reshape((1,) + x_ss.shape),
+                            (p.S,) + (1,) * x_ss.ndim)
+    xpath = np.append(xpath, ending_x_tail, axis=0)
+
+    return xpath
+
+
+def checkpoint_fingerprint(p):
+    '''
+    Compute a fingerprint of the model solved by TPI, which identifies
+    the baseline flag, the individual income tax reform, the tax function
+    parameters and the values of the model parameters other than those
+    in CHECKPOINT_UNCHECKED_PARAMS.
+
+    Args:
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        (str): hexadecimal SHA-256 digest of the model parameters
+
+    '''
+    sha = hashlib.sha256()
+    sha.update(repr((p.baseline, p.iit_reform)).encode())
+    names = [name for name in p._data
+             if name not in CHECKPOINT_UNCHECKED_PARAMS]
+    names += ['etr_params', 'mtrx_params', 'mtry_params']
+    for name in names:
+        value = np.asarray(getattr(p, name))
+        sha.update(repr((name, value.dtype.str, value.shape)).encode())
+        sha.update(np.ascontiguousarray(value).tobytes())
+
+    return sha.hexdigest()
+
+
+def save_checkpoint(state, p):
+    '''
+    Save the state of the TPI outer loop to TPI/TPI_checkpoint.npz in
+    the output directory along with the fingerprint of the model.  The
+    file is replaced only once the new checkpoint is completely written.
+
+    Args:
+        state (dict): values of the variables in CHECKPOINT_VARS
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        None
+
+    '''
+    tpi_dir = os.path.join(p.output_base, "TPI")
+    utils.mkdirs(tpi_dir)
+    checkpoint_path = os.path.join(tpi_dir, "TPI_checkpoint.npz")
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, "wb") as f:
+        np.savez(f, fingerprint=checkpoint_fingerprint(p), **state)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def load_checkpoint(p):
+    '''
+    Load the state of the TPI outer loop saved by save_checkpoint.
+
+    Args:
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        state (dict): values of the variables in CHECKPOINT_VARS, None
+            if there is no checkpoint in the output directory or it is
+            for a model with different dimensions or parameters
+
+    '''
+    checkpoint_path = os.path.join(p.output_base, "TPI",
+                                   "TPI_checkpoint.npz")
+    if not os.path.exists(checkpoint_path):
+        warnings.warn('No TPI checkpoint found in ' + p.output_base +
+                      ', starting from the initial guesses')
+        return None
+    with np.load(checkpoint_path) as data:
+        state = {k: data[k] for k in CHECKPOINT_VARS}
+        fingerprint = (str(data['fingerprint']) if 'fingerprint' in
+                       data.files else None)
+    if state['guesses_b'].shape != (p.T + p.S, p.S, p.J):
+        warnings.warn('TPI checkpoint in ' + p.output_base + ' does not '
+                      + 'match the model dimensions, starting from the '
+                      + 'initial guesses')
+        return None
+    if fingerprint != checkpoint_fingerprint(p):
+        warnings.warn('TPI checkpoint in ' + p.output_base + ' is for '
+                      + 'a different baseline, reform or parameters, '
+                      + 'starting from the initial guesses')
+        return None
+    state['TPIiter'] = int(state['TPIiter'])
+    state['TPIdist'] = float(state['TPIdist'])
+
+    return state
+
+
+def run_TPI(p, client=None, resume=False):
     '''
     Solve for transition path equilibrium of OG-USA.
 
     Args:
         p (OG-USA Specifications object): model parameters
         client (Dask client object): client
+        resume (bool): whether to start from the checkpoint of a
+            previous run of the same model in p.output_base
 
     Returns:
         output (dictionary): dictionary with transition path solution
@@ -404,10 +1148,26 @@ def run_TPI(p, client=None):
 
     # Initialize guesses at time paths
     # Make array of initial guesses for labor supply and savings
-    guesses_b = utils.get_initial_path(
-        initial_b, ss_vars['bssmat_splus1'], p, 'ratio')
-    guesses_n = utils.get_initial_path(
-        initial_n, ss_vars['nssmat'], p, 'ratio')
+    use_baseline_path = (not p.baseline and
+                         p.reform_TPI_guess == 'baseline')
+    if use_baseline_path:
+        # Start from the baseline time path, shifted by the change in
+        # the steady state
+        baseline_tpi = utils.safe_read_pickle(
+            os.path.join(p.baseline_dir, "TPI", "TPI_vars.pkl"))
+        baseline_ss = utils.safe_read_pickle(
+            os.path.join(p.baseline_dir, "SS", "SS_vars.pkl"))
+        guesses_b = get_baseline_path_guess(
+            baseline_tpi['bmat_splus1'], baseline_ss['bssmat_splus1'],
+            ss_vars['bssmat_splus1'], p)
+        guesses_n = get_baseline_path_guess(
+            baseline_tpi['n_mat'], baseline_ss['nssmat'],
+            ss_vars['nssmat'], p)
+    else:
+        guesses_b = utils.get_initial_path(
+            initial_b, ss_vars['bssmat_splus1'], p, 'ratio')
+        guesses_n = utils.get_initial_path(
+            initial_n, ss_vars['nssmat'], p, 'ratio')
     b_mat = guesses_b
     n_mat = guesses_n
     ind = np.arange(p.S)
@@ -482,10 +1242,60 @@ def run_TPI(p, client=None):
               [ss_vars['BQss']] * p.S)
         BQ = np.array(BQ)
 
+    if use_baseline_path:
+        r = get_baseline_path_guess(baseline_tpi['r'], baseline_ss['rss'],
+                                    ss_vars['rss'], p)
+        r[p.zeta_K == 1] = p.world_int_rate[p.zeta_K == 1]
+        r_gov = fiscal.get_r_gov(r, p)
+        r_hh = aggr.get_r_hh(r, r_gov, K, ss_vars['Dss'])
+        w[:p.T] = firm.get_w_from_r(r[:p.T], p, 'TPI')
+        BQ = get_baseline_path_guess(baseline_tpi['BQ'],
+                                     baseline_ss['BQss'],
+                                     ss_vars['BQss'], p)
+        if not p.budget_balance and not p.baseline_spending:
+            TR = get_baseline_path_guess(baseline_tpi['TR'],
+                                         baseline_ss['TR_ss'],
+                                         ss_vars['TR_ss'], p)
+
     TPIiter = 0
     TPIdist = 10
+    x_hist = []
+    g_hist = []
+    anderson_fallbacks = 0
+    tick = time.time()
     euler_errors = np.zeros((p.T, 2 * p.S, p.J))
     TPIdist_vec = np.zeros(p.maxiter)
+    if resume:
+        state = load_checkpoint(p)
+        if state is not None:
+            if state['TPIiter'] >= p.maxiter:
+                raise ValueError('TPI checkpoint is at iteration ' +
+                                 str(state['TPIiter']) + ', increase ' +
+                                 'maxiter to resume from it')
+            r, w, BQ, TR, Y, K, L, D = (
+                state['r'], state['w'], state['BQ'], state['TR'],
+                state['Y'], state['K'], state['L'], state['D'])
+            guesses_b = state['guesses_b']
+            guesses_n = state['guesses_n']
+            b_mat = guesses_b.copy()
+            n_mat = guesses_n.copy()
+            TPIiter = state['TPIiter']
+            n_saved = min(p.maxiter, state['TPIdist_vec'].shape[0])
+            TPIdist_vec[:n_saved] = state['TPIdist_vec'][:n_saved]
+            # TPIdist is not restored so that the loop runs at least once
+            # to compute the solution from the saved paths
+            print('Resuming TPI from iteration', TPIiter, 'with distance',
+                  state['TPIdist'])
+    cohort_params = get_cohort_params(p)
+    if p.hh_backend == 'numba':
+        hh_params = kernels.get_hh_params(p)
+    else:
+        hh_params = None
+    # Send the arguments of inner_loop that do not change over the
+    # iterations to the dask workers once
+    (p_shared, initial_values_shared, ind_shared, cohort_params_shared,
+     hh_params_shared) = utils.scatter_to_workers(
+        client, p, initial_values, ind, cohort_params, hh_params)
 
     # TPI loop
     while (TPIiter < p.maxiter) and (TPIdist >= p.mindist_TPI):
@@ -504,7 +1314,10 @@ def run_TPI(p, client=None):
             guesses = (guesses_b[:, :, j], guesses_n[:, :, j])
             lazy_values.append(
                 delayed(inner_loop)(guesses, outer_loop_vars,
-                                    initial_values, j, ind, p))
+                                    initial_values_shared, j,
+                                    ind_shared, p_shared,
+                                    cohort_params_shared,
+                                    hh_params_shared))
         if client:
             futures = client.compute(lazy_values,
                                      num_workers=p.num_workers)
@@ -590,12 +1403,52 @@ def run_TPI(p, client=None):
 
         # update vars for next iteration
         w[:p.T] = wnew[:p.T]
-        r[:p.T] = utils.convex_combo(rnew[:p.T], r[:p.T], p.nu)
-        BQ[:p.T] = utils.convex_combo(BQnew[:p.T], BQ[:p.T], p.nu)
         D[:p.T] = Dnew[:p.T]
-        Y[:p.T] = utils.convex_combo(Ynew[:p.T], Y[:p.T], p.nu)
-        if not p.baseline_spending:
-            TR[:p.T] = utils.convex_combo(TR_new[:p.T], TR[:p.T], p.nu)
+        if p.TPI_solver == 'anderson':
+            # Anderson mixing over the stacked paths of r, BQ, Y and TR.
+            # The history is restarted whenever the distance grows and
+            # the damped update is used whenever the mixed update is not
+            # a valid guess.
+            if p.baseline_spending:
+                TR_update = TR
+            else:
+                TR_update = TR_new
+            x = np.concatenate((r[:p.T], BQ[:p.T].ravel(), Y[:p.T],
+                                TR[:p.T]))
+            g = np.concatenate((rnew[:p.T], BQnew[:p.T].ravel(),
+                                Ynew[:p.T], TR_update[:p.T]))
+            splits = np.cumsum([p.T, BQ[:p.T].size, p.T])
+            scale = np.concatenate([
+                np.ones(block.size) * max(np.abs(block).max(), 1e-8)
+                for block in np.split(x, splits)])
+            if (len(x_hist) > 0 and
+                    np.abs((g - x) / scale).max() >
+                    np.abs((g_hist[-1] - x_hist[-1]) / scale).max()):
+                x_hist = []
+                g_hist = []
+            x_hist = (x_hist + [x])[-(ANDERSON_DEPTH + 1):]
+            g_hist = (g_hist + [g])[-(ANDERSON_DEPTH + 1):]
+            x_new = utils.anderson_mix(x_hist, g_hist, p.nu, scale)
+            r_x, BQ_x, Y_x, TR_x = np.split(x_new, splits)
+            if (not np.isfinite(x_new).all() or (BQ_x <= 0).any() or
+                    (Y_x <= 0).any()):
+                anderson_fallbacks += 1
+                x_hist = [x]
+                g_hist = [g]
+                x_new = utils.convex_combo(g, x, p.nu)
+                r_x, BQ_x, Y_x, TR_x = np.split(x_new, splits)
+            r[:p.T] = r_x
+            BQ[:p.T] = BQ_x.reshape(BQ[:p.T].shape)
+            Y[:p.T] = Y_x
+            if not p.baseline_spending:
+                TR[:p.T] = TR_x
+        else:
+            r[:p.T] = utils.convex_combo(rnew[:p.T], r[:p.T], p.nu)
+            BQ[:p.T] = utils.convex_combo(BQnew[:p.T], BQ[:p.T], p.nu)
+            Y[:p.T] = utils.convex_combo(Ynew[:p.T], Y[:p.T], p.nu)
+            if not p.baseline_spending:
+                TR[:p.T] = utils.convex_combo(TR_new[:p.T], TR[:p.T],
+                                              p.nu)
         guesses_b = utils.convex_combo(b_mat, guesses_b, p.nu)
         guesses_n = utils.convex_combo(n_mat, guesses_n, p.nu)
         print('r diff: ', (rnew[:p.T] - r[:p.T]).max(),
@@ -637,6 +1490,23 @@ def run_TPI(p, client=None):
         TPIiter += 1
         print('Iteration:', TPIiter)
         print('\tDistance:', TPIdist)
+        if p.TPI_checkpoint_interval > 0 and TPIdist >= p.mindist_TPI and (
+                TPIiter % p.TPI_checkpoint_interval == 0 or
+                TPIiter >= p.maxiter):
+            save_checkpoint(
+                {'r': r, 'w': w, 'BQ': BQ, 'TR': TR, 'Y': Y, 'K': K,
+                 'L': L, 'D': D, 'guesses_b': guesses_b,
+                 'guesses_n': guesses_n, 'TPIiter': TPIiter,
+                 'TPIdist': TPIdist, 'TPIdist_vec': TPIdist_vec}, p)
+    # a checkpoint of a converged run is not needed to resume it
+    checkpoint_path = os.path.join(p.output_base, "TPI",
+                                   "TPI_checkpoint.npz")
+    if TPIdist < p.mindist_TPI and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print('TPI outer loop (' + p.TPI_solver + '):', TPIiter,
+          'iterations,', round(time.time() - tick, 2), 'seconds')
+    if p.TPI_solver == 'anderson':
+        print('\tDamped fallback steps:', anderson_fallbacks)
 
     # Compute effective and marginal tax rates for all agents
     mtrx_params_4D = np.tile(
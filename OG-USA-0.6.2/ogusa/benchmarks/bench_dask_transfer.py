@@ -0,0 +1,112 @@
+'''
+------------------------------------------------------------------------
+Benchmark of the data sent to dask workers by the SS inner loop.
+
+Runs SS.inner_loop on a local dask cluster with the model parameters
+sent with every task, as each of the J household problems used to be,
+and with the parameters sent to the workers once by
+SS.get_shared_params.  Reports the bytes sent over the loopback
+interface and the wall time per iteration, and the serialized size of
+the arguments of TPI.inner_loop that run_TPI now sends once per run
+instead of once per ability type and iteration.
+------------------------------------------------------------------------
+'''
+
+# Packages
+import argparse
+import os
+import sys
+import time
+import cloudpickle
+import numpy as np
+import psutil
+from distributed import Client, LocalCluster
+from ogusa import SS, TPI, kernels, utils
+from ogusa.parameters import Specifications
+CUR_PATH = os.path.abspath(os.path.dirname(__file__))
+TAX_FUNC_PATH = os.path.join(CUR_PATH, '..', 'data', 'tax_functions',
+                             'TxFuncEst_baseline_CPS.pkl')
+
+
+def loopback_bytes():
+    '''
+    Returns the number of bytes sent over the loopback interface, which
+    carries all messages between a local dask client, scheduler and
+    workers.
+    '''
+    counters = psutil.net_io_counters(pernic=True)
+    nic = 'lo' if 'lo' in counters else 'lo0'
+    return counters[nic].bytes_sent
+
+
+def time_inner_loop(p, client, shared_params, num_iter):
+    '''
+    Returns the bytes sent and the wall time per iteration of
+    SS.inner_loop.
+    '''
+    bssmat = np.ones((p.S, p.J)) * 0.07
+    nssmat = np.ones((p.S, p.J)) * .4 * p.ltilde
+    BQ = np.ones(p.J) * 0.00019646295986015257
+    outer_loop_vars = (bssmat, nssmat, 0.05, BQ, 1.3, 0.12, 100000)
+    # the first iteration starts the workers' imports and compilation
+    SS.inner_loop(outer_loop_vars, p, client, shared_params)
+    sent = loopback_bytes()
+    start = time.perf_counter()
+    for _ in range(num_iter):
+        SS.inner_loop(outer_loop_vars, p, client, shared_params)
+    secs = time.perf_counter() - start
+    sent = loopback_bytes() - sent
+    return sent / num_iter, secs / num_iter
+
+
+def main(num_workers, num_iter, hh_backend):
+    '''
+    Contains high-level logic of the script.
+    '''
+    cluster = LocalCluster(n_workers=num_workers, threads_per_worker=1)
+    client = Client(cluster)
+    p = Specifications(test=True, num_workers=num_workers)
+    p.update_specifications({'hh_backend': hh_backend})
+    p.get_tax_function_parameters(None, run_micro=False,
+                                  tax_func_path=TAX_FUNC_PATH)
+    if hh_backend == 'numba':
+        hh_params = kernels.get_hh_params(p)
+    else:
+        hh_params = None
+    out = ('SS inner loop, {:>16}: {:10.1f} kB sent, {:7.3f} secs '
+           'per iteration\n')
+    sent, secs = time_inner_loop(p, client, (p, hh_params), num_iter)
+    sys.stdout.write(out.format('sent per task', sent / 1e3, secs))
+    sent, secs = time_inner_loop(p, client,
+                                 SS.get_shared_params(p, client),
+                                 num_iter)
+    sys.stdout.write(out.format('scattered once', sent / 1e3, secs))
+    # arguments of TPI.inner_loop that do not change over iterations
+    cohort_params = TPI.get_cohort_params(p)
+    initial_b = np.ones((p.S, p.J)) * 0.07
+    initial_values = (1.0, initial_b, initial_b, 100000, initial_b,
+                      initial_b * 0.4)
+    size = sum(len(cloudpickle.dumps(obj))
+               for obj in (p, cohort_params, initial_values, hh_params))
+    sys.stdout.write(
+        'TPI inner loop, invariant arguments: {:10.1f} kB, sent {} times '
+        'per iteration before, once per run now\n'.format(size / 1e3, p.J))
+    client.close()
+    cluster.close()
+    return 0
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        prog='python bench_dask_transfer.py',
+        description=('Measures the data sent to dask workers and the '
+                     'wall time per iteration of the SS inner loop.'))
+    PARSER.add_argument('--workers', type=int, default=2,
+                        help='Number of dask worker processes.')
+    PARSER.add_argument('--iter', type=int, default=3,
+                        help='Number of timed inner loop iterations.')
+    PARSER.add_argument('--hh-backend', type=str, default='numpy',
+                        choices=['numpy', 'numba'],
+                        help='Implementation of the household problem.')
+    ARGS = PARSER.parse_args()
+    sys.exit(main(ARGS.workers, ARGS.iter, ARGS.hh_backend))
@@ -0,0 +1,125 @@
+'''
+------------------------------------------------------------------------
+Benchmark of the solvers for the steady state outer loop.
+
+Solves the steady state of the baseline and of a reform with the test
+parameters with each value of the SS_solver parameter.  The reform
+starts from the baseline steady state.  Reports the number of
+evaluations of SS.inner_loop, which solves the J household problems,
+the wall time and the largest difference from the steady state found
+by fsolve.
+------------------------------------------------------------------------
+'''
+
+# Packages
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+import time
+import numpy as np
+from ogusa import SS, utils
+from ogusa.parameters import Specifications
+CUR_PATH = os.path.abspath(os.path.dirname(__file__))
+TAX_FUNC_PATH = os.path.join(CUR_PATH, '..', 'data', 'tax_functions',
+                             'TxFuncEst_baseline_CPS.pkl')
+SOLVERS = ['fsolve', 'anderson']
+COMPARE_VARS = ['rss', 'BQss', 'TR_ss', 'factor_ss', 'Yss']
+
+
+def count_calls(func):
+    '''
+    Returns func wrapped to count the number of times it is called.
+    '''
+    def wrapper(*args, **kwargs):
+        wrapper.calls += 1
+        return func(*args, **kwargs)
+    wrapper.calls = 0
+    return wrapper
+
+
+def time_run_SS(baseline, output_base, baseline_dir, hh_backend,
+                SS_solver, reform):
+    '''
+    Returns the output of SS.run_SS, the number of calls of
+    SS.inner_loop and the wall time.
+    '''
+    p = Specifications(baseline=baseline, test=True,
+                       output_base=output_base, baseline_dir=baseline_dir)
+    p.update_specifications({'hh_backend': hh_backend,
+                             'SS_solver': SS_solver})
+    if not baseline:
+        p.update_specifications(reform)
+    p.get_tax_function_parameters(None, run_micro=False,
+                                  tax_func_path=TAX_FUNC_PATH)
+    inner_loop = SS.inner_loop
+    SS.inner_loop = count_calls(inner_loop)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            output = SS.run_SS(p, None)
+        calls = SS.inner_loop.calls
+    finally:
+        SS.inner_loop = inner_loop
+    return output, calls, time.perf_counter() - start
+
+
+def max_diff(output, expected):
+    '''
+    Returns the largest relative difference in the outer loop
+    variables between two steady state solutions.
+    '''
+    return max(np.abs(utils.pct_diff_func(np.asarray(output[k]),
+                                          np.asarray(expected[k]))).max()
+               for k in COMPARE_VARS)
+
+
+def main(hh_backend, cit_rate):
+    '''
+    Contains high-level logic of the script.
+    '''
+    SS.ENFORCE_SOLUTION_CHECKS = False
+    baseline_dir = tempfile.mkdtemp()
+    reform_dir = tempfile.mkdtemp()
+    reform = {'cit_rate': [cit_rate]}
+    out = ('SS {:>8}, {:>8}: {:4d} inner loop calls, {:8.1f} secs, '
+           'max difference from fsolve {:.2e}\n')
+    outputs = {}
+    for SS_solver in SOLVERS:
+        output, calls, secs = time_run_SS(True, baseline_dir,
+                                          baseline_dir, hh_backend,
+                                          SS_solver, reform)
+        outputs[SS_solver] = output
+        sys.stdout.write(out.format('baseline', SS_solver, calls, secs,
+                                    max_diff(output, outputs['fsolve'])))
+        sys.stdout.flush()
+    # the reforms start from the baseline steady state found by fsolve
+    utils.mkdirs(os.path.join(baseline_dir, 'SS'))
+    with open(os.path.join(baseline_dir, 'SS', 'SS_vars.pkl'), 'wb') as f:
+        pickle.dump(outputs['fsolve'], f)
+    outputs = {}
+    for SS_solver in SOLVERS:
+        output, calls, secs = time_run_SS(False, reform_dir, baseline_dir,
+                                          hh_backend, SS_solver, reform)
+        outputs[SS_solver] = output
+        sys.stdout.write(out.format('reform', SS_solver, calls, secs,
+                                    max_diff(output, outputs['fsolve'])))
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        prog='python bench_ss_solver.py',
+        description=('Compares the inner loop calls and wall time of the '
+                     'solvers for the steady state outer loop.'))
+    PARSER.add_argument('--hh-backend', type=str, default='numpy',
+                        choices=['numpy', 'numba'],
+                        help='Implementation of the household problem.')
+    PARSER.add_argument('--cit-rate', type=float, default=0.28,
+                        help='Corporate income tax rate of the reform.')
+    ARGS = PARSER.parse_args()
+    sys.exit(main(ARGS.hh_backend, ARGS.cit_rate))
@@ -0,0 +1,92 @@
+'''
+------------------------------------------------------------------------
+Benchmark of the solvers for the TPI outer loop.
+
+Solves the steady state of the baseline with the test parameters once
+and then solves the time path with each value of the TPI_solver
+parameter.  Reports the number of outer loop iterations, the wall time
+and the final distance of each solver.
+------------------------------------------------------------------------
+'''
+
+# Packages
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+import time
+from ogusa import SS, TPI, utils
+from ogusa.parameters import Specifications
+CUR_PATH = os.path.abspath(os.path.dirname(__file__))
+TAX_FUNC_PATH = os.path.join(CUR_PATH, '..', 'data', 'tax_functions',
+                             'TxFuncEst_baseline_CPS.pkl')
+
+
+def get_specifications(output_base, hh_backend, TPI_solver):
+    '''
+    Returns the test parameters of the baseline.
+    '''
+    p = Specifications(baseline=True, test=True, output_base=output_base,
+                       baseline_dir=output_base)
+    p.update_specifications({'hh_backend': hh_backend,
+                             'TPI_solver': TPI_solver})
+    p.get_tax_function_parameters(None, run_micro=False,
+                                  tax_func_path=TAX_FUNC_PATH)
+    return p
+
+
+def time_run_TPI(p):
+    '''
+    Returns the number of outer loop iterations, the wall time and the
+    final distance of TPI.run_TPI.
+    '''
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        TPI.run_TPI(p, None)
+    secs = time.perf_counter() - start
+    lines = log.getvalue().splitlines()
+    iterations = [line for line in lines if line.startswith('Iteration:')]
+    distances = [line for line in lines
+                 if line.strip().startswith('Distance:')]
+    return (len(iterations), secs,
+            float(distances[-1].split()[-1]) if distances else None)
+
+
+def main(hh_backend):
+    '''
+    Contains high-level logic of the script.
+    '''
+    # report the distance reached instead of raising an error if a
+    # solver reaches maxiter
+    TPI.ENFORCE_SOLUTION_CHECKS = False
+    output_base = tempfile.mkdtemp()
+    p = get_specifications(output_base, hh_backend, 'damped')
+    ss_dir = os.path.join(output_base, 'SS')
+    utils.mkdirs(ss_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ss_outputs = SS.run_SS(p, None)
+    with open(os.path.join(ss_dir, 'SS_vars.pkl'), 'wb') as f:
+        pickle.dump(ss_outputs, f)
+    out = ('TPI outer loop, {:>8}: {:4d} iterations, {:8.1f} secs, '
+           'distance {:.3e}\n')
+    for TPI_solver in ['damped', 'anderson']:
+        p = get_specifications(output_base, hh_backend, TPI_solver)
+        iterations, secs, dist = time_run_TPI(p)
+        sys.stdout.write(out.format(TPI_solver, iterations, secs, dist))
+    return 0
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        prog='python bench_tpi_solver.py',
+        description=('Compares the iterations and wall time of the '
+                     'solvers for the TPI outer loop.'))
+    PARSER.add_argument('--hh-backend', type=str, default='numpy',
+                        choices=['numpy', 'numba'],
+                        help='Implementation of the household problem.')
+    ARGS = PARSER.parse_args()
+    sys.exit(main(ARGS.hh_backend))
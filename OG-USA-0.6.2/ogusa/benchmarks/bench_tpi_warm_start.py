@@ -0,0 +1,92 @@
+'''
+------------------------------------------------------------------------
+Benchmark of the initial guesses of the time path of a reform.
+
+Solves the baseline with the test parameters and then the time path of
+the corporate income tax rate change of the run_biden reform
+(cit_rate = 0.28) with each value of the reform_TPI_guess parameter.
+Reports the number of outer loop iterations, the wall time and the
+final distance of each guess.
+------------------------------------------------------------------------
+'''
+
+# Packages
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+from ogusa import SS, TPI, utils
+from ogusa.parameters import Specifications
+from bench_tpi_solver import time_run_TPI
+CUR_PATH = os.path.abspath(os.path.dirname(__file__))
+TAX_FUNC_PATH = os.path.join(CUR_PATH, '..', 'data', 'tax_functions',
+                             'TxFuncEst_baseline_CPS.pkl')
+
+
+def get_specifications(baseline, output_base, baseline_dir, og_spec):
+    '''
+    Returns the test parameters updated with og_spec.
+    '''
+    p = Specifications(baseline=baseline, test=True,
+                       output_base=output_base, baseline_dir=baseline_dir)
+    p.update_specifications(og_spec)
+    p.get_tax_function_parameters(None, run_micro=False,
+                                  tax_func_path=TAX_FUNC_PATH)
+    return p
+
+
+def solve_SS(p, output_dir):
+    '''
+    Solves for the steady state and saves it to output_dir.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        ss_outputs = SS.run_SS(p, None)
+    utils.mkdirs(os.path.join(output_dir, 'SS'))
+    with open(os.path.join(output_dir, 'SS', 'SS_vars.pkl'), 'wb') as f:
+        pickle.dump(ss_outputs, f)
+
+
+def main(hh_backend, cit_rate):
+    '''
+    Contains high-level logic of the script.
+    '''
+    TPI.ENFORCE_SOLUTION_CHECKS = False
+    baseline_dir = tempfile.mkdtemp()
+    reform_dir = tempfile.mkdtemp()
+    og_spec = {'hh_backend': hh_backend}
+    p = get_specifications(True, baseline_dir, baseline_dir, og_spec)
+    solve_SS(p, baseline_dir)
+    iterations, secs, dist = time_run_TPI(p)
+    out = ('TPI {:>8}, {:>12}: {:4d} iterations, {:8.1f} secs, '
+           'distance {:.3e}\n')
+    sys.stdout.write(out.format('baseline', 'initial_path', iterations,
+                                secs, dist))
+    sys.stdout.flush()
+    og_spec['cit_rate'] = [cit_rate]
+    p = get_specifications(False, reform_dir, baseline_dir, og_spec)
+    solve_SS(p, reform_dir)
+    for reform_TPI_guess in ['initial_path', 'baseline']:
+        og_spec['reform_TPI_guess'] = reform_TPI_guess
+        p = get_specifications(False, reform_dir, baseline_dir, og_spec)
+        iterations, secs, dist = time_run_TPI(p)
+        sys.stdout.write(out.format('reform', reform_TPI_guess,
+                                    iterations, secs, dist))
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        prog='python bench_tpi_warm_start.py',
+        description=('Compares the iterations and wall time of the time '
+                     'path of a reform with each initial guess.'))
+    PARSER.add_argument('--hh-backend', type=str, default='numpy',
+                        choices=['numpy', 'numba'],
+                        help='Implementation of the household problem.')
+    PARSER.add_argument('--cit-rate', type=float, default=0.28,
+                        help='Corporate income tax rate of the reform.')
+    ARGS = PARSER.parse_args()
+    sys.exit(main(ARGS.hh_backend, ARGS.cit_rate))
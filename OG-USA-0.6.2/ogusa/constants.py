@@ -235,7 +235,19 @@ PARAM_LABELS = {
     'maxiter': ['Maximum number of iterations for TPI',
                 r'$\texttt{maxiter}$'],
     'mindist_SS': ['SS solution tolerance', r'$\texttt{mindist_SS}$'],
-    'mindist_TPI': ['TPI solution tolerance', r'$\texttt{mindist_TPI}$']
+    'mindist_TPI': ['TPI solution tolerance', r'$\texttt{mindist_TPI}$'],
+    'hh_solver_TPI': ['Household problem solver for TPI',
+                      r'$\texttt{hh_solver_TPI}$'],
+    'hh_jacobian': ['Jacobian of the household problem',
+                    r'$\texttt{hh_jacobian}$'],
+    'hh_backend': ['Implementation of the household problem',
+                   r'$\texttt{hh_backend}$'],
+    'TPI_solver': ['TPI outer loop solver', r'$\texttt{TPI_solver}$'],
+    'SS_solver': ['SS outer loop solver', r'$\texttt{SS_solver}$'],
+    'TPI_checkpoint_interval': ['Iterations between TPI checkpoints',
+                                r'$\texttt{TPI_checkpoint_interval}$'],
+    'reform_TPI_guess': ['Initial guess of the reform TPI',
+                         r'$\texttt{reform_TPI_guess}$']
 }
 
 # Ignoring the following:
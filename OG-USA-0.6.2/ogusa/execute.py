@@ -13,7 +13,7 @@ from ogusa.parameters import Specifications
 def runner(output_base, baseline_dir, test=False, time_path=True,
            baseline=True, iit_reform={}, og_spec={}, guid='',
            run_micro=True, tax_func_path=None, data=None, client=None,
-           num_workers=1):
+           num_workers=1, resume=False):
     '''
     This function runs the OG-USA model, solving for the steady-state
     and (optionally) the time path equilibrium.
@@ -36,6 +36,9 @@ def runner(output_base, baseline_dir, test=False, time_path=True,
         client (Dask client object): client
         num_workers (int): number of workers to use for parallelization
             with Dask
+        resume (bool): whether to continue an interrupted run, using
+            the saved steady state and the checkpoint of the time path
+            solution in output_base
 
     Returns:
         None
@@ -75,7 +78,15 @@ def runner(output_base, baseline_dir, test=False, time_path=True,
         Run SS
     ------------------------------------------------------------------------
     '''
-    ss_outputs = SS.run_SS(spec, client=client)
+    if baseline:
+        ss_vars_path = os.path.join(baseline_dir, "SS", "SS_vars.pkl")
+    else:
+        ss_vars_path = os.path.join(output_base, "SS", "SS_vars.pkl")
+    if resume and os.path.exists(ss_vars_path):
+        print('Resuming with the steady state saved in ', ss_vars_path)
+        ss_outputs = utils.safe_read_pickle(ss_vars_path)
+    else:
+        ss_outputs = SS.run_SS(spec, client=client)
 
     '''
     ------------------------------------------------------------------------
@@ -108,7 +119,7 @@ def runner(output_base, baseline_dir, test=False, time_path=True,
             Run the TPI simulation
         ------------------------------------------------------------------------
         '''
-        tpi_output = TPI.run_TPI(spec, client=client)
+        tpi_output = TPI.run_TPI(spec, client=client, resume=resume)
 
         '''
         ------------------------------------------------------------------------
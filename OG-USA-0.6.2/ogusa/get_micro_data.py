@@ -9,6 +9,7 @@ from pandas import DataFrame
 from dask import delayed, compute
 import dask.multiprocessing
 import numpy as np
+import copy
 import pickle
 import pkg_resources
 from ogusa.constants import DEFAULT_START_YEAR, TC_LAST_YEAR, PUF_START_YEAR
@@ -105,19 +106,37 @@ def get_data(baseline=False, start_year=DEFAULT_START_YEAR, reform={},
         taxcalc_version (str): version of Tax-Calculator used
 
     '''
-    # Compute MTRs and taxes or each year, but not beyond TC_LAST_YEAR
-    lazy_values = []
-    for year in range(start_year, TC_LAST_YEAR + 1):
-        lazy_values.append(
-            delayed(taxcalc_advance)(baseline, start_year, reform,
-                                     data, year))
+    # Age one calculator year by year and compute MTRs and taxes for
+    # each year, but not beyond TC_LAST_YEAR, from a copy of the
+    # calculator in that year.  The copies of at most num_workers years
+    # are held at once unless a dask client is given, in which case
+    # each copy is sent to a worker as soon as it is made.
+    calc1 = get_calculator(baseline=baseline,
+                           calculator_start_year=start_year,
+                           reform=reform, data=data)
+    years = list(range(start_year, TC_LAST_YEAR + 1))
     if client:  # pragma: no cover
-        futures = client.compute(lazy_values, num_workers=num_workers)
+        futures = []
+        for year in years:
+            calc1.advance_to_year(year)
+            snapshot = client.scatter(copy.deepcopy(calc1), hash=False)
+            futures.append(client.submit(taxcalc_outputs, snapshot,
+                                         pure=False))
+            del snapshot
         results = client.gather(futures)
     else:
-        results = results = compute(
-            *lazy_values, scheduler=dask.multiprocessing.get,
-            num_workers=num_workers)
+        results = []
+        for i in range(0, len(years), num_workers):
+            lazy_values = []
+            for year in years[i:i + num_workers]:
+                calc1.advance_to_year(year)
+                lazy_values.append(
+                    delayed(taxcalc_outputs)(copy.deepcopy(calc1)))
+            results.extend(compute(
+                *lazy_values, scheduler=dask.multiprocessing.get,
+                num_workers=num_workers))
+            del lazy_values
+    del calc1
 
     # dictionary of data frames to return
     micro_data_dict = {}
@@ -144,12 +163,18 @@ def get_data(baseline=False, start_year=DEFAULT_START_YEAR, reform={},
 
 def taxcalc_advance(baseline, start_year, reform, data, year):
     '''
-    This function advances the year used in Tax-Calculator, compute
-    taxes and rates, and save the results to a dictionary.
+    This function creates a Tax-Calculator calculator, advances it to
+    year, computes taxes and rates, and saves the results to a
+    dictionary.
 
     Args:
-        calc1 (Tax-Calculator Calculator object): TC calculator
-        year (int): year to begin advancing from
+        baseline (boolean): True if baseline tax policy
+        start_year (int): first year of budget window
+        reform (dictionary): IIT policy reform parameters, None if
+            baseline
+        data (DataFrame or str): DataFrame or path to datafile for
+            Records object
+        year (int): year to advance the calculator to
 
     Returns:
         tax_dict (dict): a dictionary of microdata with marginal tax
@@ -159,6 +184,27 @@ def taxcalc_advance(baseline, start_year, reform, data, year):
                            calculator_start_year=start_year,
                            reform=reform, data=data)
     calc1.advance_to_year(year)
+    tax_dict = taxcalc_outputs(calc1)
+
+    # garbage collection
+    del calc1
+
+    return tax_dict
+
+
+def taxcalc_outputs(calc1):
+    '''
+    This function computes taxes and rates in the current year of a
+    Tax-Calculator calculator and saves the results to a dictionary.
+    The calculator is changed in place.
+
+    Args:
+        calc1 (Tax-Calculator Calculator object): TC calculator
+
+    Returns:
+        tax_dict (dict): a dictionary of microdata with marginal tax
+            rates and other information computed in TC
+    '''
     calc1.calc_all()
     print('Year: ', str(calc1.current_year))
 
@@ -169,8 +215,10 @@ def taxcalc_advance(baseline, start_year, reform, data, year):
     # Note the index [2] in the mtr results means that we are pulling
     # the combined mtr from the IIT + FICA taxes
     mtr_combined_labinc = ((
-        calc1.mtr('e00200p')[2] * np.abs(calc1.array('e00200')) +
-        calc1.mtr('e00900p')[2] * np.abs(calc1.array('sey'))) /
+        calc1.mtr('e00200p', calc_all_already_called=True)[2] *
+        np.abs(calc1.array('e00200')) +
+        calc1.mtr('e00900p', calc_all_already_called=True)[2] *
+        np.abs(calc1.array('sey'))) /
         (np.abs(calc1.array('sey')) + np.abs(calc1.array('e00200'))))
 
     # Put MTRs, income, tax liability, and other variables in dict
@@ -189,9 +237,6 @@ def taxcalc_advance(baseline, start_year, reform, data, year):
         'year': calc1.current_year * np.ones(length),
         'weight': calc1.array('s006')}
 
-    # garbage collection
-    del calc1
-
     return tax_dict
 
 
@@ -101,6 +101,70 @@ def marg_ut_labor(n, chi_n, p):
     return output
 
 
+def marg_ut_cons_deriv(c, sigma):
+    r'''
+    Compute the derivative of the marginal utility of consumption
+    returned by marg_ut_cons with respect to consumption.
+
+    .. math::
+        \frac{\partial MU_{c}}{\partial c} = -\sigma c^{-\sigma - 1}
+
+    Args:
+        c (array_like): household consumption
+        sigma (scalar): coefficient of relative risk aversion
+
+    Returns:
+        output (array_like): derivative of the marginal utility of
+            consumption
+
+    '''
+    if np.ndim(c) == 0:
+        c = np.array([c])
+    epsilon = 0.003
+    # marg_ut_cons is linear below epsilon
+    c_cnstr = np.maximum(c, epsilon)
+    output = -sigma * (c_cnstr ** (-sigma - 1))
+    output = np.squeeze(output)
+
+    return output
+
+
+def marg_ut_labor_deriv(n, chi_n, p):
+    r'''
+    Compute the derivative of the marginal disutility of labor returned
+    by marg_ut_labor with respect to labor supply.
+
+    .. math::
+        \frac{\partial MDU_{l}}{\partial n_{j,s,t}} = \chi^n_{s}\biggl(\frac{b}{\tilde{l}^{2}}\biggr)(\upsilon - 1)\biggl(\frac{n_{j,s,t}}{\tilde{l}}\biggr)^{\upsilon-2}\Biggl[1-\biggl(\frac{n_{j,s,t}}{\tilde{l}}\biggr)^\upsilon\Biggr]^{\frac{1-\upsilon}{\upsilon}}\Biggl[1 + \biggl(\frac{n_{j,s,t}}{\tilde{l}}\biggr)^\upsilon\Biggl[1-\biggl(\frac{n_{j,s,t}}{\tilde{l}}\biggr)^\upsilon\Biggr]^{-1}\Biggr]
+
+    Args:
+        n (array_like): household labor supply
+        chi_n (array_like): utility weights on disutility of labor
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        output (array_like): derivative of the marginal disutility of
+            labor supply
+
+    '''
+    nvec = n
+    if np.ndim(nvec) == 0:
+        nvec = np.array([nvec])
+    eps_low = 0.000001
+    eps_high = p.ltilde - 0.000001
+    # marg_ut_labor is linear below eps_low and above eps_high
+    n_ratio = np.minimum(np.maximum(nvec, eps_low), eps_high) / p.ltilde
+    dMDU_n = ((p.b_ellipse / (p.ltilde ** 2)) * (p.upsilon - 1) *
+              (n_ratio ** (p.upsilon - 2)) *
+              ((1 - (n_ratio ** p.upsilon)) **
+               ((1 - p.upsilon) / p.upsilon)) *
+              (1 + (n_ratio ** p.upsilon) *
+               ((1 - (n_ratio ** p.upsilon)) ** (-1))))
+    output = dMDU_n * np.squeeze(chi_n)
+    output = np.squeeze(output)
+    return output
+
+
 def get_bq(BQ, j, p, method):
     r'''
     Calculate bequests to each household.
@@ -369,6 +433,222 @@ def FOC_labor(r, w, b, b_splus1, n, bq, factor, tr, theta, chi_n, e,
     return FOC_error
 
 
+def get_marg_ut_cons_deriv(r, w, b, b_splus1, n, bq, factor, tr, theta,
+                           e, tau_c, etr_params, t, j, p, method):
+    '''
+    Computes the marginal utility of consumption net of consumption
+    taxes, which enters the FOCs for savings and labor supply, and its
+    derivatives with respect to the household's choices.
+
+    Args:
+        r (array_like): the real interest rate
+        w (array_like): the real wage rate
+        b (Numpy array): household savings
+        b_splus1 (Numpy array): household savings one period ahead
+        n (Numpy array): household labor supply
+        bq (Numpy array): household bequests received
+        factor (scalar): scaling factor converting model units to dollars
+        tr (Numpy array): government tranfers to household
+        theta (Numpy array): social security replacement rate for each
+            lifetime income group
+        e (Numpy array): effective labor units
+        tau_c (array_like): consumption tax rates
+        etr_params (Numpy array): parameters of the effective tax rate
+            functions
+        t (int): model period
+        j (int): index of ability type
+        p (OG-USA Specifications object): model parameters
+        method (str): adjusts calculation dimensions based on 'SS' or
+            'TPI'
+
+    Returns:
+        (tuple): marginal utility of consumption net of consumption
+            taxes and its derivatives by age:
+
+            * MU (Numpy array): marginal utility of consumption over
+                one plus the consumption tax rate
+            * MU_b (Numpy array): derivative with respect to b
+            * MU_b_splus1 (Numpy array): derivative with respect to
+                b_splus1
+            * MU_n (Numpy array): derivative with respect to n
+            * MU_theta (Numpy array): derivative with respect to theta
+
+    '''
+    taxes = tax.total_taxes(r, w, b, n, bq, factor, tr, theta, t, j,
+                            False, method, e, etr_params, p)
+    taxes_b, taxes_n, taxes_theta = tax.total_taxes_deriv(
+        r, w, b, n, bq, factor, tr, theta, t, j, False, method, e,
+        etr_params, p)
+    cons = get_cons(r, w, b, b_splus1, n, bq, taxes, e, tau_c, p)
+    MU = marg_ut_cons(cons, p.sigma).reshape(cons.shape) / (1 + tau_c)
+    dMU_dc = (marg_ut_cons_deriv(cons, p.sigma).reshape(cons.shape) /
+              ((1 + tau_c) ** 2))
+    MU_b = dMU_dc * ((1 + r) - taxes_b)
+    MU_b_splus1 = dMU_dc * -np.exp(p.g_y)
+    MU_n = dMU_dc * (w * e - taxes_n)
+    MU_theta = dMU_dc * -taxes_theta
+
+    return MU, MU_b, MU_b_splus1, MU_n, MU_theta
+
+
+def FOC_savings_deriv(r, w, b, b_splus1, n, bq, factor, tr, theta, e,
+                      rho, tau_c, etr_params, mtry_params, t, j, p,
+                      method):
+    '''
+    Computes the derivatives of the Euler errors returned by
+    FOC_savings for one household over its lifetime with respect to
+    savings, labor supply, and the social security replacement rate.
+    The error at each age depends only on the variables at that age and
+    the next.
+
+    Args:
+        r (array_like): the real interest rate
+        w (array_like): the real wage rate
+        b (Numpy array): household savings
+        b_splus1 (Numpy array): household savings one period ahead
+        n (Numpy array): household labor supply
+        bq (Numpy array): household bequests received
+        factor (scalar): scaling factor converting model units to dollars
+        tr (Numpy array): government tranfers to household
+        theta (Numpy array): social security replacement rate for each
+            lifetime income group
+        e (Numpy array): effective labor units
+        rho (Numpy array): mortality rates
+        tau_c (array_like): consumption tax rates
+        etr_params (Numpy array): parameters of the effective tax rate
+            functions
+        mtry_params (Numpy array): parameters of the marginal tax rate
+            on capital income functions
+        t (int): model period
+        j (int): index of ability type
+        p (OG-USA Specifications object): model parameters
+        method (str): adjusts calculation dimensions based on 'SS' or
+            'TPI'
+
+    Returns:
+        (tuple): derivatives of the Euler errors, element [s, k] is the
+            derivative of the error at age s with respect to the
+            variable at age k:
+
+            * d_b (Numpy array): with respect to b, size = sxs
+            * d_b_splus1 (Numpy array): with respect to b_splus1,
+                size = sxs
+            * d_n (Numpy array): with respect to n, size = sxs
+            * d_theta (Numpy array): with respect to theta, length s
+
+    '''
+    if j is not None:
+        chi_b = p.chi_b[j]
+    else:
+        chi_b = p.chi_b
+    if method == 'SS':
+        h_wealth = p.h_wealth[-1]
+        m_wealth = p.m_wealth[-1]
+        p_wealth = p.p_wealth[-1]
+    else:
+        h_wealth = p.h_wealth[t]
+        m_wealth = p.m_wealth[t]
+        p_wealth = p.p_wealth[t]
+
+    MU, MU_b, MU_b_splus1, MU_n, MU_theta = get_marg_ut_cons_deriv(
+        r, w, b, b_splus1, n, bq, factor, tr, theta, e, tau_c,
+        etr_params, t, j, p, method)
+    deriv = ((1 + r) - (
+        r * tax.MTR_income(r, w, b, n, factor, True, e, etr_params,
+                           mtry_params, p)) -
+             tax.MTR_wealth(b, h_wealth, m_wealth, p_wealth))
+    mtry_b, mtry_n = tax.MTR_income_deriv(r, w, b, n, factor, True, e,
+                                          etr_params, mtry_params, p)
+    deriv_b = (-r * mtry_b -
+               tax.MTR_wealth_deriv(b, h_wealth, m_wealth, p_wealth))
+    deriv_n = -r * mtry_n
+    savings_ut = (rho * np.exp(-p.sigma * p.g_y) * chi_b *
+                  b_splus1 ** (-p.sigma))
+
+    d_b = np.diag(MU_b)
+    d_b_splus1 = np.diag(MU_b_splus1 + p.sigma * savings_ut / b_splus1)
+    d_n = np.diag(MU_n)
+    d_theta = MU_theta.copy()
+    # terms from the marginal utility of consumption next period
+    beta = p.beta * (1 - rho[:-1]) * np.exp(-p.sigma * p.g_y)
+    d_b[:-1, 1:] -= np.diag(beta * (deriv_b[1:] * MU[1:] +
+                                    deriv[1:] * MU_b[1:]))
+    d_b_splus1[:-1, 1:] -= np.diag(beta * deriv[1:] * MU_b_splus1[1:])
+    d_n[:-1, 1:] -= np.diag(beta * (deriv_n[1:] * MU[1:] +
+                                    deriv[1:] * MU_n[1:]))
+    d_theta[:-1] -= beta * deriv[1:] * MU_theta[1:]
+
+    return d_b, d_b_splus1, d_n, d_theta
+
+
+def FOC_labor_deriv(r, w, b, b_splus1, n, bq, factor, tr, theta, chi_n,
+                    e, tau_c, etr_params, mtrx_params, t, j, p, method):
+    '''
+    Computes the derivatives of the errors returned by FOC_labor for
+    one household over its lifetime with respect to savings, labor
+    supply, and the social security replacement rate.  The error at
+    each age depends only on the variables at that age.
+
+    Args:
+        r (array_like): the real interest rate
+        w (array_like): the real wage rate
+        b (Numpy array): household savings
+        b_splus1 (Numpy array): household savings one period ahead
+        n (Numpy array): household labor supply
+        bq (Numpy array): household bequests received
+        factor (scalar): scaling factor converting model units to dollars
+        tr (Numpy array): government tranfers to household
+        theta (Numpy array): social security replacement rate for each
+            lifetime income group
+        chi_n (Numpy array): utility weight on the disutility of labor
+            supply
+        e (Numpy array): effective labor units
+        tau_c (array_like): consumption tax rates
+        etr_params (Numpy array): parameters of the effective tax rate
+            functions
+        mtrx_params (Numpy array): parameters of the marginal tax rate
+            on labor income functions
+        t (int): model period
+        j (int): index of ability type
+        p (OG-USA Specifications object): model parameters
+        method (str): adjusts calculation dimensions based on 'SS' or
+            'TPI'
+
+    Returns:
+        (tuple): derivatives of the errors, element [s, k] is the
+            derivative of the error at age s with respect to the
+            variable at age k:
+
+            * d_b (Numpy array): with respect to b, size = sxs
+            * d_b_splus1 (Numpy array): with respect to b_splus1,
+                size = sxs
+            * d_n (Numpy array): with respect to n, size = sxs
+            * d_theta (Numpy array): with respect to theta, length s
+
+    '''
+    if method == 'SS':
+        tau_payroll = p.tau_payroll[-1]
+    else:
+        length = r.shape[0]
+        tau_payroll = p.tau_payroll[t:t + length]
+
+    MU, MU_b, MU_b_splus1, MU_n, MU_theta = get_marg_ut_cons_deriv(
+        r, w, b, b_splus1, n, bq, factor, tr, theta, e, tau_c,
+        etr_params, t, j, p, method)
+    deriv = (1 - tau_payroll - tax.MTR_income(r, w, b, n, factor,
+                                              False, e, etr_params,
+                                              mtrx_params, p))
+    mtrx_b, mtrx_n = tax.MTR_income_deriv(r, w, b, n, factor, False, e,
+                                          etr_params, mtrx_params, p)
+    d_b = np.diag(w * e * (MU_b * deriv - MU * mtrx_b))
+    d_b_splus1 = np.diag(w * e * MU_b_splus1 * deriv)
+    d_n = np.diag(w * e * (MU_n * deriv - MU * mtrx_n) -
+                  marg_ut_labor_deriv(n, chi_n, p).reshape(n.shape))
+    d_theta = w * e * MU_theta * deriv
+
+    return d_b, d_b_splus1, d_n, d_theta
+
+
 def get_y(r_hh, w, b_s, n, p):
     '''
     Compute houshold income before taxes.
@@ -0,0 +1,433 @@
+'''
+------------------------------------------------------------------------
+Compiled household and tax kernels.
+
+These functions evaluate the household first order conditions of
+household.FOC_savings and household.FOC_labor, with the taxes of
+tax.total_taxes, tax.ETR_income and tax.MTR_income, for one lifetime
+income group at a time.  They are compiled with numba, take the model
+parameters as a HHParams tuple of plain arrays extracted once from the
+Specifications object, and loop over ages without temporary arrays.
+They are used by the household solvers when hh_backend is 'numba'.
+------------------------------------------------------------------------
+'''
+
+# Packages
+from collections import namedtuple
+import numpy as np
+from numba import njit
+
+'''
+------------------------------------------------------------------------
+    Functions
+------------------------------------------------------------------------
+'''
+
+TAX_FUNC_CODES = {'GS': 0, 'DEP_totalinc': 1, 'DEP': 2, 'linear': 2}
+
+HHParams = namedtuple('HHParams', [
+    'tax_func', 'analytical_mtrs', 'sigma', 'beta', 'exp_g_y',
+    'exp_sigma_g_y', 'ltilde', 'b_ellipse', 'upsilon', 'eps_low',
+    'eps_high', 'mu_c_b1', 'mu_c_b2', 'mdu_b1', 'mdu_b2', 'mdu_d1',
+    'mdu_d2', 'S', 'rho', 'chi_b', 'chi_n', 'e', 'tau_c_ss',
+    'etr_params_ss', 'mtrx_params_ss', 'mtry_params_ss',
+    'tau_payroll_ss', 'tau_bq_ss', 'h_wealth_ss', 'm_wealth_ss',
+    'p_wealth_ss', 'retire_ss', 'tau_payroll', 'tau_bq', 'h_wealth',
+    'm_wealth', 'p_wealth', 'retire', 'replacement_rate_adjust'])
+
+
+def get_hh_params(p):
+    '''
+    Extracts the parameters used by the compiled kernels from the
+    Specifications object.
+
+    Args:
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        hh (HHParams): tuple of scalars and contiguous Numpy arrays
+
+    '''
+    # linear extrapolation of marginal utility below c = 0.003, see
+    # household.marg_ut_cons
+    epsilon = 0.003
+    mu_c_b2 = (-p.sigma * (epsilon ** (-p.sigma - 1))) / 2
+    mu_c_b1 = (epsilon ** (-p.sigma)) - 2 * mu_c_b2 * epsilon
+    # quadratic extrapolation of marginal disutility of labor near the
+    # bounds of labor supply, see household.marg_ut_labor
+    eps_low = 0.000001
+    eps_high = p.ltilde - 0.000001
+    b2 = (0.5 * p.b_ellipse * (p.ltilde ** (-p.upsilon)) * (p.upsilon - 1) *
+          (eps_low ** (p.upsilon - 2)) *
+          ((1 - ((eps_low / p.ltilde) ** p.upsilon)) **
+          ((1 - p.upsilon) / p.upsilon)) *
+          (1 + ((eps_low / p.ltilde) ** p.upsilon) *
+          ((1 - ((eps_low / p.ltilde) ** p.upsilon)) ** (-1))))
+    b1 = ((p.b_ellipse / p.ltilde) * ((eps_low / p.ltilde) **
+                                      (p.upsilon - 1)) *
+          ((1 - ((eps_low / p.ltilde) ** p.upsilon)) **
+          ((1 - p.upsilon) / p.upsilon)) - (2 * b2 * eps_low))
+    d2 = (0.5 * p.b_ellipse * (p.ltilde ** (-p.upsilon)) * (p.upsilon - 1) *
+          (eps_high ** (p.upsilon - 2)) *
+          ((1 - ((eps_high / p.ltilde) ** p.upsilon)) **
+          ((1 - p.upsilon) / p.upsilon)) *
+          (1 + ((eps_high / p.ltilde) ** p.upsilon) *
+          ((1 - ((eps_high / p.ltilde) ** p.upsilon)) ** (-1))))
+    d1 = ((p.b_ellipse / p.ltilde) * ((eps_high / p.ltilde) **
+          (p.upsilon - 1)) * ((1 - ((eps_high / p.ltilde) ** p.upsilon)) **
+          ((1 - p.upsilon) / p.upsilon)) - (2 * d2 * eps_high))
+    hh = HHParams(
+        tax_func=TAX_FUNC_CODES[p.tax_func_type],
+        analytical_mtrs=bool(p.analytical_mtrs),
+        sigma=float(p.sigma), beta=float(p.beta),
+        exp_g_y=float(np.exp(p.g_y)),
+        exp_sigma_g_y=float(np.exp(-p.sigma * p.g_y)),
+        ltilde=float(p.ltilde), b_ellipse=float(p.b_ellipse),
+        upsilon=float(p.upsilon), eps_low=eps_low,
+        eps_high=float(eps_high), mu_c_b1=float(mu_c_b1),
+        mu_c_b2=float(mu_c_b2), mdu_b1=float(b1), mdu_b2=float(b2),
+        mdu_d1=float(d1), mdu_d2=float(d2), S=int(p.S),
+        rho=np.ascontiguousarray(p.rho, dtype=np.float64),
+        chi_b=np.ascontiguousarray(p.chi_b, dtype=np.float64),
+        chi_n=np.ascontiguousarray(p.chi_n, dtype=np.float64),
+        e=np.ascontiguousarray(p.e, dtype=np.float64),
+        tau_c_ss=np.ascontiguousarray(p.tau_c[-1, :, :],
+                                      dtype=np.float64),
+        etr_params_ss=np.ascontiguousarray(p.etr_params[-1, :, :],
+                                           dtype=np.float64),
+        mtrx_params_ss=np.ascontiguousarray(p.mtrx_params[-1, :, :],
+                                            dtype=np.float64),
+        mtry_params_ss=np.ascontiguousarray(p.mtry_params[-1, :, :],
+                                            dtype=np.float64),
+        tau_payroll_ss=float(p.tau_payroll[-1]),
+        tau_bq_ss=float(p.tau_bq[-1]),
+        h_wealth_ss=float(p.h_wealth[-1]),
+        m_wealth_ss=float(p.m_wealth[-1]),
+        p_wealth_ss=float(p.p_wealth[-1]), retire_ss=int(p.retire[-1]),
+        tau_payroll=np.ascontiguousarray(p.tau_payroll, dtype=np.float64),
+        tau_bq=np.ascontiguousarray(p.tau_bq, dtype=np.float64),
+        h_wealth=np.ascontiguousarray(p.h_wealth, dtype=np.float64),
+        m_wealth=np.ascontiguousarray(p.m_wealth, dtype=np.float64),
+        p_wealth=np.ascontiguousarray(p.p_wealth, dtype=np.float64),
+        retire=np.ascontiguousarray(p.retire, dtype=np.int64),
+        replacement_rate_adjust=np.ascontiguousarray(
+            p.replacement_rate_adjust, dtype=np.float64))
+    return hh
+
+
+@njit(cache=True)
+def marg_ut_cons(c, hh):
+    '''
+    Marginal utility of consumption for a single household, see
+    household.marg_ut_cons.
+    '''
+    if c < 0.003:
+        return 2 * hh.mu_c_b2 * c + hh.mu_c_b1
+    return c ** (-hh.sigma)
+
+
+@njit(cache=True)
+def marg_ut_labor(n, chi_n, hh):
+    '''
+    Marginal disutility of labor for a single household, see
+    household.marg_ut_labor.
+    '''
+    if n < hh.eps_low:
+        MDU_n = 2 * hh.mdu_b2 * n + hh.mdu_b1
+    elif n > hh.eps_high:
+        MDU_n = 2 * hh.mdu_d2 * n + hh.mdu_d1
+    else:
+        MDU_n = ((hh.b_ellipse / hh.ltilde) *
+                 ((n / hh.ltilde) ** (hh.upsilon - 1)) *
+                 ((1 - ((n / hh.ltilde) ** hh.upsilon)) **
+                  ((1 - hh.upsilon) / hh.upsilon)))
+    return MDU_n * chi_n
+
+
+@njit(cache=True)
+def _DEP_rate(A, B, max_x, min_x, X):
+    '''
+    Ratio of polynomials in one source of income used by the DEP tax
+    functions.
+    '''
+    X2 = X * X
+    return (max_x - min_x) * (A * X2 + B * X) / (A * X2 + B * X + 1) + min_x
+
+
+@njit(cache=True)
+def ETR_income(X, Y, params, tax_func):
+    '''
+    Effective tax rate on labor income X and capital income Y, in
+    dollars, for a single household, see tax.ETR_income.
+    '''
+    income = X + Y
+    if tax_func == 0:
+        phi0 = params[0]
+        phi1 = params[1]
+        phi2 = params[2]
+        return ((phi0 * (income - ((income ** -phi1) + phi2) **
+                         (-1 / phi1))) / income)
+    elif tax_func == 1:
+        return (_DEP_rate(params[0], params[1], params[4], params[5],
+                          income) + params[8] + params[10])
+    tau_x = _DEP_rate(params[0], params[1], params[4], params[5], X)
+    tau_y = _DEP_rate(params[2], params[3], params[6], params[7], Y)
+    share = params[11]
+    return (((tau_x + params[8]) ** share) *
+            ((tau_y + params[9]) ** (1 - share))) + params[10]
+
+
+@njit(cache=True)
+def MTR_income(X, Y, etr_params, mtr_params, mtr_capital, hh):
+    '''
+    Marginal tax rate on labor income X or capital income Y, in
+    dollars, for a single household, see tax.MTR_income.
+    '''
+    income = X + Y
+    if hh.analytical_mtrs:
+        params = etr_params
+    elif hh.tax_func == 0:
+        params = mtr_params
+    else:
+        return ETR_income(X, Y, mtr_params, hh.tax_func)
+    if hh.tax_func == 0:
+        phi0 = params[0]
+        phi1 = params[1]
+        phi2 = params[2]
+        return (phi0*(1 - (income ** (-phi1 - 1) *
+                           ((income ** -phi1) + phi2) **
+                           ((-1 - phi1) / phi1))))
+    elif hh.tax_func == 1:
+        A = params[0]
+        B = params[1]
+        income2 = income * income
+        d_etr = ((params[4] - params[5]) * ((2 * A * income + B) /
+                 ((A * income2 + B * income + 1) ** 2)))
+        etr = (((params[4] - params[5]) *
+                ((A * income2 + B * income) /
+                 (A * income2 + B * income + 1)) + params[5]) +
+               params[8] + params[10])
+        return (d_etr * income) + (etr)
+    A = params[0]
+    B = params[1]
+    C = params[2]
+    D = params[3]
+    share = params[11]
+    tau_x = _DEP_rate(A, B, params[4], params[5], X)
+    tau_y = _DEP_rate(C, D, params[6], params[7], Y)
+    etr = (((tau_x + params[8]) ** share) *
+           ((tau_y + params[9]) ** (1 - share))) + params[10]
+    if mtr_capital:
+        d_etr = ((1-share) * ((tau_y + params[9]) ** (-share)) *
+                 (params[6] - params[7]) * ((2 * C * Y + D) /
+                                            ((C * (Y * Y) + D * Y + 1)
+                                             ** 2)) *
+                 ((tau_x + params[8]) ** share))
+    else:
+        d_etr = (share * ((tau_x + params[8]) ** (share - 1)) *
+                 (params[4] - params[5]) * ((2 * A * X + B) /
+                                            ((A * (X * X) + B * X + 1)
+                                             ** 2)) *
+                 ((tau_y + params[9]) ** (1 - share)))
+    return d_etr * income + etr
+
+
+@njit(cache=True)
+def FOC_errors(r, w, b, b_splus1, n, bq, factor, tr, theta, retire, e,
+               rho, chi_b, chi_n, tau_c, etr_params, mtrx_params,
+               mtry_params, tau_payroll, tau_bq, h_wealth, m_wealth,
+               p_wealth, h_wealth_mtr, m_wealth_mtr, p_wealth_mtr, hh):
+    '''
+    Errors from the FOCs for savings and labor supply of one lifetime
+    income group over the ages in b, see household.FOC_savings and
+    household.FOC_labor.
+
+    Args:
+        r (Numpy array): real interest rate faced at each age
+        w (Numpy array): real wage rate faced at each age
+        b (Numpy array): household savings
+        b_splus1 (Numpy array): household savings one period ahead
+        n (Numpy array): household labor supply
+        bq (Numpy array): household bequests received
+        factor (scalar): scaling factor converting model units to dollars
+        tr (Numpy array): government tranfers to household
+        theta (scalar): social security benefits per unit of the wage
+        retire (int): index of the first retired age in b
+        e (Numpy array): effective labor units
+        rho (Numpy array): mortality rates
+        chi_b (scalar): utility weight on bequests
+        chi_n (Numpy array): utility weights on disutility of labor
+        tau_c (Numpy array): consumption tax rates
+        etr_params (Numpy array): ETR function parameters, size = sx12
+        mtrx_params (Numpy array): labor income MTR function
+            parameters, size = sx12
+        mtry_params (Numpy array): capital income MTR function
+            parameters, size = sx12
+        tau_payroll (Numpy array): payroll tax rates
+        tau_bq (Numpy array): bequest tax rates
+        h_wealth (Numpy array): wealth tax parameter h by age
+        m_wealth (Numpy array): wealth tax parameter m by age
+        p_wealth (Numpy array): wealth tax parameter p by age
+        h_wealth_mtr (scalar): parameter h of the marginal wealth tax
+        m_wealth_mtr (scalar): parameter m of the marginal wealth tax
+        p_wealth_mtr (scalar): parameter p of the marginal wealth tax
+        hh (HHParams): compiled kernel parameters
+
+    Returns:
+        (tuple): results:
+
+            * errors (Numpy array): errors from the FOCs for savings
+                and labor supply, length 2s
+            * cons (Numpy array): household consumption, length s
+
+    '''
+    s = b.shape[0]
+    errors = np.empty(2 * s)
+    cons = np.empty(s)
+    MU_c = np.empty(s)
+    deriv = np.empty(s)
+    for i in range(s):
+        X = (w[i] * e[i] * n[i]) * factor
+        Y = (r[i] * b[i]) * factor
+        income = r[i] * b[i] + w[i] * e[i] * n[i]
+        T_I = ETR_income(X, Y, etr_params[i], hh.tax_func) * income
+        T_P = tau_payroll[i] * w[i] * e[i] * n[i]
+        if i >= retire:
+            T_P -= theta * w[i]
+        T_BQ = tau_bq[i] * bq[i]
+        T_W = ((p_wealth[i] * h_wealth[i] * b[i]) /
+               (h_wealth[i] * b[i] + m_wealth[i])) * b[i]
+        taxes = T_I + T_P + T_BQ + T_W - tr[i]
+        cons[i] = ((1 + r[i]) * b[i] + w[i] * e[i] * n[i] + bq[i] -
+                   b_splus1[i] * hh.exp_g_y - taxes) / (1 + tau_c[i])
+        MU_c[i] = marg_ut_cons(cons[i], hh)
+        denom = b[i] * h_wealth_mtr + m_wealth_mtr
+        MTR_W = ((b[i] * h_wealth_mtr * m_wealth_mtr * p_wealth_mtr) /
+                 (denom * denom) +
+                 (p_wealth_mtr * h_wealth_mtr * b[i]) / denom)
+        deriv[i] = ((1 + r[i]) - (
+            r[i] * MTR_income(X, Y, etr_params[i], mtry_params[i], True,
+                              hh)) - MTR_W)
+        deriv_n = (1 - tau_payroll[i] -
+                   MTR_income(X, Y, etr_params[i], mtrx_params[i], False,
+                              hh))
+        errors[s + i] = (MU_c[i] * (1 / (1 + tau_c[i])) * w[i] *
+                         deriv_n * e[i] -
+                         marg_ut_labor(n[i], chi_n[i], hh))
+    for i in range(s):
+        savings_ut = (rho[i] * hh.exp_sigma_g_y * chi_b *
+                      b_splus1[i] ** (-hh.sigma))
+        if i < s - 1:
+            errors[i] = (MU_c[i] * (1 / (1 + tau_c[i])) - hh.beta *
+                         (1 - rho[i]) * deriv[i + 1] * MU_c[i + 1] *
+                         (1 / (1 + tau_c[i + 1])) * hh.exp_sigma_g_y -
+                         savings_ut)
+        else:
+            errors[i] = MU_c[i] * (1 / (1 + tau_c[i])) - savings_ut
+    return errors, cons
+
+
+@njit(cache=True)
+def euler_errors_SS(b_guess, n_guess, r, w, bq, tr, factor, theta, j, hh):
+    '''
+    Errors from the steady-state FOCs for one lifetime income group,
+    with the constraint penalties of SS.euler_equation_solver.
+
+    Args:
+        b_guess (Numpy array): savings, length S
+        n_guess (Numpy array): labor supply, length S
+        r (scalar): real interest rate
+        w (scalar): real wage rate
+        bq (Numpy array): bequest amounts by age, length S
+        tr (Numpy array): government transfer amount by age, length S
+        factor (scalar): scaling factor converting model units to dollars
+        theta (scalar): social security replacement rate for group j
+        j (int): index of ability type
+        hh (HHParams): compiled kernel parameters
+
+    Returns:
+        errors (Numpy array): errors from FOCs, length 2S
+
+    '''
+    S = hh.S
+    b_s = np.empty(S)
+    b_s[0] = 0.0
+    b_s[1:] = b_guess[:-1]
+    ones = np.ones(S)
+    errors, cons = FOC_errors(
+        r * ones, w * ones, b_s, b_guess, n_guess, bq, factor, tr, theta,
+        hh.retire_ss, hh.e[:, j], hh.rho, hh.chi_b[j], hh.chi_n,
+        hh.tau_c_ss[:, j],
+        hh.etr_params_ss, hh.mtrx_params_ss, hh.mtry_params_ss,
+        hh.tau_payroll_ss * ones, hh.tau_bq_ss * ones,
+        hh.h_wealth_ss * ones, hh.m_wealth_ss * ones,
+        hh.p_wealth_ss * ones, hh.h_wealth_ss, hh.m_wealth_ss,
+        hh.p_wealth_ss, hh)
+    # constraints on consumption, savings and labor supply, see
+    # SS.euler_equation_solver
+    for i in range(S):
+        if b_guess[i] <= 0 or np.isnan(b_guess[i]) or cons[i] < 0:
+            errors[i] = 1e14
+        if (n_guess[i] < 0 or n_guess[i] > hh.ltilde or
+                np.isnan(n_guess[i])):
+            errors[S + i] = 1e14
+    return errors
+
+
+@njit(cache=True)
+def euler_errors_TPI(b_guess, n_guess, b_first, r, w, bq, tr, theta,
+                     factor, j, t, tau_c, etr_params, mtrx_params,
+                     mtry_params, hh):
+    '''
+    Errors from the FOCs along the time path for the remaining lifetime
+    of one cohort, with the constraint penalties of TPI.twist_doughnut.
+
+    Args:
+        b_guess (Numpy array): savings, length s
+        n_guess (Numpy array): labor supply, length s
+        b_first (scalar): savings at the first age solved for
+        r (Numpy array): real interest rate path
+        w (Numpy array): real wage rate path
+        bq (Numpy array): bequest amounts by age, length s
+        tr (Numpy array): government transfer amount by age, length s
+        theta (Numpy array): retirement replacement rates, length J
+        factor (scalar): scaling factor converting model units to dollars
+        j (int): index of ability type
+        t (int): model period
+        tau_c (Numpy array): consumption tax rates, length s
+        etr_params (Numpy array): ETR function parameters, size = sx12
+        mtrx_params (Numpy array): labor income MTR function
+            parameters, size = sx12
+        mtry_params (Numpy array): capital income MTR function
+            parameters, size = sx12
+        hh (HHParams): compiled kernel parameters
+
+    Returns:
+        errors (Numpy array): errors from FOCs, length 2s
+
+    '''
+    length = b_guess.shape[0]
+    b_s = np.empty(length)
+    b_s[0] = b_first
+    b_s[1:] = b_guess[:-1]
+    retire = max(length + hh.retire[t] - hh.S, 0)
+    errors, cons = FOC_errors(
+        r[t:t + length], w[t:t + length], b_s, b_guess, n_guess, bq,
+        factor, tr, theta[j] * hh.replacement_rate_adjust[t], retire,
+        hh.e[-length:, j], hh.rho[-length:], hh.chi_b[j],
+        hh.chi_n[-length:], tau_c, etr_params, mtrx_params, mtry_params,
+        hh.tau_payroll[t:t + length], hh.tau_bq[t:t + length],
+        hh.h_wealth[t:t + length], hh.m_wealth[t:t + length],
+        hh.p_wealth[t:t + length], hh.h_wealth[t], hh.m_wealth[t],
+        hh.p_wealth[t], hh)
+    # constraint penalties, see TPI.twist_doughnut
+    for i in range(length):
+        if n_guess[i] < 0:
+            errors[length + i] += 1e12
+        if n_guess[i] > hh.ltilde:
+            errors[length + i] += 1e12
+        if b_guess[i] <= 0:
+            errors[length + i] += 1e12
+        if b_guess[i] < 0:
+            errors[length + i] += 1e12
+    return errors
@@ -68,6 +68,56 @@ def replacement_rate_vals(nssmat, wss, factor_ss, j, p):
     return theta
 
 
+def replacement_rate_vals_deriv(nssmat, wss, factor_ss, j, p):
+    '''
+    Calculates the derivative of the replacement rate value for the
+    social security system with respect to labor supply at each age.
+    Only the highest earning years used to compute AIME affect the
+    replacement rate, and only when PIA is not at its maximum or
+    minimum payment.
+
+    Args:
+        nssmat (Numpy array): labor supply, length S
+        wss (scalar): steady state real wage rate
+        factor_ss (scalar): scaling factor converting model units to
+            dollars
+        j (int): index of lifetime income group
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        d_theta (Numpy array): derivative of the social security
+            replacement rate value for lifetime income group j with
+            respect to labor supply, length S
+
+    '''
+    e = p.e[:, j]
+    equiv_periods = int(round((p.S / 80.0) * p.AIME_num_years)) - 1
+    earnings = e * (wss * nssmat * factor_ss)
+    highest = np.argsort(-1.0 * earnings[:p.retire[-1]],
+                         kind='stable')[:equiv_periods]
+    AIME = earnings[highest].sum() / ((12.0 * (p.S / 80.0)) *
+                                      equiv_periods)
+    if AIME < p.AIME_bkt_1:
+        PIA = p.PIA_rate_bkt_1 * AIME
+        PIA_rate = p.PIA_rate_bkt_1
+    elif AIME < p.AIME_bkt_2:
+        PIA = (p.PIA_rate_bkt_1 * p.AIME_bkt_1 +
+               p.PIA_rate_bkt_2 * (AIME - p.AIME_bkt_1))
+        PIA_rate = p.PIA_rate_bkt_2
+    else:
+        PIA = (p.PIA_rate_bkt_1 * p.AIME_bkt_1 +
+               p.PIA_rate_bkt_2 * (p.AIME_bkt_2 - p.AIME_bkt_1) +
+               p.PIA_rate_bkt_3 * (AIME - p.AIME_bkt_2))
+        PIA_rate = p.PIA_rate_bkt_3
+    if PIA > p.PIA_maxpayment or (p.PIA_minpayment != 0.0 and
+                                  PIA < p.PIA_minpayment):
+        PIA_rate = 0.0
+    d_theta = np.zeros(p.S)
+    # the scaling of earnings to AIME and of PIA to theta cancel
+    d_theta[highest] = PIA_rate * e[highest] / equiv_periods
+    return d_theta
+
+
 def ETR_wealth(b, h_wealth, m_wealth, p_wealth):
     r'''
     Calculates the effective tax rate on wealth.
@@ -112,6 +162,30 @@ def MTR_wealth(b, h_wealth, m_wealth, p_wealth):
     return tau_prime
 
 
+def MTR_wealth_deriv(b, h_wealth, m_wealth, p_wealth):
+    r'''
+    Calculates the derivative of the marginal tax rate on wealth with
+    respect to savings.
+
+    .. math::
+        \frac{\partial^{2} T_{j,s,t}^{w}}{\partial b_{j,s,t}^{2}} = \frac{2h^{w}(m^{w})^{2}p_{w}}{(b_{j,s,t}h^{w} + m^{w})^{3}}
+
+    Args:
+        b (Numpy array): savings
+        h_wealth (scalar): parameter of wealth tax function
+        p_wealth (scalar): parameter of wealth tax function
+        m_wealth (scalar): parameter of wealth tax function
+
+    Returns:
+        tau_prime_deriv (Numpy array): derivative of the marginal tax
+            rate on wealth
+
+    '''
+    tau_prime_deriv = ((2 * h_wealth * (m_wealth ** 2) * p_wealth) /
+                       ((b * h_wealth + m_wealth) ** 3))
+    return tau_prime_deriv
+
+
 def ETR_income(r, w, b, n, factor, e, etr_params, p):
     '''
     Calculates effective personal income tax rate.
@@ -305,6 +379,232 @@ def MTR_income(r, w, b, n, factor, mtr_capital, e, etr_params,
     return tau
 
 
+def _GS_derivs(income, params):
+    '''
+    Evaluates the GS tax function and its derivatives at total income.
+
+    Args:
+        income (Numpy array): total income in dollars
+        params (Numpy array): GS tax function parameters
+
+    Returns:
+        (tuple): effective and marginal tax rates:
+
+            * etr (Numpy array): effective tax rate
+            * d_etr (Numpy array): derivative of the effective tax rate
+            * mtr (Numpy array): marginal tax rate
+            * d_mtr (Numpy array): derivative of the marginal tax rate
+
+    '''
+    phi0 = np.squeeze(params[..., 0])
+    phi1 = np.squeeze(params[..., 1])
+    phi2 = np.squeeze(params[..., 2])
+    inner = (income ** -phi1) + phi2
+    etr = (phi0 * (income - inner ** (-1 / phi1))) / income
+    mtr = (phi0*(1 - (income ** (-phi1 - 1) *
+                      inner ** ((-1 - phi1) / phi1))))
+    d_etr = (mtr - etr) / income
+    d_mtr = (phi0 * (1 + phi1) * phi2 * income ** (-phi1 - 2) *
+             inner ** ((-1 - 2 * phi1) / phi1))
+    return etr, d_etr, mtr, d_mtr
+
+
+def _DEP_totalinc_derivs(income, params):
+    '''
+    Evaluates the DEP_totalinc tax function and its first and second
+    derivatives at total income.
+
+    Args:
+        income (Numpy array): total income in dollars
+        params (Numpy array): DEP_totalinc tax function parameters
+
+    Returns:
+        (tuple): tax rate and derivatives:
+
+            * tau (Numpy array): tax rate
+            * d_tau (Numpy array): first derivative of the tax rate
+            * d2_tau (Numpy array): second derivative of the tax rate
+
+    '''
+    A = np.squeeze(params[..., 0])
+    B = np.squeeze(params[..., 1])
+    max_income = np.squeeze(params[..., 4])
+    min_income = np.squeeze(params[..., 5])
+    shift_income = np.squeeze(params[..., 8])
+    shift = np.squeeze(params[..., 10])
+    g = A * income ** 2 + B * income
+    g1 = 2 * A * income + B
+    tau = ((max_income - min_income) * g / (g + 1) + min_income +
+           shift_income + shift)
+    d_tau = (max_income - min_income) * g1 / ((g + 1) ** 2)
+    d2_tau = ((max_income - min_income) * (2 * A * (g + 1) - 2 * g1 ** 2)
+              / ((g + 1) ** 3))
+    return tau, d_tau, d2_tau
+
+
+def _DEP_derivs(X, Y, params):
+    '''
+    Evaluates the DEP (or linear) tax function and its first and
+    second derivatives with respect to labor income, X, and capital
+    income, Y.
+
+    Args:
+        X (Numpy array): labor income in dollars
+        Y (Numpy array): capital income in dollars
+        params (Numpy array): DEP tax function parameters
+
+    Returns:
+        (tuple): tax rate and derivatives:
+
+            * tau (Numpy array): tax rate
+            * tau_X (Numpy array): derivative with respect to X
+            * tau_Y (Numpy array): derivative with respect to Y
+            * tau_XX (Numpy array): second derivative with respect to X
+            * tau_XY (Numpy array): cross derivative
+            * tau_YY (Numpy array): second derivative with respect to Y
+
+    '''
+    A = np.squeeze(params[..., 0])
+    B = np.squeeze(params[..., 1])
+    C = np.squeeze(params[..., 2])
+    D = np.squeeze(params[..., 3])
+    max_x = np.squeeze(params[..., 4])
+    min_x = np.squeeze(params[..., 5])
+    max_y = np.squeeze(params[..., 6])
+    min_y = np.squeeze(params[..., 7])
+    shift_x = np.squeeze(params[..., 8])
+    shift_y = np.squeeze(params[..., 9])
+    shift = np.squeeze(params[..., 10])
+    share = np.squeeze(params[..., 11])
+
+    gx = A * X ** 2 + B * X
+    gx1 = 2 * A * X + B
+    gy = C * Y ** 2 + D * Y
+    gy1 = 2 * C * Y + D
+    U = (max_x - min_x) * gx / (gx + 1) + min_x + shift_x
+    V = (max_y - min_y) * gy / (gy + 1) + min_y + shift_y
+    U_X = (max_x - min_x) * gx1 / ((gx + 1) ** 2)
+    V_Y = (max_y - min_y) * gy1 / ((gy + 1) ** 2)
+    U_XX = ((max_x - min_x) * (2 * A * (gx + 1) - 2 * gx1 ** 2) /
+            ((gx + 1) ** 3))
+    V_YY = ((max_y - min_y) * (2 * C * (gy + 1) - 2 * gy1 ** 2) /
+            ((gy + 1) ** 3))
+    # derivatives of U ** share and V ** (1 - share), which are zero
+    # where the exponent is zero (e.g., the linear tax function)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Us = U ** share
+        Vs = V ** (1 - share)
+        Us1 = np.where(share != 0, share * U ** (share - 1), 0.0)
+        Vs1 = np.where(share != 1, (1 - share) * V ** (-share), 0.0)
+        Us2 = np.where(share * (share - 1) != 0,
+                       share * (share - 1) * U ** (share - 2), 0.0)
+        Vs2 = np.where(share * (share - 1) != 0,
+                       share * (share - 1) * V ** (-share - 1), 0.0)
+    tau = Us * Vs + shift
+    tau_X = Us1 * U_X * Vs
+    tau_Y = Us * Vs1 * V_Y
+    tau_XX = (Us2 * U_X ** 2 + Us1 * U_XX) * Vs
+    tau_XY = Us1 * U_X * Vs1 * V_Y
+    tau_YY = Us * (Vs2 * V_Y ** 2 + Vs1 * V_YY)
+    return tau, tau_X, tau_Y, tau_XX, tau_XY, tau_YY
+
+
+def ETR_income_deriv(r, w, b, n, factor, e, etr_params, p):
+    '''
+    Calculates the derivatives of the effective personal income tax
+    rate with respect to savings and labor supply.
+
+    Args:
+        r (array_like): real interest rate
+        w (array_like): real wage rate
+        b (Numpy array): savings
+        n (Numpy array): labor supply
+        factor (scalar): scaling factor converting model units to
+            dollars
+        e (Numpy array): effective labor units
+        etr_params (Numpy array): effective tax rate function parameters
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        (tuple): derivatives of the effective tax rate on total income:
+
+            * d_b (Numpy array): with respect to savings
+            * d_n (Numpy array): with respect to labor supply
+
+    '''
+    X = (w * e * n) * factor
+    Y = (r * b) * factor
+    income = X + Y
+
+    if p.tax_func_type == 'GS':
+        d_X = d_Y = _GS_derivs(income, etr_params)[1]
+    elif p.tax_func_type == 'DEP_totalinc':
+        d_X = d_Y = _DEP_totalinc_derivs(income, etr_params)[1]
+    else:  # DEP or linear
+        _, d_X, d_Y, _, _, _ = _DEP_derivs(X, Y, etr_params)
+
+    return d_Y * r * factor, d_X * w * e * factor
+
+
+def MTR_income_deriv(r, w, b, n, factor, mtr_capital, e, etr_params,
+                     mtr_params, p):
+    '''
+    Calculates the derivatives of the marginal tax rate on labor or
+    capital income returned by MTR_income with respect to savings and
+    labor supply.
+
+    Args:
+        r (array_like): real interest rate
+        w (array_like): real wage rate
+        b (Numpy array): savings
+        n (Numpy array): labor supply
+        factor (scalar): scaling factor converting model units to
+            dollars
+        mtr_capital (bool): whether to compute the marginal tax rate on
+            capital income or labor income
+        e (Numpy array): effective labor units
+        etr_params (Numpy array): effective tax rate function parameters
+        mtr_params (Numpy array): marginal tax rate function parameters
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        (tuple): derivatives of the marginal tax rate on income source:
+
+            * d_b (Numpy array): with respect to savings
+            * d_n (Numpy array): with respect to labor supply
+
+    '''
+    X = (w * e * n) * factor
+    Y = (r * b) * factor
+    income = X + Y
+
+    if p.tax_func_type == 'GS':
+        if p.analytical_mtrs:
+            d_X = d_Y = _GS_derivs(income, etr_params)[3]
+        else:
+            d_X = d_Y = _GS_derivs(income, mtr_params)[3]
+    elif p.tax_func_type == 'DEP_totalinc':
+        if p.analytical_mtrs:
+            _, d_tau, d2_tau = _DEP_totalinc_derivs(income, etr_params)
+            d_X = d_Y = d2_tau * income + 2 * d_tau
+        else:
+            d_X = d_Y = _DEP_totalinc_derivs(income, mtr_params)[1]
+    else:  # DEP or linear
+        if p.analytical_mtrs:
+            _, tau_X, tau_Y, tau_XX, tau_XY, tau_YY = _DEP_derivs(
+                X, Y, etr_params)
+            if mtr_capital:
+                d_X = tau_XY * income + tau_X + tau_Y
+                d_Y = tau_YY * income + 2 * tau_Y
+            else:
+                d_X = tau_XX * income + 2 * tau_X
+                d_Y = tau_XY * income + tau_X + tau_Y
+        else:
+            _, d_X, d_Y, _, _, _ = _DEP_derivs(X, Y, mtr_params)
+
+    return d_Y * r * factor, d_X * w * e * factor
+
+
 def get_biz_tax(w, Y, L, K, p, method):
     r'''
     Finds total business income tax revenue.
@@ -442,3 +742,73 @@ def total_taxes(r, w, b, n, bq, factor, tr, theta, t, j, shift, method,
     total_tax = T_I + T_P + T_BQ + T_W - tr
 
     return total_tax
+
+
+def total_taxes_deriv(r, w, b, n, bq, factor, tr, theta, t, j, shift,
+                      method, e, etr_params, p):
+    '''
+    Calculate the derivatives of net taxes paid by a household with
+    respect to its savings, labor supply, and social security
+    replacement rate.  This is for the savings and labor supply of one
+    lifetime income group over its lifetime, as used in solving the
+    household problem.
+
+    Args:
+        r (array_like): real interest rate
+        w (array_like): real wage rate
+        b (Numpy array): savings
+        n (Numpy array): labor supply
+        bq (Numpy array): bequests received
+        factor (scalar): scaling factor converting model units to
+            dollars
+        tr (Numpy array): government transfers to the household
+        theta (Numpy array): social security replacement rate value for
+            lifetime income group j
+        t (int): time period
+        j (int): index of lifetime income group
+        shift (bool): whether computing for periods 0--s or 1--(s+1),
+            =True for 1--(s+1)
+        method (str): adjusts calculation dimensions based on 'SS' or
+            'TPI'
+        e (Numpy array): effective labor units
+        etr_params (Numpy array): effective tax rate function parameters
+        p (OG-USA Specifications object): model parameters
+
+    Returns:
+        (tuple): derivatives of net taxes paid by age:
+
+            * d_b (Numpy array): with respect to savings
+            * d_n (Numpy array): with respect to labor supply
+            * d_theta (Numpy array): with respect to the replacement
+                rate of lifetime income group j
+
+    '''
+    income = r * b + w * e * n
+    etr = ETR_income(r, w, b, n, factor, e, etr_params, p)
+    etr_b, etr_n = ETR_income_deriv(r, w, b, n, factor, e, etr_params, p)
+    d_b = etr_b * income + etr * r
+    d_n = etr_n * income + etr * w * e
+    d_theta = np.zeros(n.shape)
+
+    if method == 'SS':
+        d_n = d_n + p.tau_payroll[-1] * w * e
+        d_b = d_b + MTR_wealth(b, p.h_wealth[-1], p.m_wealth[-1],
+                               p.p_wealth[-1])
+        if shift is False:
+            d_theta[p.retire[-1]:] = -w
+        else:
+            d_theta[p.retire[-1] - 1:] = -w
+    elif method == 'TPI':
+        length = w.shape[0]
+        d_n = d_n + p.tau_payroll[t: t + length] * w * e
+        d_b = d_b + MTR_wealth(b, p.h_wealth[t:t + length],
+                               p.m_wealth[t:t + length],
+                               p.p_wealth[t:t + length])
+        if not shift:
+            retireTPI = p.retire[t] - p.S
+        else:
+            retireTPI = p.retire[t] - 1 - p.S
+        d_theta[retireTPI:] = (-p.replacement_rate_adjust[t] *
+                               w[retireTPI:])
+
+    return d_b, d_n, d_theta
@@ -7,6 +7,7 @@ from distributed import Client, LocalCluster
 import pytest
 import numpy as np
 import os
+import pickle
 from ogusa import SS, utils, aggregates, household, execute, constants
 from ogusa.parameters import Specifications
 CUR_PATH = os.path.abspath(os.path.dirname(__file__))
@@ -334,6 +335,9 @@ filename4 = 'SS_solver_outputs_baseline_small_open.pkl'
 param_updates5 = {'zeta_K': [1.0], 'budget_balance': True,
                   'alpha_G': [0.0]}
 filename5 = 'SS_solver_outputs_baseline_small_open_budget_balance.pkl'
+param_updates6 = {'budget_balance': True, 'alpha_G': [0.0],
+                  'SS_solver': 'anderson'}
+filename6 = 'SS_solver_outputs_baseline_budget_balance.pkl'
 
 
 @pytest.mark.parametrize('baseline,param_updates,filename',
@@ -341,11 +345,13 @@ filename5 = 'SS_solver_outputs_baseline_small_open_budget_balance.pkl'
                           (True, param_updates2, filename2),
                           # (False, param_updates3, filename3),
                           (True, param_updates4, filename4),
-                          (True, param_updates5, filename5)],
+                          (True, param_updates5, filename5),
+                          (True, param_updates6, filename6)],
                          ids=['Baseline', 'Baseline, budget balance',
                               # 'Reform, baseline spending=True',
                               'Baseline, small open',
-                              'Baseline, small open, budget balance'])
+                              'Baseline, small open, budget balance',
+                              'Baseline, budget balance, Anderson'])
 def test_SS_solver(baseline, param_updates, filename, dask_client):
     # Test SS.SS_solver function.  Provide inputs to function and
     # ensure that output returned matches what it has been before.
@@ -385,6 +391,8 @@ param_updates4 = {}
 filename4 = 'inner_loop_outputs_reform.pkl'
 param_updates5 = {'baseline_spending': True}
 filename5 = 'inner_loop_outputs_reform_baselinespending.pkl'
+param_updates6 = {'hh_backend': 'numba'}
+filename6 = 'inner_loop_outputs_baseline.pkl'
 
 
 @pytest.mark.parametrize('baseline,param_updates,filename',
@@ -392,11 +400,13 @@ filename5 = 'inner_loop_outputs_reform_baselinespending.pkl'
                           (True, param_updates2, filename2),
                           (True, param_updates3, filename3),
                           (False, param_updates4, filename4),
-                          (False, param_updates5, filename5)],
+                          (False, param_updates5, filename5),
+                          (True, param_updates6, filename6)],
                          ids=['Baseline, Small Open',
                               'Baseline, Balanced Budget',
                               'Baseline', 'Reform',
-                              'Reform, baseline spending'])
+                              'Reform, baseline spending',
+                              'Baseline, compiled kernels'])
 def test_inner_loop(baseline, param_updates, filename, dask_client):
     # Test SS.inner_loop function.  Provide inputs to function and
     # ensure that output returned matches what it has been before.
@@ -513,6 +523,58 @@ def test_euler_equation_solver(dask_client):
     assert(np.allclose(np.array(test_list), np.array(expected_list)))
 
 
+def test_euler_equation_jacobian(dask_client):
+    # Test SS.euler_equation_jacobian function.  Ensure that the
+    # Jacobian matches central differences of the errors from
+    # SS.euler_equation_solver.
+    input_tuple = utils.safe_read_pickle(
+        os.path.join(CUR_PATH, 'test_io_data', 'euler_eqn_solver_inputs.pkl'))
+    (guesses, params) = input_tuple
+    p = Specifications(client=dask_client, num_workers=NUM_WORKERS)
+    (r, w, TR, factor, j, p.J, p.S, p.beta, p.sigma, p.ltilde, p.g_y,
+     p.g_n_ss, tau_payroll, retire, p.mean_income_data, h_wealth,
+     p_wealth, m_wealth, p.b_ellipse, p.upsilon, j, p.chi_b,
+     p.chi_n, tau_bq, p.rho, lambdas, p.omega_SS, p.e,
+     p.analytical_mtrs, etr_params, mtrx_params, mtry_params) = params
+    p.eta = (p.omega_SS.reshape(p.S, 1) *
+             p.lambdas.reshape(1, p.J)).reshape(1, p.S, p.J)
+    p.tau_bq = np.ones(p.T + p.S) * 0.0
+    p.tau_payroll = np.ones(p.T + p.S) * tau_payroll
+    p.h_wealth = np.ones(p.T + p.S) * h_wealth
+    p.p_wealth = np.ones(p.T + p.S) * p_wealth
+    p.m_wealth = np.ones(p.T + p.S) * m_wealth
+    p.retire = (np.ones(p.T + p.S) * retire).astype(int)
+    p.etr_params = np.transpose(etr_params.reshape(
+        p.S, 1, etr_params.shape[-1]), (1, 0, 2))
+    p.mtrx_params = np.transpose(mtrx_params.reshape(
+        p.S, 1, mtrx_params.shape[-1]), (1, 0, 2))
+    p.mtry_params = np.transpose(mtry_params.reshape(
+        p.S, 1, mtry_params.shape[-1]), (1, 0, 2))
+    p.tax_func_type = 'DEP'
+    p.lambdas = lambdas.reshape(p.J, 1)
+    b_splus1 = np.array(guesses[:p.S]).reshape(p.S, 1) + 0.005
+    BQ = aggregates.get_BQ(r, b_splus1, j, p, 'SS', False)
+    bq = household.get_bq(BQ, j, p, 'SS')
+    tr = household.get_tr(TR, j, p, 'SS')
+    args = (r, w, bq, tr, factor, j, p)
+    guesses = np.array(guesses, dtype=float)
+    test_jac = SS.euler_equation_jacobian(guesses, *args)
+
+    expected_jac = np.zeros((2 * p.S, 2 * p.S))
+    for i in range(2 * p.S):
+        h = 1e-6 * max(abs(guesses[i]), 1e-2)
+        guesses_up = guesses.copy()
+        guesses_up[i] += h
+        guesses_down = guesses.copy()
+        guesses_down[i] -= h
+        expected_jac[:, i] = (
+            (SS.euler_equation_solver(guesses_up, *args) -
+             SS.euler_equation_solver(guesses_down, *args)) / (2 * h))
+
+    assert(np.allclose(test_jac, expected_jac, rtol=1e-5,
+                       atol=1e-8 * np.absolute(expected_jac).max()))
+
+
 param_updates1 = {}
 filename1 = 'run_SS_baseline_outputs.pkl'
 param_updates2 = {'use_zeta': True}
@@ -596,3 +658,27 @@ def test_run_SS(baseline, param_updates, filename, dask_client):
 
     for k, v in expected_dict.items():
         assert(np.allclose(test_dict[k], v))
+
+
+@pytest.mark.full_run
+def test_run_SS_anderson_reform_new_dimensions(tmp_path, monkeypatch):
+    # Test that SS.run_SS solves a reform with the Anderson solver when
+    # the dimensions of the baseline steady state do not match.
+    baseline_dir = str(tmp_path)
+    utils.mkdirs(os.path.join(baseline_dir, 'SS'))
+    with open(os.path.join(baseline_dir, 'SS', 'SS_vars.pkl'), 'wb') as f:
+        pickle.dump({'bssmat_splus1': np.ones((1, 1))}, f)
+    p = Specifications(baseline=False, test=True,
+                       baseline_dir=baseline_dir, output_base=baseline_dir)
+    p.update_specifications({'SS_solver': 'anderson'})
+    p.get_tax_function_parameters(
+        None, run_micro=False,
+        tax_func_path=os.path.join(
+            CUR_PATH, '..', 'data', 'tax_functions',
+            'TxFuncEst_baseline_CPS.pkl'))
+    monkeypatch.setattr(SS, 'ENFORCE_SOLUTION_CHECKS', False)
+    test_dict = SS.run_SS(p, None)
+
+    assert test_dict['bssmat_splus1'].shape == (p.S, p.J)
+    assert np.isfinite(test_dict['rss'])
+    assert test_dict['factor_ss'] > 0
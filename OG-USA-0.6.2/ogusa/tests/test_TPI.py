@@ -133,6 +133,116 @@ def test_twist_doughnut(file_inputs, file_outputs):
     assert(np.allclose(np.array(test_list), np.array(expected_list)))
 
 
+def test_twist_doughnut_cohorts():
+    '''
+    Test TPI.twist_doughnut_cohorts function.  Ensure that the errors
+    for each cohort match those from TPI.twist_doughnut, that their
+    Jacobians match those from TPI.twist_doughnut_jacobian and finite
+    differences, and that TPI.solve_cohorts finds savings and labor
+    supply that set them to zero.
+    '''
+    p = Specifications(test=True)
+    p.get_tax_function_parameters(
+        None, run_micro=False,
+        tax_func_path=os.path.join(
+            CUR_PATH, '..', 'data', 'tax_functions',
+            'TxFuncEst_baseline_CPS.pkl'))
+    j = 1
+    factor = 100000.0
+    initial_b = np.linspace(0.01, 0.5, p.S)
+    r = 0.05 + 0.01 * np.sin(np.arange(p.T + p.S))
+    w = np.ones(p.T + p.S)
+    theta = np.ones(p.J) * 0.2
+    bq = utils.get_cohort_diagonals(np.ones((p.T + p.S, p.S)) * 0.01, p.S)
+    tr = utils.get_cohort_diagonals(np.ones((p.T + p.S, p.S)) * 0.02, p.S)
+    tau_c, etr_params, mtrx_params, mtry_params = TPI.get_cohort_params(p)
+    # the first two cohorts in the upper triangle and the first cohort
+    # that lives its whole life in the model
+    cohorts = np.array([1, 2, p.S - 1])
+    start = cohorts - (p.S - 1)
+    t = np.maximum(start, 0)
+    ages = np.maximum(-start, 0)
+    solved = np.arange(p.S).reshape(1, p.S) >= ages.reshape(-1, 1)
+    b = np.where(solved, 0.2, initial_b)
+    n = np.ones_like(b) * 0.4
+    theta_to_use = theta[j] * p.replacement_rate_adjust[t + j]
+
+    def errors_func(b, n, rows):
+        return TPI.twist_doughnut_cohorts(
+            b, n, r, w, bq[cohorts[rows]], tr[cohorts[rows]],
+            theta_to_use[rows], factor, j, t[rows], ages[rows],
+            tau_c[cohorts[rows], :, j], etr_params[cohorts[rows]],
+            mtrx_params[cohorts[rows]], mtry_params[cohorts[rows]], p)
+
+    def jacobian_func(b, n, rows):
+        return TPI.twist_doughnut_cohorts_jacobian(
+            b, n, r, w, bq[cohorts[rows]], tr[cohorts[rows]],
+            theta_to_use[rows], factor, j, t[rows], ages[rows],
+            tau_c[cohorts[rows], :, j], etr_params[cohorts[rows]],
+            mtrx_params[cohorts[rows]], mtry_params[cohorts[rows]], p)
+
+    rows = np.arange(len(cohorts))
+    test_errors = errors_func(b, n, rows)
+    test_jac = jacobian_func(b, n, rows)
+    fd_jac = TPI.cohort_jacobian(errors_func, b, n, test_errors, rows)
+    assert(np.allclose(test_jac, fd_jac, rtol=1e-4,
+                       atol=1e-6 * np.absolute(fd_jac).max()))
+    for c, row in enumerate(cohorts):
+        age0 = ages[c]
+        s = p.S - age0 - 2 if start[c] < 0 else None
+        args = (r, w, bq[row, age0:], tr[row, age0:],
+                theta[j] * p.replacement_rate_adjust[t[c]:t[c] + p.S],
+                factor, j, s, t[c], tau_c[row, age0:, j],
+                etr_params[row, age0:], mtrx_params[row, age0:],
+                mtry_params[row, age0:],
+                np.tile(initial_b.reshape(p.S, 1), (1, p.J)), p)
+        guesses = list(b[c, age0:]) + list(n[c, age0:])
+        expected_list = TPI.twist_doughnut(guesses, *args)
+        assert(np.allclose(
+            np.append(test_errors[c, age0:p.S],
+                      test_errors[c, p.S + age0:]),
+            np.array(expected_list)))
+        solved_c = np.append(solved[c], solved[c])
+        assert(np.allclose(test_jac[c][solved_c][:, solved_c],
+                           TPI.twist_doughnut_jacobian(guesses, *args)))
+
+    b, n, errors, converged = TPI.solve_cohorts(errors_func, b, n,
+                                                solved, p, jacobian_func)
+    assert(converged.all())
+    assert(np.absolute(errors).max() < 1e-8)
+
+
+def test_get_baseline_path_guess():
+    '''
+    Test TPI.get_baseline_path_guess function.  Ensure that the guess
+    starts at the baseline path, is shifted by the change in the steady
+    state with the weights of the 'ratio' initial path and ends at the
+    reform steady state.
+    '''
+    p = Specifications(test=True)
+    ss_base = np.linspace(0.1, 0.2, p.S * p.J).reshape(p.S, p.J)
+    ss_reform = ss_base * 1.05
+    x1 = ss_base * 0.8
+    base_path = utils.get_initial_path(x1, ss_base, p, 'ratio')
+    test_path = TPI.get_baseline_path_guess(base_path[:p.T], ss_base,
+                                            ss_reform, p)
+    # the 'ratio' path between the same points also moves from x1 to
+    # the steady state with these weights
+    expected_path = (base_path +
+                     utils.get_initial_path(x1, ss_reform, p, 'ratio') -
+                     utils.get_initial_path(x1, ss_base, p, 'ratio'))
+    assert(test_path.shape == (p.T + p.S, p.S, p.J))
+    assert(np.allclose(test_path[0], base_path[0]))
+    assert(np.allclose(test_path[p.T:], ss_reform))
+    assert(np.allclose(test_path, expected_path))
+    # scalar steady states, as for r
+    r_base = np.ones(p.T + p.S) * 0.05
+    test_r = TPI.get_baseline_path_guess(r_base, 0.05, 0.055, p)
+    assert(test_r.shape == (p.T + p.S,))
+    assert(np.allclose(test_r[0], 0.05))
+    assert(np.allclose(test_r[p.T:], 0.055))
+
+
 @pytest.mark.full_run
 def test_inner_loop(dask_client):
     # Test TPI.inner_loop function.  Provide inputs to function and
@@ -340,6 +450,81 @@ def test_run_TPI(baseline, param_updates, filename, tmp_path,
                                atol=1e-04))
 
 
+def test_run_TPI_resume(tmp_path, dask_client):
+    '''
+    Test that TPI.run_TPI resumed from the checkpoint of a run stopped
+    after one iteration returns the output of a run of two iterations.
+    '''
+    output_base = str(tmp_path)
+    p = Specifications(baseline=True, baseline_dir=output_base,
+                       output_base=output_base, test=True,
+                       client=dask_client, num_workers=NUM_WORKERS)
+    p.update_specifications({'TPI_checkpoint_interval': 1})
+    p.get_tax_function_parameters(
+        None, run_micro=False,
+        tax_func_path=os.path.join(
+            CUR_PATH, '..', 'data', 'tax_functions',
+            'TxFuncEst_baseline_CPS.pkl'))
+    SS.ENFORCE_SOLUTION_CHECKS = False
+    ss_outputs = SS.run_SS(p, None)
+    utils.mkdirs(os.path.join(output_base, "SS"))
+    with open(os.path.join(output_base, "SS", "SS_vars.pkl"), "wb") as f:
+        pickle.dump(ss_outputs, f)
+
+    TPI.ENFORCE_SOLUTION_CHECKS = False
+    p.maxiter = 1
+    TPI.run_TPI(p, None)
+    assert os.path.exists(
+        os.path.join(output_base, "TPI", "TPI_checkpoint.npz"))
+    p.maxiter = 2
+    test_dict = TPI.run_TPI(p, None, resume=True)
+    expected_dict = utils.safe_read_pickle(
+        os.path.join(CUR_PATH, 'test_io_data',
+                     'run_TPI_outputs_baseline_2.pkl'))
+
+    for k, v in expected_dict.items():
+        try:
+            assert(np.allclose(test_dict[k], v, rtol=1e-04, atol=1e-04))
+        except ValueError:
+            assert(np.allclose(test_dict[k], v[:p.T, :, :], rtol=1e-04,
+                               atol=1e-04))
+    # the checkpoint is removed once the solution converges
+    p.maxiter = 3
+    p.mindist_TPI = 1.0
+    TPI.run_TPI(p, None, resume=True)
+    assert not os.path.exists(
+        os.path.join(output_base, "TPI", "TPI_checkpoint.npz"))
+
+
+def test_load_checkpoint_other_model(tmp_path):
+    '''
+    Test that TPI.load_checkpoint does not return the state saved for a
+    model with a different baseline flag or parameters.
+    '''
+    output_base = str(tmp_path)
+    p = Specifications(baseline=True, output_base=output_base, test=True)
+    p.get_tax_function_parameters(
+        None, run_micro=False,
+        tax_func_path=os.path.join(
+            CUR_PATH, '..', 'data', 'tax_functions',
+            'TxFuncEst_baseline_CPS.pkl'))
+    state = {k: np.zeros(1) for k in TPI.CHECKPOINT_VARS}
+    state['guesses_b'] = np.zeros((p.T + p.S, p.S, p.J))
+    state['TPIiter'] = 3
+    state['TPIdist'] = 0.1
+    TPI.save_checkpoint(state, p)
+    # solver control parameters may change between runs
+    p.maxiter = 50
+    assert TPI.load_checkpoint(p)['TPIiter'] == 3
+    p.baseline = False
+    with pytest.warns(UserWarning, match='different baseline'):
+        assert TPI.load_checkpoint(p) is None
+    p.baseline = True
+    p.update_specifications({'cit_rate': [0.3]})
+    with pytest.warns(UserWarning, match='different baseline'):
+        assert TPI.load_checkpoint(p) is None
+
+
 param_updates5 = {'zeta_K': [1.0]}
 filename5 = os.path.join(CUR_PATH, 'test_io_data',
                          'run_TPI_outputs_baseline_small_open_2.pkl')
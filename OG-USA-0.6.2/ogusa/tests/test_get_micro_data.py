@@ -200,6 +200,24 @@ def test_taxcalc_advance():
         assert np.allclose(expected_dict[k], v, equal_nan=True)
 
 
+def test_taxcalc_outputs():
+    '''
+    Test of the get_micro_data.taxcalc_outputs() function with a
+    calculator aged one year at a time
+    '''
+    expected_dict = utils.safe_read_pickle(os.path.join(
+        CUR_PATH, 'test_io_data', 'tax_dict_for_tests.pkl'))
+    calc1 = get_micro_data.get_calculator(
+        baseline=True, calculator_start_year=2028, reform={},
+        data='cps')
+    for year in range(CPS_START_YEAR, 2029):
+        calc1.advance_to_year(year)
+    test_dict = get_micro_data.taxcalc_outputs(calc1)
+    del test_dict['payroll_tax_liab']
+    for k, v in test_dict.items():
+        assert np.allclose(expected_dict[k], v, equal_nan=True)
+
+
 @pytest.mark.full_run
 def test_cap_inc_mtr():
     '''
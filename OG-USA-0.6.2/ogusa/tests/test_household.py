@@ -66,6 +66,34 @@ def test_marg_ut_labor(n, params, expected):
     assert np.allclose(test_value, expected)
 
 
+@pytest.mark.parametrize('n,params,expected', test_data,
+                         ids=['1', '2', '3', '4', '5', '6', '7', '8'])
+def test_marg_ut_labor_deriv(n, params, expected):
+    # Test derivative of marginal utility of labor against central
+    # differences
+    h = 1e-8
+    test_value = household.marg_ut_labor_deriv(n, params.chi_n, params)
+    expected_deriv = (
+        (household.marg_ut_labor(n + h, params.chi_n, params) -
+         household.marg_ut_labor(n - h, params.chi_n, params)) / (2 * h))
+
+    assert np.allclose(test_value, expected_deriv, rtol=1e-4)
+
+
+@pytest.mark.parametrize('c,sigma', [(0.1, 1), (0.001, 2.5),
+                                     (np.array([0.5, 6.2, 1.5]), 3.2)],
+                         ids=['Scalar', 'Constrained', 'Vector'])
+def test_marg_ut_cons_deriv(c, sigma):
+    # Test derivative of marginal utility of consumption against
+    # central differences
+    h = 1e-8 * np.maximum(c, 0.003)
+    test_value = household.marg_ut_cons_deriv(c, sigma)
+    expected = ((household.marg_ut_cons(c + h, sigma) -
+                 household.marg_ut_cons(c - h, sigma)) / (2 * h))
+
+    assert np.allclose(test_value, expected, rtol=1e-5)
+
+
 p1 = Specifications()
 p1.zeta = np.array([[0.1, 0.3], [0.15, 0.4], [0.05, 0.0]])
 p1.S = 3
@@ -0,0 +1,182 @@
+'''
+Test of compiled household and tax kernels
+'''
+
+import pytest
+import numpy as np
+import os
+from ogusa import kernels, household, tax, aggregates, utils, SS, TPI
+from ogusa.parameters import Specifications
+CUR_PATH = os.path.abspath(os.path.dirname(__file__))
+
+
+def get_euler_inputs():
+    '''
+    Model parameters and arguments of SS.euler_equation_solver, as in
+    test_SS.test_euler_equation_solver.
+    '''
+    input_tuple = utils.safe_read_pickle(
+        os.path.join(CUR_PATH, 'test_io_data', 'euler_eqn_solver_inputs.pkl'))
+    (guesses, params) = input_tuple
+    p = Specifications()
+    (r, w, TR, factor, j, p.J, p.S, p.beta, p.sigma, p.ltilde, p.g_y,
+     p.g_n_ss, tau_payroll, retire, p.mean_income_data, h_wealth,
+     p_wealth, m_wealth, p.b_ellipse, p.upsilon, j, p.chi_b,
+     p.chi_n, tau_bq, p.rho, lambdas, p.omega_SS, p.e,
+     p.analytical_mtrs, etr_params, mtrx_params, mtry_params) = params
+    p.eta = (p.omega_SS.reshape(p.S, 1) *
+             p.lambdas.reshape(1, p.J)).reshape(1, p.S, p.J)
+    p.tau_bq = np.ones(p.T + p.S) * 0.0
+    p.tau_payroll = np.ones(p.T + p.S) * tau_payroll
+    p.h_wealth = np.ones(p.T + p.S) * h_wealth
+    p.p_wealth = np.ones(p.T + p.S) * p_wealth
+    p.m_wealth = np.ones(p.T + p.S) * m_wealth
+    p.retire = (np.ones(p.T + p.S) * retire).astype(int)
+    p.etr_params = np.transpose(etr_params.reshape(
+        p.S, 1, etr_params.shape[-1]), (1, 0, 2))
+    p.mtrx_params = np.transpose(mtrx_params.reshape(
+        p.S, 1, mtrx_params.shape[-1]), (1, 0, 2))
+    p.mtry_params = np.transpose(mtry_params.reshape(
+        p.S, 1, mtry_params.shape[-1]), (1, 0, 2))
+    p.tax_func_type = 'DEP'
+    p.lambdas = lambdas.reshape(p.J, 1)
+    b_splus1 = np.array(guesses[:p.S]).reshape(p.S, 1) + 0.005
+    BQ = aggregates.get_BQ(r, b_splus1, j, p, 'SS', False)
+    bq = household.get_bq(BQ, j, p, 'SS')
+    tr = household.get_tr(TR, j, p, 'SS')
+    args = (r, w, bq, tr, factor, j, p)
+    return np.array(guesses, dtype=float), args
+
+
+def set_GS_params(p):
+    '''
+    Replace the tax function parameters with GS parameters.
+    '''
+    etr_params = np.zeros_like(p.etr_params)
+    etr_params[..., 0] = 0.4
+    etr_params[..., 1] = 0.8
+    etr_params[..., 2] = 0.0001
+    mtr_params = etr_params.copy()
+    mtr_params[..., 0] = 0.45
+    p.etr_params = etr_params
+    p.mtrx_params = mtr_params
+    p.mtry_params = mtr_params
+
+
+def test_marg_ut():
+    # Test that the compiled marginal utilities match those in the
+    # household module, including the extrapolations near the bounds
+    guesses, (r, w, bq, tr, factor, j, p) = get_euler_inputs()
+    hh = kernels.get_hh_params(p)
+    c = np.array([-0.01, 0.001, 0.003, 0.5, 1.0, 20.0])
+    n = np.array([-0.01, 0.0000005, 0.3, 0.9, p.ltilde - 0.0000005,
+                  p.ltilde + 0.01])
+    chi_n = np.linspace(1.0, 2.0, n.shape[0])
+    test_mu_c = np.array([kernels.marg_ut_cons(x, hh) for x in c])
+    test_mu_n = np.array([kernels.marg_ut_labor(x, y, hh)
+                          for x, y in zip(n, chi_n)])
+
+    assert(np.allclose(test_mu_c, household.marg_ut_cons(c, p.sigma)))
+    assert(np.allclose(test_mu_n, household.marg_ut_labor(n, chi_n, p)))
+
+
+@pytest.mark.parametrize('tax_func_type', ['DEP', 'DEP_totalinc', 'GS'])
+@pytest.mark.parametrize('analytical_mtrs', [True, False],
+                         ids=['analytical MTRs', 'estimated MTRs'])
+def test_income_tax_rates(tax_func_type, analytical_mtrs):
+    # Test that the compiled income tax rates match those in the tax
+    # module
+    guesses, (r, w, bq, tr, factor, j, p) = get_euler_inputs()
+    p.tax_func_type = tax_func_type
+    p.analytical_mtrs = analytical_mtrs
+    if tax_func_type == 'GS':
+        set_GS_params(p)
+    hh = kernels.get_hh_params(p)
+    b = guesses[:p.S]
+    n = guesses[p.S:]
+    e = p.e[:, j]
+    etr_params = p.etr_params[-1, :, :]
+    mtrx_params = p.mtrx_params[-1, :, :]
+    mtry_params = p.mtry_params[-1, :, :]
+    X = (w * e * n) * factor
+    Y = (r * b) * factor
+    test_etr = np.array([kernels.ETR_income(X[s], Y[s], etr_params[s],
+                                            hh.tax_func)
+                         for s in range(p.S)])
+    test_mtrx = np.array([kernels.MTR_income(
+        X[s], Y[s], etr_params[s], mtrx_params[s], False, hh)
+        for s in range(p.S)])
+    test_mtry = np.array([kernels.MTR_income(
+        X[s], Y[s], etr_params[s], mtry_params[s], True, hh)
+        for s in range(p.S)])
+
+    assert(np.allclose(test_etr, tax.ETR_income(
+        r, w, b, n, factor, e, etr_params, p)))
+    assert(np.allclose(test_mtrx, tax.MTR_income(
+        r, w, b, n, factor, False, e, etr_params, mtrx_params, p)))
+    assert(np.allclose(test_mtry, tax.MTR_income(
+        r, w, b, n, factor, True, e, etr_params, mtry_params, p)))
+
+
+@pytest.mark.parametrize('tax_func_type', ['DEP', 'DEP_totalinc', 'GS'])
+@pytest.mark.parametrize('analytical_mtrs', [True, False],
+                         ids=['analytical MTRs', 'estimated MTRs'])
+def test_euler_equation_solver_compiled(tax_func_type, analytical_mtrs):
+    # Test that SS.euler_equation_solver_compiled returns the errors of
+    # SS.euler_equation_solver
+    guesses, args = get_euler_inputs()
+    p = args[-1]
+    p.tax_func_type = tax_func_type
+    p.analytical_mtrs = analytical_mtrs
+    if tax_func_type == 'GS':
+        set_GS_params(p)
+    hh = kernels.get_hh_params(p)
+    # include guesses that violate the constraints
+    guesses_list = [guesses,
+                    guesses * np.linspace(0.5, 1.5, 2 * p.S),
+                    guesses * np.where(np.arange(2 * p.S) % 7, 1, -1)]
+    for g in guesses_list:
+        test_list = SS.euler_equation_solver_compiled(g, *args, hh)
+        expected_list = SS.euler_equation_solver(g, *args)
+
+        assert(np.allclose(test_list, expected_list, equal_nan=True))
+
+
+def test_twist_doughnut_compiled():
+    # Test that TPI.twist_doughnut_compiled returns the errors of
+    # TPI.twist_doughnut for cohorts in the upper triangle and cohorts
+    # that live their whole life in the model
+    p = Specifications(test=True)
+    p.get_tax_function_parameters(
+        None, run_micro=False,
+        tax_func_path=os.path.join(
+            CUR_PATH, '..', 'data', 'tax_functions',
+            'TxFuncEst_baseline_CPS.pkl'))
+    hh = kernels.get_hh_params(p)
+    j = 1
+    factor = 100000.0
+    initial_b = np.tile(np.linspace(0.01, 0.5, p.S).reshape(p.S, 1),
+                        (1, p.J))
+    r = 0.05 + 0.01 * np.sin(np.arange(p.T + p.S))
+    w = np.ones(p.T + p.S)
+    theta = np.ones(p.J) * 0.2
+    tau_c, etr_params, mtrx_params, mtry_params = TPI.get_cohort_params(p)
+    for row in [1, p.S - 10, p.S - 1, p.S + 3]:
+        start = row - (p.S - 1)
+        age0 = max(-start, 0)
+        t = max(start, 0)
+        s = p.S - age0 - 2 if start < 0 else None
+        length = p.S - age0
+        bq = np.linspace(0.005, 0.02, length)
+        tr = np.ones(length) * 0.02
+        args = (r, w, bq, tr,
+                theta[j] * p.replacement_rate_adjust[t:t + p.S], factor,
+                j, s, t, tau_c[row, age0:, j], etr_params[row, age0:],
+                mtrx_params[row, age0:], mtry_params[row, age0:],
+                initial_b, p)
+        guesses = np.append(np.linspace(0.1, 0.3, length),
+                            np.linspace(0.45, 0.2, length))
+        test_list = TPI.twist_doughnut_compiled(guesses, *args, hh)
+        expected_list = TPI.twist_doughnut(guesses, *args)
+
+        assert(np.allclose(test_list, np.array(expected_list)))
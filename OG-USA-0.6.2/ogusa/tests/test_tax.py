@@ -55,6 +55,29 @@ def test_replacement_rate_vals(n, w, factor, j, p, expected):
     assert np.allclose(theta, expected)
 
 
+n4 = np.array([0.3, 0.45, 0.4, 0.35])
+
+
+@pytest.mark.parametrize('n,factor,j,p',
+                         [(n4, factor1, 0, p1), (n4, factor3, 1, p3),
+                          (n4, factor4, 0, p3), (n4 * 0.5, factor4, 1, p5)],
+                         ids=['Max PIA case', 'AIME case 2', 'AIME case 3',
+                              'Min PIA case'])
+def test_replacement_rate_vals_deriv(n, factor, j, p):
+    # Test derivative of the replacement rate against finite differences,
+    # with no ties in earnings among the highest earning years
+    test_deriv = tax.replacement_rate_vals_deriv(n, wss, factor, j, p)
+    h = 1e-6
+    expected = np.zeros(p.S)
+    for s in range(p.S):
+        n_h = n.copy()
+        n_h[s] += h
+        expected[s] = ((tax.replacement_rate_vals(n_h, wss, factor, j, p) -
+                        tax.replacement_rate_vals(n, wss, factor, j, p))
+                       / h)
+    assert np.allclose(test_deriv, expected)
+
+
 b1 = np.array([0.1, 0.5, 0.9])
 p1 = Specifications()
 new_param_values = {
@@ -392,6 +415,64 @@ def test_MTR_income(etr_params, mtr_params, params, mtr_capital, expected):
     assert np.allclose(test_mtr, expected)
 
 
+DEP_params = np.array([6e-11, 4e-6, 3e-11, 5e-6, 0.35, -0.1, 0.3, -0.05,
+                       0.12, 0.06, -0.1, 0.7])
+GS_params = np.array([0.35, 0.8, 0.5, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+deriv_data = []
+deriv_ids = []
+for tax_func_type, params in [('DEP', DEP_params),
+                              ('DEP_totalinc', DEP_params),
+                              ('GS', GS_params)]:
+    for analytical_mtrs in [True, False]:
+        p_deriv = Specifications()
+        p_deriv.S = 3
+        p_deriv.J = 1
+        p_deriv.e = np.array([0.5, 0.45, 0.3])
+        p_deriv.tax_func_type = tax_func_type
+        p_deriv.analytical_mtrs = analytical_mtrs
+        etr_params = np.tile(params, (p_deriv.S, 1))
+        mtr_params = np.tile(params * 0.9, (p_deriv.S, 1))
+        for mtr_capital in [True, False]:
+            deriv_data.append((etr_params, mtr_params, p_deriv,
+                               mtr_capital))
+            deriv_ids.append('{}, analytical mtr={}, capital={}'.format(
+                tax_func_type, analytical_mtrs, mtr_capital))
+
+
+@pytest.mark.parametrize('etr_params,mtr_params,params,mtr_capital',
+                         deriv_data, ids=deriv_ids)
+def test_income_tax_derivs(etr_params, mtr_params, params, mtr_capital):
+    # Test derivatives of the ETR and MTR on income functions against
+    # central differences
+    r = 0.04
+    w = 1.2
+    b = np.array([0.4, 0.3, 0.5])
+    n = np.array([0.8, 0.4, 0.7])
+    factor = 110000
+    h = 1e-6
+
+    def etr(b, n):
+        return tax.ETR_income(r, w, b, n, factor, params.e, etr_params,
+                              params)
+
+    def mtr(b, n):
+        return tax.MTR_income(r, w, b, n, factor, mtr_capital, params.e,
+                              etr_params, mtr_params, params)
+
+    test_etr = tax.ETR_income_deriv(r, w, b, n, factor, params.e,
+                                    etr_params, params)
+    test_mtr = tax.MTR_income_deriv(r, w, b, n, factor, mtr_capital,
+                                    params.e, etr_params, mtr_params,
+                                    params)
+    for func, test_derivs in [(etr, test_etr), (mtr, test_mtr)]:
+        expected_b = (func(b + h, n) - func(b - h, n)) / (2 * h)
+        expected_n = (func(b, n + h) - func(b, n - h)) / (2 * h)
+        assert np.allclose(test_derivs[0], expected_b, rtol=1e-4,
+                           atol=1e-10)
+        assert np.allclose(test_derivs[1], expected_n, rtol=1e-4,
+                           atol=1e-10)
+
+
 def test_get_biz_tax():
     # Test function for business tax receipts
     p = Specifications()
@@ -1,3 +1,5 @@
+import multiprocessing
+from distributed import Client, LocalCluster
 import pytest
 from ogusa import utils
 from ogusa.utils import Inequality
@@ -11,6 +13,17 @@ from ogusa.parameters import Specifications
 
 TOL = 1e-5
 CUR_PATH = os.path.abspath(os.path.dirname(__file__))
+NUM_WORKERS = min(multiprocessing.cpu_count(), 7)
+
+
+@pytest.fixture(scope="module")
+def dask_client():
+    cluster = LocalCluster(n_workers=NUM_WORKERS, threads_per_worker=2)
+    client = Client(cluster)
+    yield client
+    # teardown
+    client.close()
+    cluster.close()
 
 
 def test_makedirs(tmp_path):
@@ -49,6 +62,33 @@ def test_convex_combo():
     assert np.allclose(expected, combo)
 
 
+def test_anderson_mix():
+    '''
+    Test of utils.anderson_mix() function
+    '''
+    # with a single guess the update is the damped update
+    nu = 0.4
+    x = np.array([20.0, 1.5])
+    g = np.array([10.0, 1.5])
+    assert np.allclose(utils.anderson_mix([x], [g], nu),
+                       utils.convex_combo(g, x, nu))
+    # for a linear map the full history finds the fixed point in
+    # dimension + 1 iterations, where the damped updates do not
+    A = np.array([[0.9, 0.05, 0.0], [0.1, 0.8, 0.05], [0.0, 0.2, 0.7]])
+    b = np.array([1.0, -0.5, 0.25])
+    expected = np.linalg.solve(np.eye(3) - A, b)
+    x_hist = [np.zeros(3)]
+    g_hist = []
+    x_damped = np.zeros(3)
+    for _ in range(4):
+        g_hist.append(A @ x_hist[-1] + b)
+        x_hist.append(utils.anderson_mix(x_hist, g_hist, nu,
+                                         np.ones(3) * 2.0))
+        x_damped = utils.convex_combo(A @ x_damped + b, x_damped, nu)
+    assert np.allclose(x_hist[-1], expected)
+    assert not np.allclose(x_damped, expected)
+
+
 def test_read_file():
     '''
     Test of utils.read_file() function
@@ -286,6 +326,24 @@ def test_to_timepath_shape():
     assert test_array.shape == (40, 1, 1)
 
 
+def test_get_cohort_diagonals():
+    '''
+    Test of function that returns a view of a time path by cohort
+    '''
+    T, S = 6, 4
+    x = np.random.rand(T + S, S, 2)
+    diags = utils.get_cohort_diagonals(x, S)
+    assert diags.shape == (T + 2 * S - 1, S, 2)
+    for t in range(T):
+        assert np.array_equal(diags[t + S - 1], np.diagonal(
+            x[t:t + S, :, :]).T)
+    for s in range(S - 2):
+        assert np.array_equal(
+            diags[s + 1, S - (s + 2):, :],
+            np.diagonal(x[:S, :, :], S - (s + 2)).T)
+    assert not diags.flags.writeable
+
+
 p = Specifications()
 p.T = 40
 p.S = 3
@@ -343,6 +401,19 @@ def test_get_initial_path(x1, xT, p, shape, expected):
     assert np.allclose(test_path, expected)
 
 
+def test_scatter_to_workers(dask_client):
+    '''
+    Test of utils.scatter_to_workers() function
+    '''
+    x = np.arange(10.0)
+    params = (x, None, {'a': 1})
+    assert utils.scatter_to_workers(None, *params) == params
+    scattered = utils.scatter_to_workers(dask_client, *params)
+    assert scattered[1] is None
+    assert np.array_equal(scattered[0].result(), x)
+    assert dask_client.submit(len, scattered[2]).result() == 1
+
+
 @pytest.mark.parametrize(
     'filename', [('SS_solver_outputs_baseline.pkl'),
                  ('tax_dict_for_tests.pkl')],
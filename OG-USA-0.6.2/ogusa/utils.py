@@ -76,6 +76,44 @@ def convex_combo(var1, var2, nu):
     return combo
 
 
+def anderson_mix(x_hist, g_hist, nu, scale=None):
+    '''
+    Takes the Anderson mixing update of a fixed point iteration x = G(x).
+    The update combines the last guesses so that the linearized
+    residual G(x) - x is smallest in least squares, and then takes the
+    damped step from that combination.  With one guess in the history
+    it reduces to convex_combo(G(x), x, nu).
+
+    Args:
+        x_hist (list): guesses of x, oldest first, each a 1D Numpy
+            array
+        g_hist (list): G(x) for each of the guesses in x_hist
+        nu (scalar): weight on G(x) in the update, in [0, 1]
+        scale (Numpy array): positive scale of each element of x used
+            to weight the residuals in the least squares problem,
+            defaults to ones
+
+    Returns:
+        x_new (Numpy array): updated guess of x
+
+    '''
+    x = np.array(x_hist)
+    f = np.array(g_hist) - x
+    if scale is not None:
+        f_scaled = f / scale
+    else:
+        f_scaled = f
+    x_new = x[-1] + nu * f[-1]
+    if x.shape[0] > 1:
+        dX = np.diff(x, axis=0).T
+        dF = np.diff(f, axis=0).T
+        gamma = np.linalg.lstsq(np.diff(f_scaled, axis=0).T,
+                                f_scaled[-1], rcond=None)[0]
+        x_new = x_new - (dX + nu * dF) @ gamma
+
+    return x_new
+
+
 def read_file(path, fname):
     '''
     Read the contents of 'path'. If it does not exist, assume the file
@@ -304,6 +342,35 @@ def to_timepath_shape(some_array):
     return tp_array
 
 
+def get_cohort_diagonals(x, S):
+    '''
+    This function returns a view of an array indexed by period and age
+    that is indexed by cohort and age instead, so that the values a
+    cohort faces over its lifetime can be read without calling np.diag
+    on each slice.  Row c + S - 1 of the view contains x[c + s, s] for
+    each age s, where c is the period in which the cohort is age zero
+    (negative for cohorts alive before the first period).  Entries
+    outside the periods of x are zero.
+
+    Args:
+        x (Numpy array): values by period and age, size = NxSx...
+        S (int): number of ages
+
+    Returns:
+        diags (Numpy array): read-only values by cohort and age,
+            size = (N+S-1)xSx...
+
+    '''
+    pad = np.zeros((S - 1,) + x.shape[1:], dtype=x.dtype)
+    padded = np.concatenate((pad, x, pad))
+    strides = ((padded.strides[0], padded.strides[0] + padded.strides[1])
+               + padded.strides[2:])
+    diags = np.lib.stride_tricks.as_strided(
+        padded, shape=(x.shape[0] + S - 1,) + x.shape[1:],
+        strides=strides, writeable=False)
+    return diags
+
+
 def get_initial_path(x1, xT, p, shape):
     r'''
     This function generates a path from point x1 to point xT such that
@@ -367,6 +434,31 @@ def safe_read_pickle(file_path):
     return obj
 
 
+def scatter_to_workers(client, *objs):
+    '''
+    This function sends objects that do not change over the iterations
+    of a solution loop to every dask worker once.  Tasks given the
+    returned futures as arguments use the copy already held by their
+    worker, rather than serializing the object again for each task.
+
+    Args:
+        client (Dask client object): client, or None
+        objs (tuple): objects to send to the workers
+
+    Returns:
+        scattered (tuple): futures of objs, or objs if client is None.
+            Objects that are None are returned as is.
+
+    '''
+    if not client:
+        return objs
+    scattered = tuple(
+        None if obj is None else
+        client.scatter([obj], broadcast=True, hash=False)[0]
+        for obj in objs)
+    return scattered
+
+
 def rate_conversion(annual_rate, start_age, end_age, S):
     '''
     This function converts annual rates to model period ratesself.
@@ -0,0 +1,60 @@
+"""
+Tax-Calculator benchmark script that times the construction of many
+Calculator objects from one Policy and one Records object, as is done
+for each provision and year in the revenue-estimate notebook, and
+reports the memory held by those Calculator objects.
+"""
+# CODING-STYLE CHECKS:
+# pycodestyle bench_calculator_construction.py
+# pylint --disable=locally-disabled bench_calculator_construction.py
+
+import argparse
+import sys
+import time
+import tracemalloc
+import pandas as pd
+from taxcalc import Policy, Records, Calculator
+
+
+def main(data, num_calcs):
+    """
+    Contains high-level logic of the script.
+    """
+    if data == '':
+        # one-record sample so that timings are dominated by Policy copies
+        recs = Records(data=pd.DataFrame({'RECID': [1], 'MARS': [1]}),
+                       start_year=2021, gfactors=None, weights=None)
+    else:
+        recs = Records(data=data)
+    pol = Policy()
+    pol.implement_reform({'II_rt7': {2021: 0.396}})
+    start = time.perf_counter()
+    calcs = [Calculator(policy=pol, records=recs) for _ in range(num_calcs)]
+    secs = time.perf_counter() - start
+    del calcs
+    # memory tracing slows execution, so construct the objects again
+    tracemalloc.start()
+    calcs = [Calculator(policy=pol, records=recs) for _ in range(num_calcs)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    out = ('{} Calculator objects: {:7.3f} secs, {:7.3f} secs each, '
+           '{:8.1f} MB held, {:8.1f} MB peak\n')
+    sys.stdout.write(out.format(len(calcs), secs, secs / num_calcs,
+                                current / 1e6, peak / 1e6))
+    return 0
+# end of main function code
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        prog='python bench_calculator_construction.py',
+        description=('Times construction of many Calculator objects '
+                     'sharing one Policy and one Records object.'))
+    PARSER.add_argument('--data', type=str, default='',
+                        help=('Name of CSV input data file (for example, '
+                              'puf.csv).  No --data implies a one-record '
+                              'sample, which isolates Policy copy costs.'))
+    PARSER.add_argument('--num', type=int, default=32,
+                        help='Number of Calculator objects constructed.')
+    ARGS = PARSER.parse_args()
+    sys.exit(main(ARGS.data, ARGS.num))
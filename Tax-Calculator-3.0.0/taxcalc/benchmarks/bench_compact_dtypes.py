@@ -0,0 +1,100 @@
+"""
+Tax-Calculator benchmark script that compares Records objects that store
+input variables in compact types (compact_dtypes=True) with the usual
+float64/int32 Records objects: it reports the memory used by the input
+variables and validates that compact-type weighted totals of important
+tax variables are within a declared relative tolerance of the usual
+weighted totals.  Script returns one if any difference exceeds the
+tolerance; otherwise it returns zero.
+"""
+# CODING-STYLE CHECKS:
+# pycodestyle bench_compact_dtypes.py
+# pylint --disable=locally-disabled bench_compact_dtypes.py
+
+import argparse
+import sys
+import time
+import numpy as np
+from taxcalc import Policy, Records, Calculator
+
+# maximum relative difference allowed between compact-type and usual-type
+# weighted totals of each variable in VALIDATION_VARS
+COMPACT_RTOL = 1e-4
+
+VALIDATION_VARS = ['c00100', 'c04800', 'taxbc', 'c07220', 'eitc',
+                   'iitax', 'payrolltax', 'combined',
+                   'expanded_income', 'aftertax_income']
+
+
+def input_megabytes(recs):
+    """
+    Return megabytes used by input variable arrays in recs.
+    """
+    nbytes = 0
+    for varname in recs.USABLE_READ_VARS:
+        nbytes += getattr(recs, varname).nbytes
+    return nbytes / 1e6
+
+
+def main(data, first_year, last_year, reform, rtol):
+    """
+    Contains high-level logic of the script.
+    """
+    # pylint: disable=too-many-locals
+    pol = Policy()
+    if reform:
+        pol.implement_reform(Policy.read_json_reform(reform))
+    totals = dict()
+    for compact in [False, True]:
+        start = time.perf_counter()
+        if data == 'cps':
+            recs = Records.cps_constructor(compact_dtypes=compact)
+        else:
+            recs = Records(data=data, compact_dtypes=compact)
+        calc = Calculator(policy=pol, records=recs)
+        for year in range(first_year, last_year + 1):
+            calc.advance_to_year(year)
+            calc.calc_all()
+            for varname in VALIDATION_VARS:
+                totals[(compact, year, varname)] = calc.weighted_total(varname)
+        secs = time.perf_counter() - start
+        out = 'compact_dtypes={}: {:7.3f} secs, {:8.1f} MB of input vars\n'
+        sys.stdout.write(out.format(compact, secs, input_megabytes(recs)))
+        del calc
+        del recs
+    num_failures = 0
+    out = '{} {:16s} {:16.6e} {:16.6e} {:10.2e} {}\n'
+    for year in range(first_year, last_year + 1):
+        for varname in VALIDATION_VARS:
+            usual = totals[(False, year, varname)]
+            compact = totals[(True, year, varname)]
+            reldiff = abs(compact - usual) / max(abs(usual), 1.0)
+            status = 'OK'
+            if not np.isfinite(reldiff) or reldiff > rtol:
+                status = 'FAIL'
+                num_failures += 1
+            sys.stdout.write(out.format(year, varname, usual, compact,
+                                        reldiff, status))
+    return 1 if num_failures > 0 else 0
+# end of main function code
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        prog='python bench_compact_dtypes.py',
+        description=('Compares memory use and weighted totals of '
+                     'Records objects with and without compact types.'))
+    PARSER.add_argument('--data', type=str, default='cps',
+                        help=('Name of CSV input data file (for example, '
+                              'puf.csv).  Default is cps, which implies '
+                              'the CPS data included in taxcalc.'))
+    PARSER.add_argument('--first', type=int, default=2021,
+                        help='First year of weighted totals.')
+    PARSER.add_argument('--last', type=int, default=2030,
+                        help='Last year of weighted totals.')
+    PARSER.add_argument('--reform', type=str, default='',
+                        help='Name of JSON reform file.  Default is none.')
+    PARSER.add_argument('--rtol', type=float, default=COMPACT_RTOL,
+                        help='Maximum relative difference allowed.')
+    ARGS = PARSER.parse_args()
+    sys.exit(main(ARGS.data, ARGS.first, ARGS.last, ARGS.reform, ARGS.rtol))
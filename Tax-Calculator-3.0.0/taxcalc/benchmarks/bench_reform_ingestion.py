@@ -0,0 +1,58 @@
+"""
+Tax-Calculator benchmark script that times the implementation of the
+Biden individual income tax reform file with the Policy.implement_reform
+method, first as a single reform and then stacked one parameter at a
+time as is done in the revenue-estimate notebook.
+"""
+# CODING-STYLE CHECKS:
+# pycodestyle bench_reform_ingestion.py
+# pylint --disable=locally-disabled bench_reform_ingestion.py
+
+import argparse
+import os
+import sys
+import time
+from taxcalc import Policy
+
+
+REFORM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', '..', '..', 'reforms',
+                           'biden-iitax-reforms.json')
+
+
+def main(reform_path, repeats):
+    """
+    Contains high-level logic of the script.
+    """
+    reform = Policy.read_json_reform(reform_path)
+    timings = {'full': [], 'stacked': []}
+    for _ in range(repeats):
+        pol = Policy()
+        start = time.perf_counter()
+        pol.implement_reform(reform)
+        timings['full'].append(time.perf_counter() - start)
+        pol = Policy()
+        start = time.perf_counter()
+        for param, value in reform.items():
+            pol.implement_reform({param: value})
+        timings['stacked'].append(time.perf_counter() - start)
+    out = '{:8s} reform: min={:7.3f} max={:7.3f} secs ({} params)\n'
+    for kind, secs in timings.items():
+        sys.stdout.write(out.format(kind, min(secs), max(secs), len(reform)))
+    return 0
+# end of main function code
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        prog='python bench_reform_ingestion.py',
+        description=('Times Policy.implement_reform for the Biden '
+                     'individual income tax reform file.'))
+    PARSER.add_argument('--reform', type=str, default=REFORM_PATH,
+                        help=('Name of JSON reform file.  No --reform '
+                              'implies the reforms/biden-iitax-reforms.json '
+                              'file in this project.'))
+    PARSER.add_argument('--repeats', type=int, default=3,
+                        help='Number of times each timing is repeated.')
+    ARGS = PARSER.parse_args()
+    sys.exit(main(ARGS.reform, ARGS.repeats))
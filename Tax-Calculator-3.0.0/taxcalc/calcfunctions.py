@@ -872,11 +872,11 @@ def SchXYZ(taxable_income, MARS, e00900, e26270, e02000, e00200,
            PT_rt1, PT_rt2, PT_rt3, PT_rt4, PT_rt5,
            PT_rt6, PT_rt7, PT_rt8,
            PT_brk1, PT_brk2, PT_brk3, PT_brk4, PT_brk5,
-           PT_brk6, PT_brk7,
+           PT_brk6, PT_brk7, PT_schedule,
            II_rt1, II_rt2, II_rt3, II_rt4, II_rt5,
            II_rt6, II_rt7, II_rt8,
            II_brk1, II_brk2, II_brk3, II_brk4, II_brk5,
-           II_brk6, II_brk7, PT_EligibleRate_active,
+           II_brk6, II_brk7, II_schedule, PT_EligibleRate_active,
            PT_EligibleRate_passive, PT_wages_active_income,
            PT_top_stacking):
     """
@@ -906,33 +906,40 @@ def SchXYZ(taxable_income, MARS, e00900, e26270, e02000, e00200,
         reg_tbase = pt_taxinc
         pt_tbase = 0.
     # compute Schedule X,Y,Z tax using the two components of taxable income
-    if reg_taxinc > 0.:
+    # (the precomputed schedule tables do not contain the brackets used
+    #  to tax a component that is stacked on top of the other component)
+    if reg_taxinc > 0. and reg_tbase > 0.:
         reg_tax = Taxes(reg_taxinc, MARS, reg_tbase,
                         II_rt1, II_rt2, II_rt3, II_rt4,
                         II_rt5, II_rt6, II_rt7, II_rt8, II_brk1, II_brk2,
                         II_brk3, II_brk4, II_brk5, II_brk6, II_brk7)
+    elif reg_taxinc > 0.:
+        reg_tax = ScheduleTax(reg_taxinc, MARS, II_schedule)
     else:
         reg_tax = 0.
-    if pt_taxinc > 0.:
+    if pt_taxinc > 0. and pt_tbase > 0.:
         pt_tax = Taxes(pt_taxinc, MARS, pt_tbase,
                        PT_rt1, PT_rt2, PT_rt3, PT_rt4,
                        PT_rt5, PT_rt6, PT_rt7, PT_rt8, PT_brk1, PT_brk2,
                        PT_brk3, PT_brk4, PT_brk5, PT_brk6, PT_brk7)
+    elif pt_taxinc > 0.:
+        pt_tax = ScheduleTax(pt_taxinc, MARS, PT_schedule)
     else:
         pt_tax = 0.
     return reg_tax + pt_tax
 
 
-@iterate_jit(nopython=True)
+@iterate_jit(nopython=True,
+             parameters=['II_schedule', 'PT_schedule'])
 def SchXYZTax(c04800, MARS, e00900, e26270, e02000, e00200,
               PT_rt1, PT_rt2, PT_rt3, PT_rt4, PT_rt5,
               PT_rt6, PT_rt7, PT_rt8,
               PT_brk1, PT_brk2, PT_brk3, PT_brk4, PT_brk5,
-              PT_brk6, PT_brk7,
+              PT_brk6, PT_brk7, PT_schedule,
               II_rt1, II_rt2, II_rt3, II_rt4, II_rt5,
               II_rt6, II_rt7, II_rt8,
               II_brk1, II_brk2, II_brk3, II_brk4, II_brk5,
-              II_brk6, II_brk7, PT_EligibleRate_active,
+              II_brk6, II_brk7, II_schedule, PT_EligibleRate_active,
               PT_EligibleRate_passive, PT_wages_active_income,
               PT_top_stacking, c05200):
     """
@@ -942,23 +949,25 @@ def SchXYZTax(c04800, MARS, e00900, e26270, e02000, e00200,
                     PT_rt1, PT_rt2, PT_rt3, PT_rt4, PT_rt5,
                     PT_rt6, PT_rt7, PT_rt8,
                     PT_brk1, PT_brk2, PT_brk3, PT_brk4, PT_brk5,
-                    PT_brk6, PT_brk7,
+                    PT_brk6, PT_brk7, PT_schedule,
                     II_rt1, II_rt2, II_rt3, II_rt4, II_rt5,
                     II_rt6, II_rt7, II_rt8,
                     II_brk1, II_brk2, II_brk3, II_brk4, II_brk5,
-                    II_brk6, II_brk7, PT_EligibleRate_active,
+                    II_brk6, II_brk7, II_schedule, PT_EligibleRate_active,
                     PT_EligibleRate_passive, PT_wages_active_income,
                     PT_top_stacking)
     return c05200
 
 
-@iterate_jit(nopython=True)
+@iterate_jit(nopython=True,
+             parameters=['II_schedule', 'PT_schedule'])
 def GainsTax(e00650, c01000, c23650, p23250, e01100, e58990, e00200,
              e24515, e24518, MARS, c04800, c05200, e00900, e26270, e02000,
              II_rt1, II_rt2, II_rt3, II_rt4, II_rt5, II_rt6, II_rt7, II_rt8,
              II_brk1, II_brk2, II_brk3, II_brk4, II_brk5, II_brk6, II_brk7,
              PT_rt1, PT_rt2, PT_rt3, PT_rt4, PT_rt5, PT_rt6, PT_rt7, PT_rt8,
              PT_brk1, PT_brk2, PT_brk3, PT_brk4, PT_brk5, PT_brk6, PT_brk7,
+             II_schedule, PT_schedule,
              CG_nodiff, PT_EligibleRate_active, PT_EligibleRate_passive,
              PT_wages_active_income, PT_top_stacking,
              CG_rt1, CG_rt2, CG_rt3, CG_rt4, CG_brk1, CG_brk2, CG_brk3,
@@ -1035,11 +1044,11 @@ def GainsTax(e00650, c01000, c23650, p23250, e01100, e58990, e00200,
                         PT_rt1, PT_rt2, PT_rt3, PT_rt4, PT_rt5,
                         PT_rt6, PT_rt7, PT_rt8,
                         PT_brk1, PT_brk2, PT_brk3, PT_brk4, PT_brk5,
-                        PT_brk6, PT_brk7,
+                        PT_brk6, PT_brk7, PT_schedule,
                         II_rt1, II_rt2, II_rt3, II_rt4, II_rt5,
                         II_rt6, II_rt7, II_rt8,
                         II_brk1, II_brk2, II_brk3, II_brk4, II_brk5,
-                        II_brk6, II_brk7, PT_EligibleRate_active,
+                        II_brk6, II_brk7, II_schedule, PT_EligibleRate_active,
                         PT_EligibleRate_passive, PT_wages_active_income,
                         PT_top_stacking)
         dwks43 = (dwks29 + dwks32 + dwks38 + dwks41 + dwks42 +
@@ -1925,6 +1934,20 @@ def Taxes(income, MARS, tbrk_base,
             rate8 * max(0., income - brk7))
 
 
+@JIT(nopython=True)
+def ScheduleTax(income, MARS, schedule):
+    """
+    ScheduleTax function computes the same tax amount as the Taxes function
+    with a zero tbrk_base by finding the bracket that contains income in
+    the schedule table (see Policy.II_schedule) for filing status MARS and
+    adding the tax on income above the bottom of that bracket to the tax
+    at the bottom of that bracket.
+    """
+    table = schedule[MARS - 1]
+    bkt = np.searchsorted(table[0, 1:], income)
+    return table[1, bkt] + table[2, bkt] * (income - table[0, bkt])
+
+
 def ComputeBenefit(calc, ID_switch):
     """
     Calculates the value of the benefits accrued from itemizing.
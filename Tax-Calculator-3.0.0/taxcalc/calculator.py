@@ -32,12 +32,41 @@ from taxcalc.growdiff import GrowDiff
 from taxcalc.growfactors import GrowFactors
 from taxcalc.utils import (DIST_VARIABLES, create_distribution_table,
                            DIFF_VARIABLES, create_difference_table,
-                           create_diagnostic_table,
+                           table_row_index,
+                           create_diagnostic_table, diagnostic_table_odict,
+                           bootstrap_se_ci,
                            ce_aftertax_expanded_income,
                            mtr_graph_data, atr_graph_data, xtr_graph_plot,
                            pch_graph_data, pch_graph_plot)
 # import pdb
 
+# Records variables (and the Policy parameters that repeal them) used by the
+# BenefitPrograms function, which is not an iterate_jit function and so has
+# no argument names from which to discover its inputs and outputs
+BENEFIT_PROGRAM_VARS = {'housing_ben': 'BEN_housing_repeal',
+                        'ssi_ben': 'BEN_ssi_repeal',
+                        'snap_ben': 'BEN_snap_repeal',
+                        'tanf_ben': 'BEN_tanf_repeal',
+                        'vet_ben': 'BEN_vet_repeal',
+                        'wic_ben': 'BEN_wic_repeal',
+                        'mcare_ben': 'BEN_mcare_repeal',
+                        'mcaid_ben': 'BEN_mcaid_repeal',
+                        'e02400': 'BEN_oasdi_repeal',
+                        'e02300': 'BEN_ui_repeal',
+                        'other_ben': 'BEN_other_repeal'}
+
+# itemized-deduction variables reset by the Calculator method that chooses
+# between the standard deduction and itemized deductions
+ITEMIZED_DEDUCTION_VARS = ['c04470', 'c21060', 'c21040',
+                           'c17000', 'c18300', 'c19200',
+                           'c19700', 'c20500', 'c20800']
+
+# Policy parameters that switch on the functions that call ComputeBenefit,
+# which computes taxes using a copy of the Calculator object and so depends
+# on every Records variable and Policy parameter
+COMPUTE_BENEFIT_SWITCHES = {'BenefitSurtax': 'ID_BenefitSurtax_crt',
+                            'BenefitLimitation': 'ID_BenefitCap_rt'}
+
 
 class Calculator():
     """
@@ -91,6 +120,11 @@ class Calculator():
     """
     # pylint: disable=too-many-public-methods
 
+    # list of calc_all steps and slice of the steps called by the
+    # _calc_one_year method that are constructed by _calc_all_steps method
+    _CALC_ALL_STEPS = None
+    _CALC_ONE_YEAR_STEPS = None
+
     def __init__(self, policy=None, records=None, verbose=False,
                  sync_years=True, consumption=None):
         # pylint: disable=too-many-arguments,too-many-branches
@@ -138,12 +172,23 @@ class Calculator():
         assert self.__policy.current_year == self.__records.current_year
         assert self.__policy.current_year == self.__consumption.current_year
         self.__stored_records = None
+        # names of Records variables and Policy parameters changed since
+        # the last call to calc_all (None implies all have changed) and
+        # variable values saved for partial recalculation (see _recalc)
+        self.__changed = None
+        self.__saved = dict()
+        self.__stored_calc_state = None
+        # table_row_index results keyed by (income_measure, groupby,
+        # pop_quantiles, current_year) that are reused by table methods
+        self.__table_rows = dict()
 
     def increment_year(self):
         """
         Advance all embedded objects to next year.
         """
         next_year = self.__policy.current_year + 1
+        self.__changed = None
+        self.__table_rows = dict()
         self.__records.increment_year()
         self.__policy.set_year(next_year)
         self.__consumption.set_year(next_year)
@@ -162,20 +207,38 @@ class Calculator():
             self.increment_year()
         assert self.current_year == year
 
-    def calc_all(self, zero_out_calc_vars=False):
+    def calc_all(self, zero_out_calc_vars=False, partial=False):
         """
         Call all tax-calculation functions for the current_year.
+        If partial is True, only the functions affected by the Records
+        variables and Policy parameters changed (using the array, incarray,
+        zeroarray, or policy_param methods) since the last call are called,
+        unless there has been no earlier call, the current_year has changed
+        or zero_out_calc_vars is True.
+        NOTE: when partial is True, changes made directly to an array
+              returned by the array method are not noticed, so set the
+              array instead.
         """
+        if not zero_out_calc_vars:
+            changed = self.__changed if partial else None
+            self.__changed = None  # in case of an exception
+            if changed is None:
+                self.__saved = dict()
+                self.__table_rows = dict()
+            recalculated = self._recalc(changed, self.__saved)
+            self._clear_table_rows(recalculated)
+            self.__changed = set()
+            return
         # conducts static analysis of Calculator object for current_year
-        UBI(self.__policy, self.__records)
-        BenefitPrograms(self)
+        self.__changed = None
+        self.__table_rows = dict()
+        steps = Calculator._calc_all_steps()
+        one_year = Calculator._CALC_ONE_YEAR_STEPS
+        for func, _, _ in steps[:one_year.start]:
+            self._call_step(func)
         self._calc_one_year(zero_out_calc_vars)
-        BenefitSurtax(self)
-        BenefitLimitation(self)
-        FairShareTax(self.__policy, self.__records)
-        LumpSumTax(self.__policy, self.__records)
-        ExpandIncome(self.__policy, self.__records)
-        AfterTaxIncome(self.__policy, self.__records)
+        for func, _, _ in steps[one_year.stop:]:
+            self._call_step(func)
 
     def weighted_total(self, variable_name):
         """
@@ -190,26 +253,50 @@ class Calculator():
         """
         return self.array('s006').sum()
 
-    def dataframe(self, variable_list, all_vars=False):
+    def dataframe(self, variable_list, all_vars=False, copy=True):
         """
         Return Pandas DataFrame containing the listed variables from the
         embedded Records object.  If all_vars is True, then the variable_list
         is ignored and all variables used as input to and calculated by the
         Calculator.calc_all() method (which does not include marginal tax
         rates) are included in the returned Pandas DataFrame.
+        All the columns have the same type, which is the type that all the
+        listed Records variables can be converted to (so float64 when any
+        of them is a float64 variable).
+        If copy is False, the columns that have the type of their Records
+        variable are not copied but share memory with the Records variable,
+        so the returned DataFrame reflects all later changes to those
+        variables (for example, by calc_all) and must be used only when the
+        Calculator object is not going to change.
         """
-        if all_vars:
-            varlist = list(self.__records.USABLE_READ_VARS |
-                           self.__records.CALCULATED_VARS)
-        else:
-            assert isinstance(variable_list, list)
-            varlist = variable_list
-        arys = [self.array(varname) for varname in varlist]
-        dframe = pd.DataFrame(data=np.column_stack(arys), columns=varlist)
+        # pylint: disable=redefined-outer-name
+        varlist = self._variable_list(variable_list, all_vars)
+        arys = {varname: self.array(varname) for varname in varlist}
+        if arys:
+            dtype = np.result_type(*arys.values())
+            arys = {varname: ary.astype(dtype, copy=False)
+                    for varname, ary in arys.items()}
+        dframe = pd.DataFrame(data=arys, columns=varlist, copy=copy)
         del arys
         del varlist
         return dframe
 
+    def arrow_table(self, variable_list, all_vars=False):
+        """
+        Return pyarrow Table containing the listed variables (or all the
+        variables when all_vars is True, as in the dataframe method) for
+        export, for example, to a Parquet or Feather file.  Unlike the
+        dataframe method, each Table column has the type of its Records
+        variable, and the Table columns share memory with the Records
+        variables (so see the dataframe method's discussion of copy being
+        False).
+        This method requires that the optional pyarrow package be installed.
+        """
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        varlist = self._variable_list(variable_list, all_vars)
+        arys = [pyarrow.array(self.array(varname)) for varname in varlist]
+        return pyarrow.Table.from_arrays(arys, names=varlist)
+
     def array(self, variable_name, variable_value=None):
         """
         If variable_value is None, return numpy ndarray containing the
@@ -222,6 +309,7 @@ class Calculator():
             return getattr(self.__records, variable_name)
         assert isinstance(variable_value, np.ndarray)
         setattr(self.__records, variable_name, variable_value)
+        self._record_change(variable_name)
         return None
 
     def n65(self):
@@ -229,7 +317,8 @@ class Calculator():
         Return numpy ndarray containing the number of
         individuals age 65+ in each filing unit.
         """
-        vdf = self.dataframe(['age_head', 'age_spouse', 'elderly_dependents'])
+        vdf = self.dataframe(['age_head', 'age_spouse', 'elderly_dependents'],
+                             copy=False)
         return ((vdf['age_head'] >= 65).astype(int) +
                 (vdf['age_spouse'] >= 65).astype(int) +
                 vdf['elderly_dependents'])
@@ -241,12 +330,14 @@ class Calculator():
         assert isinstance(variable_add, np.ndarray)
         setattr(self.__records, variable_name,
                 self.array(variable_name) + variable_add)
+        self._record_change(variable_name)
 
     def zeroarray(self, variable_name):
         """
         Set named variable in embedded Records object to zeros.
         """
         setattr(self.__records, variable_name, np.zeros(self.array_len))
+        self._record_change(variable_name)
 
     def store_records(self):
         """
@@ -256,6 +347,9 @@ class Calculator():
         """
         assert self.__stored_records is None
         self.__stored_records = copy.deepcopy(self.__records)
+        self.__stored_calc_state = (copy.deepcopy((self.__changed,
+                                                   self.__saved)),
+                                    dict(self.__table_rows))
 
     def restore_records(self):
         """
@@ -266,6 +360,9 @@ class Calculator():
         self.__records = copy.deepcopy(self.__stored_records)
         del self.__stored_records
         self.__stored_records = None
+        calc_state, self.__table_rows = self.__stored_calc_state
+        self.__changed, self.__saved = calc_state
+        self.__stored_calc_state = None
 
     @property
     def array_len(self):
@@ -289,6 +386,7 @@ class Calculator():
             else:
                 return val[0]  # drop down a dimension.
         setattr(self.__policy, param_name, param_value)
+        self._record_change(param_name.lstrip('_'))
         return None
 
     def consump_param(self, param_name):
@@ -340,21 +438,30 @@ class Calculator():
         Returns
         -------
         Pandas DataFrame object containing the multi-year diagnostic table
+
+        Notes
+        -----
+        Each year's aggregate statistics are computed directly from the
+        variable arrays, so the memory used does not depend on num_years.
         """
         assert num_years >= 1
         max_num_years = self.__policy.end_year - self.__policy.current_year + 1
         assert num_years <= max_num_years
-        calc = copy.deepcopy(self)
+        # copy only the Policy, Records, and Consumption objects
+        calc = Calculator(policy=self.__policy, records=self.__records,
+                          sync_years=False, consumption=self.__consumption)
         yearlist = list()
-        varlist = list()
+        odictlist = list()
         for iyr in range(1, num_years + 1):
             calc.calc_all()
             yearlist.append(calc.current_year)
-            varlist.append(calc.dataframe(DIST_VARIABLES))
+            arrays = {vname: calc.array(vname) for vname in DIST_VARIABLES}
+            odictlist.append(diagnostic_table_odict(arrays))
+            del arrays
             if iyr < num_years:
                 calc.increment_year()
         del calc
-        return create_diagnostic_table(varlist, yearlist)
+        return create_diagnostic_table(odictlist, yearlist)
 
     def distribution_tables(self, calc, groupby,
                             pop_quantiles=False, scaling=True):
@@ -412,7 +519,7 @@ class Calculator():
             Return pandas DataFrame containing the DIST_TABLE_COLUMNS variables
             from specified Calculator object, calcobj.
             """
-            dframe = calcobj.dataframe(DIST_VARIABLES)
+            dframe = calcobj.dataframe(DIST_VARIABLES, copy=False)
             # weighted count of all people or filing units
             if pop_quantiles:
                 dframe['count'] = np.multiply(dframe['s006'], dframe['XTOT'])
@@ -448,8 +555,9 @@ class Calculator():
                                calc.array('s006'))  # check rows in same order
         var_dataframe = distribution_table_dataframe(self)
         imeasure = 'expanded_income'
+        table_row = self._table_rows(groupby, pop_quantiles)
         dt1 = create_distribution_table(var_dataframe, groupby, imeasure,
-                                        pop_quantiles, scaling)
+                                        pop_quantiles, scaling, table_row)
         del var_dataframe
         if calc is None:
             dt2 = None
@@ -461,11 +569,12 @@ class Calculator():
             var_dataframe = distribution_table_dataframe(calc)
             if have_same_income_measure(self, calc):
                 imeasure = 'expanded_income'
+                table_row = calc._table_rows(groupby, pop_quantiles)
             else:
                 imeasure = 'expanded_income_baseline'
                 var_dataframe[imeasure] = self.array('expanded_income')
             dt2 = create_distribution_table(var_dataframe, groupby, imeasure,
-                                            pop_quantiles, scaling)
+                                            pop_quantiles, scaling, table_row)
             del var_dataframe
         return (dt1, dt2)
 
@@ -520,14 +629,171 @@ class Calculator():
         assert calc.array_len == self.array_len
         assert np.allclose(self.consump_benval_params(),
                            calc.consump_benval_params())
-        self_var_dframe = self.dataframe(DIFF_VARIABLES)
-        calc_var_dframe = calc.dataframe(DIFF_VARIABLES)
+        self_var_dframe = self.dataframe(DIFF_VARIABLES, copy=False)
+        calc_var_dframe = calc.dataframe(DIFF_VARIABLES, copy=False)
+        table_row = self._table_rows(groupby, pop_quantiles)
         diff = create_difference_table(self_var_dframe, calc_var_dframe,
-                                       groupby, tax_to_diff, pop_quantiles)
+                                       groupby, tax_to_diff, pop_quantiles,
+                                       table_row)
         del self_var_dframe
         del calc_var_dframe
         return diff
 
+    def revenue_difference(self, calc, tax_to_diff='combined',
+                           num_samples=1000, seed=0, alpha=0.025):
+        """
+        Return weighted total of the difference between the tax_to_diff
+        tax in calc and in self along with a bootstrap estimate of its
+        standard error and confidence interval, which quantify the sampling
+        error in the estimate when the Records are a sub-sample (as when
+        Records are constructed with the sample_frac argument, in which
+        case the bootstrap samples resample the records within each of
+        the sub-sample strata).
+        This method leaves the Calculator objects unchanged.
+
+        Parameters
+        ----------
+        calc : Calculator object
+            calc represents the reform while self represents the baseline
+
+        tax_to_diff : String object
+            options for input: 'iitax', 'payrolltax', 'combined'
+            specifies which tax to difference
+
+        num_samples : integer
+            number of bootstrap samples
+
+        seed : integer
+            seed of the random number generator used to draw the samples
+
+        alpha : float
+            the confidence interval is the 100*(1-2*alpha) percent interval
+
+        Returns and typical usage
+        -------------------------
+        rev = calc1.revenue_difference(calc2)
+        (where calc1 is a baseline Calculator object
+        and calc2 is a reform Calculator object).
+        The returned rev is the dictionary returned by the bootstrap_se_ci
+        utility function with an extra 'estimate' item containing the
+        weighted total tax difference.
+        """
+        assert isinstance(calc, Calculator)
+        assert calc.current_year == self.current_year
+        assert calc.array_len == self.array_len
+        assert tax_to_diff in ('iitax', 'payrolltax', 'combined')
+        assert np.allclose(self.array('s006'),
+                           calc.array('s006'))  # check rows in same order
+        wdiff = np.asarray((calc.array(tax_to_diff) -
+                            self.array(tax_to_diff)) * self.array('s006'))
+        rev = bootstrap_se_ci(wdiff, seed, num_samples, np.sum, alpha,
+                              strata=self.__records.sample_strata)
+        rev['estimate'] = wdiff.sum()
+        return rev
+
+    def solve_parameter(self, param, target_revenue, bounds,
+                        tax_to_sum='combined', revenue_tol=1e5, maxiter=25):
+        """
+        Return value of the named policy parameter in current_year that
+        makes the weighted total of the tax_to_sum tax equal target_revenue
+        (for example, the weighted total of combined taxes under current
+        law when looking for a revenue-neutral reform).
+
+        The value is found in the bounds interval using the Illinois
+        variant of the regula falsi method.  After each change in the
+        parameter value, only the tax-calculation functions that depend
+        (directly or through other variables) on the parameter are called.
+        When the parameter has a value for each filing status (or other
+        category), the same value is used for every category.
+
+        When this method returns, the embedded Policy object contains the
+        returned value of the parameter for current_year and the embedded
+        Records object contains the tax results for that value.
+
+        Parameters
+        ----------
+        param : string
+            name of a float-valued policy parameter (for example, 'LST')
+
+        target_revenue : float
+            target for weighted total of tax_to_sum tax (in dollars)
+
+        bounds : tuple of two floats
+            parameter values that bracket the value being sought
+
+        tax_to_sum : String object
+            options for input: 'iitax', 'payrolltax', 'combined'
+
+        revenue_tol : float
+            absolute tolerance on the weighted total tax (in dollars)
+
+        maxiter : integer
+            maximum number of evaluations after the two at the bounds
+
+        Raises
+        ------
+        ValueError:
+            if param is not a float-valued policy parameter.
+            if bounds do not bracket the target_revenue.
+            if target_revenue is not found in maxiter evaluations.
+
+        Returns
+        -------
+        value: float
+        """
+        assert tax_to_sum in ('iitax', 'payrolltax', 'combined')
+        if param not in Policy.parameter_list():
+            raise ValueError('{} is not a policy parameter'.format(param))
+        original_value = getattr(self.__policy, param)
+        if np.asarray(original_value).dtype.kind != 'f':
+            raise ValueError('{} is not a float parameter'.format(param))
+
+        def revenue_gap(value):
+            """
+            Set parameter to value and return tax revenue minus target.
+            """
+            self.policy_param(param, np.full_like(original_value, value))
+            self.calc_all(partial=True)
+            return self.weighted_total(tax_to_sum) - target_revenue
+
+        def failure(msg):
+            """
+            Restore original parameter value and return ValueError.
+            """
+            self.policy_param(param, original_value)
+            self.calc_all(partial=True)
+            return ValueError(msg)
+
+        self.calc_all()
+        xlo, xhi = bounds
+        flo = revenue_gap(xlo)
+        if abs(flo) <= revenue_tol:
+            return xlo
+        fhi = revenue_gap(xhi)
+        if abs(fhi) <= revenue_tol:
+            return xhi
+        if np.sign(flo) == np.sign(fhi):
+            msg = 'bounds {} do not bracket target_revenue {}'
+            raise failure(msg.format(bounds, target_revenue))
+        side = 0
+        for _ in range(maxiter):
+            xval = (xlo * fhi - xhi * flo) / (fhi - flo)
+            fval = revenue_gap(xval)
+            if abs(fval) <= revenue_tol:
+                return xval
+            if np.sign(fval) == np.sign(fhi):
+                xhi, fhi = xval, fval
+                if side == -1:
+                    flo *= 0.5
+                side = -1
+            else:
+                xlo, flo = xval, fval
+                if side == 1:
+                    fhi *= 0.5
+                side = 1
+        msg = 'target_revenue {} not found in {} evaluations'
+        raise failure(msg.format(target_revenue, maxiter))
+
     MTR_VALID_VARIABLES = ['e00200p', 'e00200s',
                            'e00900p', 'e00300',
                            'e00400', 'e00600',
@@ -538,6 +804,69 @@ class Calculator():
                            'e19200', 'e26270',
                            'e19800', 'e20100']
 
+    # income sources used by the average_mtrs method: each key is the name
+    # of an average marginal tax rate and each value is a dictionary of the
+    # MTR_VALID_VARIABLES (and their signs) that sum to the income source
+    MTR_INCOME_SOURCES = {'tau_wages': {'e00200p': 1},
+                          'tau_businc': {'e00900p': 1,
+                                         'e02000': 1,
+                                         'e26270': -1},
+                          'tau_dividends': {'e00650': 1},
+                          'tau_interest': {'e00300': 1},
+                          'tau_stcapgain': {'p22250': 1},
+                          'tau_ltcapgain': {'p23250': 1},
+                          'tau_taxdef': {'e01700': 1}}
+
+    def average_mtrs(self, calc=None, income_sources=None,
+                     mtr_measure='itax'):
+        """
+        Return Pandas DataFrame containing, for each income source, the
+        income-weighted average marginal tax rate among filing units with
+        positive taxable income (c04800) and positive income from the
+        source, where the weight of each filing unit is its income from
+        the source times its sampling weight (s006).
+
+        Parameters
+        ----------
+        calc : Calculator object or None
+            if not None, the returned DataFrame contains a 'reform' column
+            of average marginal tax rates for calc in addition to the
+            'base' column of average marginal tax rates for self
+
+        income_sources : dictionary or None
+            dictionary like MTR_INCOME_SOURCES, which is used when None
+
+        mtr_measure : string
+            'itax' for marginal individual income tax rates,
+            'ptax' for marginal payroll tax rates, or
+            'combined' for marginal combined tax rates
+
+        Returns
+        -------
+        Pandas DataFrame object indexed by the names of the income sources
+
+        Notes
+        -----
+        The marginal tax rates are computed with respect to each variable
+        (not full compensation) after a single calc_all() call, so the
+        calc_all() call in each mtr computation recalculates only what
+        depends on the variable.  This method leaves the Calculator
+        objects in the same state as a calc_all() call would.
+        """
+        if income_sources is None:
+            income_sources = Calculator.MTR_INCOME_SOURCES
+        if mtr_measure not in ('itax', 'ptax', 'combined'):
+            msg = 'mtr_measure="{}" is neither itax nor ptax nor combined'
+            raise ValueError(msg.format(mtr_measure))
+        table = pd.DataFrame(index=list(income_sources.keys()))
+        table['base'] = self._average_mtrs(income_sources, mtr_measure)
+        if calc is not None:
+            assert isinstance(calc, Calculator)
+            assert calc.current_year == self.current_year
+            assert calc.array_len == self.array_len
+            table['reform'] = calc._average_mtrs(income_sources, mtr_measure)
+        return table
+
     def mtr(self, variable_str='e00200p',
             negative_finite_diff=False,
             zero_out_calculated_vars=False,
@@ -582,7 +911,7 @@ class Calculator():
 
         calc_all_already_called: boolean
             specifies whether self has already had its Calculor.calc_all()
-            method called, in which case this method will not do a final
+            method called, in which case this method will not do an initial
             calc_all() call but use the incoming embedded Records object
             as the outgoing Records object embedding in self.
 
@@ -635,20 +964,28 @@ class Calculator():
         finite_diff = 0.01  # a one-cent difference
         if negative_finite_diff:
             finite_diff *= -1.0
+        # calculate base level of taxes
+        if not calc_all_already_called or zero_out_calculated_vars:
+            self.calc_all(zero_out_calc_vars=zero_out_calculated_vars)
+        payrolltax_base = self.array('payrolltax').copy()
+        incometax_base = self.array('iitax').copy()
+        combined_taxes_base = incometax_base + payrolltax_base
         # remember records object in order to restore it after mtr computations
         self.store_records()
         # extract variable array(s) from embedded records object
-        variable = self.array(variable_str)
+        # (as float64 arrays so that finite_diff is not lost when records
+        #  object stores input variables in compact float32 types)
+        variable = np.asarray(self.array(variable_str), dtype=np.float64)
         if variable_str == 'e00200p':
-            earnings_var = self.array('e00200')
+            earnings_var = np.asarray(self.array('e00200'), dtype=np.float64)
         elif variable_str == 'e00200s':
-            earnings_var = self.array('e00200')
+            earnings_var = np.asarray(self.array('e00200'), dtype=np.float64)
         elif variable_str == 'e00900p':
-            seincome_var = self.array('e00900')
+            seincome_var = np.asarray(self.array('e00900'), dtype=np.float64)
         elif variable_str == 'e00650':
-            divincome_var = self.array('e00600')
+            divincome_var = np.asarray(self.array('e00600'), dtype=np.float64)
         elif variable_str == 'e26270':
-            scheincome_var = self.array('e02000')
+            scheincome_var = np.asarray(self.array('e02000'), dtype=np.float64)
         # calculate level of taxes after a marginal increase in income
         self.array(variable_str, variable + finite_diff)
         if variable_str == 'e00200p':
@@ -663,17 +1000,15 @@ class Calculator():
             self.array('e02000', scheincome_var + finite_diff)
         if self.__consumption.has_response():
             self.__consumption.response(self.__records, finite_diff)
-        self.calc_all(zero_out_calc_vars=zero_out_calculated_vars)
+            for var in Consumption.RESPONSE_VARS:
+                self._record_change(var)
+        self.calc_all(zero_out_calc_vars=zero_out_calculated_vars,
+                      partial=True)
         payrolltax_chng = self.array('payrolltax')
         incometax_chng = self.array('iitax')
         combined_taxes_chng = incometax_chng + payrolltax_chng
-        # calculate base level of taxes after restoring records object
+        # restore records object to its state before the marginal increase
         self.restore_records()
-        if not calc_all_already_called or zero_out_calculated_vars:
-            self.calc_all(zero_out_calc_vars=zero_out_calculated_vars)
-        payrolltax_base = self.array('payrolltax')
-        incometax_base = self.array('iitax')
-        combined_taxes_base = incometax_base + payrolltax_base
         # compute marginal changes in combined tax liability
         payrolltax_diff = payrolltax_chng - payrolltax_base
         incometax_diff = incometax_chng - incometax_base
@@ -848,7 +1183,7 @@ class Calculator():
         if mars != 'ALL':
             record_variables.append('MARS')
         record_variables.append(income_variable)
-        vdf = self.dataframe(record_variables)
+        vdf = self.dataframe(record_variables, copy=False)
         vdf['mtr1'] = mtr1
         vdf['mtr2'] = mtr2
         # select filing-status subgroup, if any
@@ -949,7 +1284,7 @@ class Calculator():
         if mars != 'ALL':
             record_variables.append('MARS')
         record_variables.append('expanded_income')
-        vdf = self.dataframe(record_variables)
+        vdf = self.dataframe(record_variables, copy=False)
         # create 'tax1' and 'tax2' columns given specified atr_measure
         if atr_measure == 'combined':
             vdf['tax1'] = self.array('combined')
@@ -1016,8 +1351,9 @@ class Calculator():
         assert calc.array_len == self.array_len
         # extract needed output from baseline and reform Calculator objects
         vdf1 = self.dataframe(['s006', 'XTOT', 'aftertax_income',
-                               'expanded_income'])
-        vdf2 = calc.dataframe(['s006', 'XTOT', 'aftertax_income'])
+                               'expanded_income'], copy=False)
+        vdf2 = calc.dataframe(['s006', 'XTOT', 'aftertax_income'],
+                              copy=False)
         assert np.allclose(vdf1['s006'], vdf2['s006'])
         assert np.allclose(vdf1['XTOT'], vdf2['XTOT'])
         vdf = pd.DataFrame()
@@ -1333,8 +1669,8 @@ class Calculator():
                            self.consump_benval_params())
         # extract data from self and calc
         records_variables = ['s006', 'combined', 'expanded_income']
-        df1 = self.dataframe(records_variables)
-        df2 = calc.dataframe(records_variables)
+        df1 = self.dataframe(records_variables, copy=False)
+        df2 = calc.dataframe(records_variables, copy=False)
         cedict = ce_aftertax_expanded_income(
             df1, df2,
             custom_params=custom_params,
@@ -1355,25 +1691,232 @@ class Calculator():
         NetInvIncTax(self.__policy, self.__records)
         AMT(self.__policy, self.__records)
 
-    def _calc_one_year(self, zero_out_calc_vars=False):
+    def _average_mtrs(self, income_sources, mtr_measure):
         """
-        Call all the functions except those in the calc_all() method.
+        Return list of average marginal tax rates computed as described
+        in the average_mtrs method documentation.
+        """
+        # compute marginal tax rates for each variable after one calc_all
+        self.calc_all()
+        measure_index = {'ptax': 0, 'itax': 1, 'combined': 2}[mtr_measure]
+        mtrs = dict()
+        for source in income_sources.values():
+            for var in source:
+                if var not in mtrs:
+                    mtrs[var] = self.mtr(variable_str=var,
+                                         calc_all_already_called=True,
+                                         wrt_full_compensation=False
+                                         )[measure_index]
+        # compute income-weighted average of marginal tax rates
+        positive_taxinc = self.array('c04800') > 0.
+        weight = self.array('s006')
+        averages = list()
+        for source in income_sources.values():
+            income = np.zeros(self.array_len)
+            rate = np.zeros(self.array_len)
+            for var, sign in source.items():
+                income += sign * self.array(var)
+                rate += sign * mtrs[var]
+            included = np.logical_and(positive_taxinc, income > 0.)
+            winc = income[included] * weight[included]
+            total = winc.sum()
+            if total > 0.:
+                averages.append(np.dot(rate[included], winc) / total)
+            else:
+                averages.append(np.nan)
+        del mtrs
+        return averages
+
+    @staticmethod
+    def _calc_all_steps():
+        """
+        Return list of (function, inputs, outputs) tuples for the functions
+        called by the calc_all method in the order they are called, where
+        inputs and outputs are sets containing names of Records variables
+        and Policy parameters the function uses and changes.  The names are
+        the iterate_jit function argument names except for the functions
+        that are not iterate_jit functions.  This list is the only place
+        where the order of the calc_all functions is specified: calc_all,
+        _calc_one_year and _recalc all call the functions in this list.
+        """
+        if Calculator._CALC_ALL_STEPS is not None:
+            return Calculator._CALC_ALL_STEPS
+
+        def jit_steps(funcs):
+            """
+            Return list of steps for funcs decorated by iterate_jit.
+            """
+            return [(func, set(func.in_args), set(func.out_args))
+                    for func in funcs]
+
+        ben_vars = set(BENEFIT_PROGRAM_VARS)
+        benefit_programs = (
+            BenefitPrograms,
+            ben_vars | set(BENEFIT_PROGRAM_VARS.values()) | set(['ubi']),
+            ben_vars | set(['benefit_cost_total', 'benefit_value_total'])
+        )
+        ded_vars = set(['standard'] + ITEMIZED_DEDUCTION_VARS)
+        taxinc = jit_steps([TaxInc, SchXYZTax, GainsTax, AGIsurtax,
+                            NetInvIncTax, AMT])
+        best_deduction = (
+            Calculator._taxinc_to_amt_with_best_deduction,
+            ded_vars.union(*[inputs for _, inputs, _ in taxinc]),
+            ded_vars.union(*[outputs for _, _, outputs in taxinc])
+        )
+        surtax_vars = set(['iitax', 'combined', 'surtax'])
+        benefit_surtax = (
+            BenefitSurtax,
+            surtax_vars | set(['c00100', 'MARS', 'ID_BenefitSurtax_crt',
+                               'ID_BenefitSurtax_Switch',
+                               'ID_BenefitSurtax_em',
+                               'ID_BenefitSurtax_trt']),
+            surtax_vars
+        )
+        benefit_limitation = (
+            BenefitLimitation,
+            surtax_vars | set(['c17000', 'e18400_capped', 'e18500_capped',
+                               'c20500', 'c20800', 'c19200', 'c19700',
+                               'ID_StateLocalTax_hc', 'ID_RealEstate_hc',
+                               'ID_BenefitCap_rt', 'ID_BenefitCap_Switch']),
+            surtax_vars
+        )
+        steps = jit_steps([UBI])
+        steps.append(benefit_programs)
+        # steps called by the _calc_one_year method
+        one_year = jit_steps([EI_PayrollTax, DependentCare, Adj,
+                              ALD_InvInc_ec_base, CapGains, SSBenefits,
+                              AGI, ItemDedCap, ItemDed,
+                              AdditionalMedicareTax, StdDed])
+        one_year.append(best_deduction)
+        one_year.extend(jit_steps([F2441, EITC, RefundablePayrollTaxCredit,
+                                   PersonalTaxCredit, IRADCTaxCredit,
+                                   FTHBTaxCredit, ICGTaxCredit,
+                                   IRATaxCredit, EVTaxCredit,
+                                   AmOppCreditParts, SchR,
+                                   EducationTaxCredit, CharityCredit,
+                                   ChildDepTaxCredit, NonrefundableCredits,
+                                   AdditionalCTC, C1040, CTC_new, CDCC_new,
+                                   IITAX]))
+        Calculator._CALC_ONE_YEAR_STEPS = slice(len(steps),
+                                                len(steps) + len(one_year))
+        steps.extend(one_year)
+        steps.append(benefit_surtax)
+        steps.append(benefit_limitation)
+        steps.extend(jit_steps([FairShareTax, LumpSumTax, ExpandIncome,
+                                AfterTaxIncome]))
+        Calculator._CALC_ALL_STEPS = steps
+        return steps
+
+    def _call_step(self, func):
+        """
+        Call the function of a step in the list of calc_all steps.
+        """
+        if hasattr(func, 'in_args'):  # iterate_jit function
+            func(self.__policy, self.__records)
+        else:
+            func(self)
+
+    def _variable_list(self, variable_list, all_vars):
+        """
+        Return list of variable names used by dataframe and arrow_table.
+        """
+        if all_vars:
+            return list(self.__records.USABLE_READ_VARS |
+                        self.__records.CALCULATED_VARS)
+        assert isinstance(variable_list, list)
+        return variable_list
+
+    def _record_change(self, name):
+        """
+        Remember that the named Records variable or Policy parameter has
+        changed since the last call to the calc_all method.
+        """
+        if self.__changed is not None:
+            self.__changed.add(name)
+        self._clear_table_rows([name])
+
+    def _clear_table_rows(self, names):
+        """
+        Forget the cached table rows that depend on any of the named
+        Records variables.
+        """
+        if not self.__table_rows:
+            return
+        names = set(names)
+        if names & set(['s006', 'XTOT']):
+            self.__table_rows = dict()
+            return
+        for key in list(self.__table_rows.keys()):
+            if key[0] in names:
+                del self.__table_rows[key]
+
+    def _table_rows(self, groupby, pop_quantiles,
+                    income_measure='expanded_income'):
+        """
+        Return table_row_index tuple for the specified income_measure,
+        groupby, and pop_quantiles, computing it only when it has not been
+        cached since the income_measure was last changed.
+        """
+        key = (income_measure, groupby, pop_quantiles, self.current_year)
+        if key not in self.__table_rows:
+            self.__table_rows[key] = table_row_index(
+                self.array(income_measure), self.array('s006'), groupby,
+                pop_quantiles=pop_quantiles, xtot=self.array('XTOT')
+            )
+        return self.__table_rows[key]
+
+    def _recalc(self, changed, saved):
+        """
+        Call the calc_all functions affected by a change in the Records
+        variables and Policy parameters named in the changed set, or call
+        all the calc_all functions if changed is None.
+        A function that both uses and changes a variable (for example, by
+        adding a surtax to iitax) needs the value of the variable set by
+        the functions called before it; when none of those functions has
+        been called again, that value is restored from the saved dictionary,
+        which is updated with the values used by the functions that are
+        called.  So the saved dictionary must be empty when changed is
+        None and must come from a call with changed equal to None if
+        changed is not None.
+        Returns set of names of the variables set by the called functions.
+        """
+        steps = Calculator._calc_all_steps()
+        # determine which functions are affected by the changes
+        if changed is None:
+            selected = set(range(len(steps)))
+        else:
+            names = set(changed)
+            selected = set()
+            for idx, (func, inputs, outputs) in enumerate(steps):
+                affected = inputs & names
+                switch = COMPUTE_BENEFIT_SWITCHES.get(func.__name__)
+                if switch is not None and self.policy_param(switch) != 1.:
+                    affected = names  # uses all variables and parameters
+                if affected:
+                    selected.add(idx)
+                    names |= outputs
+        # call affected functions in calc_all order
+        fresh = set()  # names of variables set by functions called so far
+        for idx in sorted(selected):
+            func, inputs, outputs = steps[idx]
+            for var in inputs & outputs:
+                if not any(var in steps[jdx][2] for jdx in range(idx)):
+                    continue  # because no earlier function sets var
+                key = (idx, var)
+                if changed is None or var in fresh:
+                    saved[key] = self.array(var).copy()
+                else:
+                    self.array(var)[:] = saved[key]
+            self._call_step(func)
+            fresh |= outputs
+        return fresh
+
+    def _taxinc_to_amt_with_best_deduction(self):
+        """
+        Call TaxInc through AMT functions with the standard deduction and
+        with itemized deductions, and then call them again with the
+        deduction that produces the lower taxes.
         """
-        # pylint: disable=too-many-statements
-        if zero_out_calc_vars:
-            self.__records.zero_out_changing_calculated_vars()
-        # pdb.set_trace()
-        EI_PayrollTax(self.__policy, self.__records)
-        DependentCare(self.__policy, self.__records)
-        Adj(self.__policy, self.__records)
-        ALD_InvInc_ec_base(self.__policy, self.__records)
-        CapGains(self.__policy, self.__records)
-        SSBenefits(self.__policy, self.__records)
-        AGI(self.__policy, self.__records)
-        ItemDedCap(self.__policy, self.__records)
-        ItemDed(self.__policy, self.__records)
-        AdditionalMedicareTax(self.__policy, self.__records)
-        StdDed(self.__policy, self.__records)
         # Store calculated standard deduction, calculate
         # taxes with standard deduction, store AMT + Regular Tax
         std = self.array('standard').copy()
@@ -1420,23 +1963,13 @@ class Calculator():
         del item_cvar
         # Calculate taxes with optimal itemized deduction
         self._taxinc_to_amt()
-        F2441(self.__policy, self.__records)
-        EITC(self.__policy, self.__records)
-        RefundablePayrollTaxCredit(self.__policy, self.__records)
-        PersonalTaxCredit(self.__policy, self.__records)
-        IRADCTaxCredit(self.__policy, self.__records)
-        FTHBTaxCredit(self.__policy, self.__records)
-        ICGTaxCredit(self.__policy, self.__records)
-        IRATaxCredit(self.__policy, self.__records)
-        EVTaxCredit(self.__policy, self.__records)
-        AmOppCreditParts(self.__policy, self.__records)
-        SchR(self.__policy, self.__records)
-        EducationTaxCredit(self.__policy, self.__records)
-        CharityCredit(self.__policy, self.__records)
-        ChildDepTaxCredit(self.__policy, self.__records)
-        NonrefundableCredits(self.__policy, self.__records)
-        AdditionalCTC(self.__policy, self.__records)
-        C1040(self.__policy, self.__records)
-        CTC_new(self.__policy, self.__records)
-        CDCC_new(self.__policy, self.__records)
-        IITAX(self.__policy, self.__records)
+
+    def _calc_one_year(self, zero_out_calc_vars=False):
+        """
+        Call all the functions except those in the calc_all() method.
+        """
+        if zero_out_calc_vars:
+            self.__records.zero_out_changing_calculated_vars()
+        steps = Calculator._calc_all_steps()
+        for func, _, _ in steps[Calculator._CALC_ONE_YEAR_STEPS]:
+            self._call_step(func)
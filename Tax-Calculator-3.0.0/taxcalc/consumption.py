@@ -6,6 +6,7 @@ Tax-Calculator Consumption class.
 # pylint --disable=locally-disabled consumption.py
 
 import os
+import numpy as np
 from taxcalc.parameters import Parameters
 from taxcalc.policy import Policy
 from taxcalc.records import Records
@@ -84,6 +85,9 @@ class Consumption(Parameters):
             raise ValueError('records is not a Records object')
         for var in Consumption.RESPONSE_VARS:
             records_var = getattr(records, var)
+            if records_var.dtype != np.float64:  # compact float32 variable
+                records_var = records_var.astype(np.float64)
+                setattr(records, var, records_var)
             mpc_var = getattr(self, 'MPC_{}'.format(var))
             records_var[:] += mpc_var * income_change
 
@@ -42,6 +42,28 @@ class Data():
         NOTE: when using custom weights, set this argument to a DataFrame.
         NOTE: assumes weights are integers that are 100 times the real weights.
 
+    compact_dtypes: boolean
+        specifies whether or not input variables read from data are stored
+        in compact types: each integer input variable is stored in the
+        smallest integer type that holds its values (for example, int8 for
+        MARS) and each float input variable whose values are represented
+        in float32 with an error of less than half a cent is stored as a
+        float32 variable; calculated variables are always stored as int32
+        or float64 variables; default value is false.
+        NOTE: use compact types to reduce memory use when the small
+              differences in tax results caused by float32 precision in
+              aged data are acceptable.
+
+    sample_weight_factors: None or numpy array
+        None implies that, when data contain a sub-sample of the records
+        whose weights are in the weights file, the sub-sample weights are
+        scaled up by a year-specific factor that makes their sum equal to
+        the sum of all the weights;
+        array contains the factor by which each record's weights are
+        scaled up in every year (for example, the inverse of the fraction
+        of its stratum that is in a stratified sub-sample);
+        default value is None.
+
     Raises
     ------
     ValueError:
@@ -66,7 +88,8 @@ class Data():
     VARINFO_FILE_NAME = None
     VARINFO_FILE_PATH = None
 
-    def __init__(self, data, start_year, gfactors=None, weights=None):
+    def __init__(self, data, start_year, gfactors=None, weights=None,
+                 compact_dtypes=False, sample_weight_factors=None):
         # initialize data variable info sets and read variable information
         self.INTEGER_READ_VARS = set()
         self.MUST_READ_VARS = set()
@@ -89,7 +112,7 @@ class Data():
             self.__data_year = start_year
             self.__current_year = start_year
             # read specified data
-            self._read_data(data)
+            self._read_data(data, compact_dtypes)
             # handle growth factors
             if self.__aging_data:
                 if not isinstance(gfactors, GrowFactors):
@@ -101,12 +124,17 @@ class Data():
                 self._read_weights(weights)
                 # ... weights must be same size as data
                 if self.array_length != len(self.WT.index):
-                    # scale-up sub-sample weights by year-specific factor
-                    sum_full_weights = self.WT.sum()
-                    self.WT = self.WT.iloc[self.__index]
-                    sum_sub_weights = self.WT.sum()
-                    factor = sum_full_weights / sum_sub_weights
-                    self.WT *= factor
+                    if sample_weight_factors is not None:
+                        # scale-up sub-sample weights by record's factor
+                        self.WT = self.WT.iloc[self.__index].multiply(
+                            np.asarray(sample_weight_factors), axis=0)
+                    else:
+                        # scale-up sub-sample weights by year-specific factor
+                        sum_full_weights = self.WT.sum()
+                        self.WT = self.WT.iloc[self.__index]
+                        sum_sub_weights = self.WT.sum()
+                        factor = sum_full_weights / sum_sub_weights
+                        self.WT *= factor
                 # ... construct sample weights for current_year
                 wt_colname = 'WT{}'.format(self.current_year)
                 if wt_colname in self.WT.columns:
@@ -184,9 +212,10 @@ class Data():
         self.CHANGING_CALCULATED_VARS = FLOAT_CALCULATED_VARS
         self.INTEGER_VARS = self.INTEGER_READ_VARS | INT_CALCULATED_VARS
 
-    def _read_data(self, data):
+    def _read_data(self, data, compact_dtypes=False):
         """
-        Read data from file or use specified DataFrame as data.
+        Read data from file or use specified DataFrame as data,
+        storing input variables in compact types if compact_dtypes is True.
         """
         # pylint: disable=too-many-branches
         if data is None:
@@ -211,11 +240,14 @@ class Data():
             if varname in self.USABLE_READ_VARS:
                 READ_VARS.add(varname)
                 if varname in self.INTEGER_READ_VARS:
-                    setattr(self, varname,
-                            taxdf[varname].astype(np.int32).values)
+                    values = taxdf[varname].astype(np.int32).values
+                    if compact_dtypes:
+                        values = Data._compact_int_array(values)
                 else:
-                    setattr(self, varname,
-                            taxdf[varname].astype(np.float64).values)
+                    values = taxdf[varname].astype(np.float64).values
+                    if compact_dtypes:
+                        values = Data._compact_float_array(values)
+                setattr(self, varname, values)
             else:
                 self.IGNORED_VARS.add(varname)
         # check that MUST_READ_VARS are all present in taxdf
@@ -231,6 +263,9 @@ class Data():
             if varname in self.INTEGER_VARS:
                 setattr(self, varname,
                         np.zeros(self.array_length, dtype=np.int32))
+            elif compact_dtypes and varname in UNREAD_VARS:
+                setattr(self, varname,
+                        np.zeros(self.array_length, dtype=np.float32))
             else:
                 setattr(self, varname,
                         np.zeros(self.array_length, dtype=np.float64))
@@ -239,6 +274,34 @@ class Data():
         del UNREAD_VARS
         del ZEROED_VARS
 
+    @staticmethod
+    def _compact_int_array(values):
+        """
+        Return integer values array in smallest signed integer type
+        that can hold all the values.
+        """
+        if values.size == 0:
+            return values
+        vmin = values.min()
+        vmax = values.max()
+        for dtype in (np.int8, np.int16):
+            info = np.iinfo(dtype)
+            if info.min <= vmin and vmax <= info.max:
+                return values.astype(dtype)
+        return values
+
+    @staticmethod
+    def _compact_float_array(values):
+        """
+        Return float values array as a float32 array if conversion to
+        float32 changes no value by as much as half a cent; otherwise
+        return values array unchanged.
+        """
+        values32 = values.astype(np.float32)
+        if np.allclose(values32, values, rtol=0.0, atol=0.005):
+            return values32
+        return values
+
     def zero_out_changing_calculated_vars(self):
         """
         Set to zero all variables in the self.CHANGING_CALCULATED_VARS set.
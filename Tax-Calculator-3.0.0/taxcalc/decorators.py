@@ -45,6 +45,20 @@ else:
     JIT = numba.jit
 
 
+PARALLEL_SETTING = os.environ.get('TAXCALC_PARALLEL', '').strip()
+DO_PARALLEL = PARALLEL_SETTING.lower() not in ('', '0', 'false')
+# Setting the TAXCALC_PARALLEL environment variable before importing taxcalc
+# makes the apply-style functions loop over filing units with numba.prange
+# in functions jitted with parallel=True, which is safe because each
+# filing unit is calculated independently of all the others.  The variable
+# being unset, empty, 0 or false leaves the loops serial.  When the
+# variable is set to a positive integer, that is the number of threads
+# used; otherwise numba uses its default number of threads.
+if DO_PARALLEL and PARALLEL_SETTING.isdigit():
+    numba.set_num_threads(max(1, min(int(PARALLEL_SETTING),
+                                     numba.config.NUMBA_NUM_THREADS)))
+
+
 class GetReturnNode(ast.NodeVisitor):
     """
     A NodeVisitor to get the return tuple names from a calc-style function.
@@ -58,7 +72,7 @@ class GetReturnNode(ast.NodeVisitor):
         return [node.value.id]
 
 
-def create_apply_function_string(sigout, sigin, parameters):
+def create_apply_function_string(sigout, sigin, parameters, parallel=False):
     """
     Create a string for a function of the form::
 
@@ -68,7 +82,8 @@ def create_apply_function_string(sigout, sigin, parameters):
            return x_0[i], ...
 
     where the specific args to jitted_f and the number of
-    values to return is determined by sigout and sigin.
+    values to return is determined by sigout and sigin, and
+    where range is replaced by prange when parallel is True.
 
     Parameters
     ----------
@@ -80,6 +95,8 @@ def create_apply_function_string(sigout, sigin, parameters):
                 variables (as opposed to column records). This influences
                 how we construct the apply-style function
 
+    parallel: Bool, if True, loop over the rows using prange
+
     Returns
     -------
     a String representing the function
@@ -90,7 +107,10 @@ def create_apply_function_string(sigout, sigin, parameters):
     in_args = ["x_" + str(i) for i in range(len(sigout), total_len)]
 
     fstr.write("def ap_func({0}):\n".format(",".join(out_args + in_args)))
-    fstr.write("  for i in range(len(x_0)):\n")
+    if parallel:
+        fstr.write("  for i in prange(len(x_0)):\n")
+    else:
+        fstr.write("  for i in range(len(x_0)):\n")
     out_index = [x + "[i]" for x in out_args]
     in_index = []
     for arg, _var in zip(in_args, sigin):
@@ -161,7 +181,7 @@ def create_toplevel_function_string(args_out, args_in, pm_or_pf):
 
 
 def make_apply_function(func, out_args, in_args, parameters,
-                        do_jit=DO_JIT, **kwargs):
+                        do_jit=DO_JIT, parallel=DO_PARALLEL, **kwargs):
     """
     Takes a calc-style function and creates the necessary Python code for
     an apply-style function. Will also jit the function if desired.
@@ -180,6 +200,9 @@ def make_apply_function(func, out_args, in_args, parameters,
 
     do_jit: Bool, if True, jit the resulting apply-style function
 
+    parallel: Bool, if True, the resulting apply-style function loops over
+              the rows in parallel (when it is jitted)
+
     Returns
     -------
     apply-style function
@@ -188,11 +211,14 @@ def make_apply_function(func, out_args, in_args, parameters,
         jitted_f = JIT(**kwargs)(func)
     else:
         jitted_f = func
-    apfunc = create_apply_function_string(out_args, in_args, parameters)
+    apfunc = create_apply_function_string(out_args, in_args, parameters,
+                                          parallel=parallel)
     func_code = compile(apfunc, "<string>", "exec")
     fakeglobals = {}
     eval(func_code,  # pylint: disable=eval-used
-         {"jitted_f": jitted_f}, fakeglobals)
+         {"jitted_f": jitted_f, "prange": numba.prange}, fakeglobals)
+    if do_jit and parallel:
+        return JIT(parallel=True, **kwargs)(fakeglobals['ap_func'])
     if do_jit:
         return JIT(**kwargs)(fakeglobals['ap_func'])
     return fakeglobals['ap_func']
@@ -320,6 +346,11 @@ def iterate_jit(parameters=None, **kwargs):
             ans = high_level_fn(*args, **kwargs)
             return ans
 
+        # remember argument names, which are used by the Calculator class
+        # to find the functions affected by a change in a variable or a
+        # policy parameter
+        wrapper.in_args = list(in_args)
+        wrapper.out_args = list(all_out_args)
         return wrapper
 
     return make_wrapper
@@ -31,6 +31,19 @@ pt.register_custom_type(
 )
 
 
+# parameters that revert to their pre-TCJA values in 2026, which are
+# recalculated using new inflation rates when the CPI offset is changed
+TCJA_REVERTING_PARAMS = ['II_brk7', 'II_brk6', 'II_brk5', 'II_brk4',
+                         'II_brk3', 'II_brk2', 'II_brk1',
+                         'PT_brk7', 'PT_brk6', 'PT_brk5', 'PT_brk4',
+                         'PT_brk3', 'PT_brk2', 'PT_brk1',
+                         'PT_qbid_taxinc_thd',
+                         'ALD_BusinessLosses_c',
+                         'STD', 'II_em', 'II_em_ps',
+                         'AMT_em', 'AMT_em_ps', 'AMT_em_pe',
+                         'ID_ps', 'ID_AllTaxes_c']
+
+
 class Parameters(pt.Parameters):
     """
     Base Parameters class that wraps ParamTools, providing parameter indexing
@@ -122,14 +135,15 @@ class Parameters(pt.Parameters):
         ParamTools throws an error if a warning is triggered and
         ignore_warnings is False. This method circumvents this behavior.
         """
+        params = self.read_params(params_or_path)
         if print_warnings:
-            _data = copy.deepcopy(self._data)
+            _values = self._snapshot_values(params)
             kwargs["ignore_warnings"] = False
         else:
             kwargs["ignore_warnings"] = True
         self._warnings = {}
         try:
-            return self.adjust_with_indexing(params_or_path, **kwargs)
+            return self.adjust_with_indexing(params, **kwargs)
         except pt.ValidationError as ve:
             if self.errors:
                 raise ve
@@ -137,14 +151,49 @@ class Parameters(pt.Parameters):
                 print("WARNING:")
                 print(self.warnings)
             kwargs["ignore_warnings"] = True
-            self._data = _data
+            self._restore_values(_values)
             _warnings = copy.deepcopy(self._warnings)
             self._warnings = {}
             self._errors = {}
-            adjustment = self.adjust_with_indexing(params_or_path, **kwargs)
+            adjustment = self.adjust_with_indexing(params, **kwargs)
             self._warnings = _warnings
             return adjustment
 
+    def _snapshot_values(self, params):
+        """
+        Return a copy of the value objects and the indexed status of only
+        those parameters that adjust_with_indexing may modify when it
+        implements params.  This replaces a deep copy of all parameter data
+        and is what makes adjust cheap when print_warnings is True.
+        """
+        affected = {param.split("-indexed")[0] for param in params}
+        if params.get("parameter_indexing_CPI_offset") is not None:
+            affected |= set(TCJA_REVERTING_PARAMS)
+            affected |= {
+                param for param, data in self._data.items()
+                if data.get("indexed", False)
+            }
+        # value objects are flat dictionaries whose "value" item is replaced
+        # (not mutated) by ParamTools, so shallow copies are sufficient
+        return {
+            param: (
+                [dict(vo) for vo in self._data[param]["value"]],
+                self._data[param].get("indexed", None)
+            )
+            for param in affected if param in self._data
+        }
+
+    def _restore_values(self, snapshot):
+        """
+        Restore parameter values saved by the _snapshot_values method.
+        """
+        for param, (values, indexed) in snapshot.items():
+            self._data[param]["value"] = values
+            if indexed is not None:
+                self._data[param]["indexed"] = indexed
+            # search tree refers to the discarded value objects
+            self._search_trees.pop(param, None)
+
     def adjust_with_indexing(self, params_or_path, **kwargs):
         """
         Custom adjust method that handles special indexing logic. The logic
@@ -192,7 +241,6 @@ class Parameters(pt.Parameters):
         label_to_extend = self.label_to_extend
         array_first = self.array_first
         self.array_first = False
-        self._gfactors = GrowFactors()
 
         params = self.read_params(params_or_path)
 
@@ -204,6 +252,9 @@ class Parameters(pt.Parameters):
         # parameter_indexing_CPI_offset is changed.
         needs_reset = []
         if params.get("parameter_indexing_CPI_offset") is not None:
+            # Default grow factors are only needed to recompute the
+            # inflation rates, so read them only when the offset changes.
+            self._gfactors = GrowFactors()
             # Update parameter_indexing_CPI_offset with new value.
             cpi_adj = super().adjust(
                 {"parameter_indexing_CPI_offset":
@@ -265,15 +316,7 @@ class Parameters(pt.Parameters):
             last_known_year = max(cpi_min_year["year"], self._last_known_year)
             # calculate 2026 value, using new inflation rates, for parameters
             # that revert to their pre-TCJA values.
-            long_params = ['II_brk7', 'II_brk6', 'II_brk5', 'II_brk4',
-                           'II_brk3', 'II_brk2', 'II_brk1',
-                           'PT_brk7', 'PT_brk6', 'PT_brk5', 'PT_brk4',
-                           'PT_brk3', 'PT_brk2', 'PT_brk1',
-                           'PT_qbid_taxinc_thd',
-                           'ALD_BusinessLosses_c',
-                           'STD', 'II_em', 'II_em_ps',
-                           'AMT_em', 'AMT_em_ps', 'AMT_em_pe',
-                           'ID_ps', 'ID_AllTaxes_c']
+            long_params = TCJA_REVERTING_PARAMS
             final_ifactor = 1.0
             pyear = 2017  # prior year before TCJA first implemented
             fyear = 2026  # final year in which parameter values revert to
@@ -328,7 +371,9 @@ class Parameters(pt.Parameters):
             self.delete(to_delete, **kwargs)
             super().adjust(init_vals, **kwargs)
 
-            self.extend(label="year")
+            # Only parameters whose values were reset above have gaps
+            # that need to be filled, so leave all other parameters alone.
+            self.extend(label="year", params=set(needs_reset))
 
         # 2. Handle -indexed parameters.
         self.label_to_extend = None
@@ -724,6 +769,39 @@ class Parameters(pt.Parameters):
                     years.append(year)
         return years
 
+    def __deepcopy__(self, memo):
+        """
+        Returns a copy that shares the parts of this object that do not
+        change after construction (the ParamTools schemas, the parameter
+        metadata and the default values) and copies everything else.
+        Only the value objects of each parameter are copied because they
+        are the only part of the parameter data changed by adjust.
+        This makes the copies done in the Calculator constructor cheap.
+        """
+        clone = self.__class__.__new__(self.__class__)
+        memo[id(self)] = clone
+        shared = ("_defaults_schema", "_schema", "label_validators",
+                  "_init_values")
+        for attr, val in self.__dict__.items():
+            if attr in shared:
+                setattr(clone, attr, val)
+            elif attr == "_data":
+                clone._data = type(val)(
+                    (param, dict(data, value=[dict(vo)
+                                              for vo in data["value"]]))
+                    for param, data in val.items()
+                )
+            elif attr == "_search_trees":
+                # trees are rebuilt from the copied value objects when needed
+                clone._search_trees = {}
+            elif attr == "_validator_schema":
+                # validation reads other parameter values from the context
+                clone._validator_schema = copy.copy(val)
+                clone._validator_schema.context = {"spec": clone}
+            else:
+                setattr(clone, attr, copy.deepcopy(val, memo))
+        return clone
+
     def __getattr__(self, attr):
         """
         Allows the user to get the value of a parameter over all years,
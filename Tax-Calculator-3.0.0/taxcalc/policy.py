@@ -133,6 +133,47 @@ class Policy(Parameters):
             defaults = json.loads(f.read())  # pylint: disable=protected-access
         return [k for k in defaults if k != "schema"]
 
+    @property
+    def II_schedule(self):
+        """
+        Returns current-year regular tax-rate schedule table used by the
+        ScheduleTax function in the calcfunctions.py file.
+        """
+        return self._rate_schedule('II')
+
+    @property
+    def PT_schedule(self):
+        """
+        Returns current-year pass-through tax-rate schedule table used by
+        the ScheduleTax function in the calcfunctions.py file.
+        """
+        return self._rate_schedule('PT')
+
+    def _rate_schedule(self, prefix):
+        """
+        Returns array of shape (1, number of MARS values, 3, 8) containing
+        for each filing status the bottom of each of the eight tax brackets
+        specified by the prefix_rt* and prefix_brk* parameters, the tax on
+        income equal to the bottom of each bracket, and the tax rate in each
+        bracket.  The tax at the bottom of each bracket is accumulated in
+        the same order as the Taxes function adds its bracket amounts, so
+        ScheduleTax returns exactly the same tax as Taxes.
+        """
+        rates = [getattr(self, '{}_rt{}'.format(prefix, num))[0]
+                 for num in range(1, 9)]
+        brks = [getattr(self, '{}_brk{}'.format(prefix, num))[0]
+                for num in range(1, 8)]
+        table = np.zeros((1, len(brks[0]), 3, 8))
+        table[0, :, 0, 1:] = np.column_stack(brks)
+        table[0, :, 2, :] = rates
+        bottom = table[0, :, 0, :]
+        tax = table[0, :, 1, :]
+        for bkt in range(1, 8):
+            tax[:, bkt] = (tax[:, bkt - 1] +
+                           rates[bkt - 1] * (bottom[:, bkt] -
+                                             bottom[:, bkt - 1]))
+        return table
+
     def set_rates(self):
         """Initialize taxcalc indexing data."""
         cpi_vals = [
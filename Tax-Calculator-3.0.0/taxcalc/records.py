@@ -9,6 +9,7 @@ import os
 import numpy as np
 import pandas as pd
 from taxcalc.data import Data
+from taxcalc.decorators import JIT
 from taxcalc.growfactors import GrowFactors
 from taxcalc.utils import read_egg_csv
 
@@ -68,6 +69,25 @@ class Records(Data):
         any smoothing of stair-step provisions in income tax law;
         default value is false.
 
+    sample_frac: float or None
+        None implies all records in data are used;
+        float in (0,1] implies a stratified random sub-sample containing
+        roughly that fraction of the records is used (see the
+        stratified_sample method), with the sample weights of the records
+        in each stratum scaled up by the inverse of the fraction of the
+        stratum that is drawn, so that weighted totals are unbiased
+        estimates of those of the full sample; default value is None.
+        NOTE: use a sub-sample only to preview results quickly.
+
+    sample_seed: integer
+        seed of the random number generator used to draw the sub-sample
+        when sample_frac is not None; default value is zero.
+
+    compact_dtypes: boolean
+        specifies whether or not input variables are stored in compact
+        types as described in the Data class documentation;
+        default value is false.
+
     Raises
     ------
     ValueError:
@@ -76,6 +96,7 @@ class Records(Data):
         if dividends is less than qualified dividends.
         if gfactors is not None or a GrowFactors class instance.
         if start_year is not an integer.
+        if sample_frac is not None and not in the (0,1] range.
         if files cannot be found.
 
     Returns
@@ -108,6 +129,10 @@ class Records(Data):
     PUFCSV_YEAR = 2011
     CPSCSV_YEAR = 2014
 
+    # fingerprints of data files whose records have passed the validity
+    # checks in the constructor (see _data_fingerprint method)
+    _VALID_DATA_FINGERPRINTS = set()
+
     PUF_WEIGHTS_FILENAME = 'puf_weights.csv.gz'
     PUF_RATIOS_FILENAME = 'puf_ratios.csv'
     CPS_WEIGHTS_FILENAME = 'cps_weights.csv.gz'
@@ -122,11 +147,31 @@ class Records(Data):
                  gfactors=GrowFactors(),
                  weights=PUF_WEIGHTS_FILENAME,
                  adjust_ratios=PUF_RATIOS_FILENAME,
-                 exact_calculations=False):
+                 exact_calculations=False,
+                 sample_frac=None,
+                 sample_seed=0,
+                 compact_dtypes=False):
         # pylint: disable=no-member,too-many-branches
         if isinstance(weights, str):
             weights = os.path.join(Records.CODE_PATH, weights)
-        super().__init__(data, start_year, gfactors, weights)
+        fingerprint = Records._data_fingerprint(data, compact_dtypes,
+                                                sample_frac, sample_seed)
+        if sample_frac is not None and data is not None:
+            if isinstance(data, str):
+                if os.path.isfile(data):
+                    data = pd.read_csv(data)
+                else:  # find file in conda package
+                    data = read_egg_csv(data)  # pragma: no cover
+            positions, strata, factors = Records._stratified_sample(
+                data, sample_frac, sample_seed)
+            data = Records._sample_rows(data, positions, factors)
+        else:
+            strata, factors = None, None
+        super().__init__(data, start_year, gfactors, weights,
+                         compact_dtypes, sample_weight_factors=factors)
+        # stratum number of each sub-sample record (None when all records
+        # are used), which revenue_difference uses to resample each stratum
+        self.sample_strata = strata
         if data is None:
             return  # because there are no data
         # read adjustment ratios
@@ -135,65 +180,25 @@ class Records(Data):
         # specify exact value based on exact_calculations
         self.exact[:] = np.where(exact_calculations is True, 1, 0)
         # specify FLPDYR value based on start_year
-        self.FLPDYR.fill(start_year)
-        # check for valid MARS values
-        if not np.all(np.logical_and(np.greater_equal(self.MARS, 1),
-                                     np.less_equal(self.MARS, 5))):
-            raise ValueError('not all MARS values in [1,5] range')
+        self.FLPDYR = np.full(self.array_length, start_year,
+                              dtype=np.int32)
+        # check for valid input variable values unless the records were
+        # read from a data file whose records have already passed the checks
+        if fingerprint not in Records._VALID_DATA_FINGERPRINTS:
+            self._check_values()
+            if fingerprint is not None:
+                Records._VALID_DATA_FINGERPRINTS.add(fingerprint)
         # create variables derived from MARS, which is in MUST_READ_VARS
         self.num[:] = np.where(self.MARS == 2, 2, 1)
         self.sep[:] = np.where(self.MARS == 3, 2, 1)
-        # check for valid EIC values
-        if not np.all(np.logical_and(np.greater_equal(self.EIC, 0),
-                                     np.less_equal(self.EIC, 3))):
-            raise ValueError('not all EIC values in [0,3] range')
-        # check that three sets of split-earnings variables have valid values
-        msg = 'expression "{0} == {0}p + {0}s" is not true for every record'
-        tol = 0.020001  # handles "%.2f" rounding errors
-        if not np.allclose(self.e00200, (self.e00200p + self.e00200s),
-                           rtol=0.0, atol=tol):
-            raise ValueError(msg.format('e00200'))
-        if not np.allclose(self.e00900, (self.e00900p + self.e00900s),
-                           rtol=0.0, atol=tol):
-            raise ValueError(msg.format('e00900'))
-        if not np.allclose(self.e02100, (self.e02100p + self.e02100s),
-                           rtol=0.0, atol=tol):
-            raise ValueError(msg.format('e02100'))
-        # check that spouse income variables have valid values
-        nospouse = self.MARS != 2
-        zeros = np.zeros_like(self.MARS[nospouse])
-        msg = '{} is not always zero for non-married filing unit'
-        if not np.allclose(self.e00200s[nospouse], zeros):
-            raise ValueError(msg.format('e00200s'))
-        if not np.allclose(self.e00900s[nospouse], zeros):
-            raise ValueError(msg.format('e00900s'))
-        if not np.allclose(self.e02100s[nospouse], zeros):
-            raise ValueError(msg.format('e02100s'))
-        if not np.allclose(self.k1bx14s[nospouse], zeros):
-            raise ValueError(msg.format('k1bx14s'))
-        # check that ordinary dividends are no less than qualified dividends
-        other_dividends = np.maximum(0., self.e00600 - self.e00650)
-        if not np.allclose(self.e00600, self.e00650 + other_dividends,
-                           rtol=0.0, atol=tol):
-            msg = 'expression "e00600 >= e00650" is not true for every record'
-            raise ValueError(msg)
-        del other_dividends
-        # check that total pension income is no less than taxable pension inc
-        nontaxable_pensions = np.maximum(0., self.e01500 - self.e01700)
-        if not np.allclose(self.e01500, self.e01700 + nontaxable_pensions,
-                           rtol=0.0, atol=tol):
-            msg = 'expression "e01500 >= e01700" is not true for every record'
-            raise ValueError(msg)
-        del nontaxable_pensions
-        # check that PT_SSTB_income has valid value
-        if not np.all(np.logical_and(np.greater_equal(self.PT_SSTB_income, 0),
-                                     np.less_equal(self.PT_SSTB_income, 1))):
-            raise ValueError('not all PT_SSTB_income values are 0 or 1')
 
     @staticmethod
     def cps_constructor(data=None,
                         gfactors=GrowFactors(),
-                        exact_calculations=False):
+                        exact_calculations=False,
+                        sample_frac=None,
+                        sample_seed=0,
+                        compact_dtypes=False):
         """
         Static method returns a Records object instantiated with CPS
         input data.  This works in a analogous way to Records(), which
@@ -216,7 +221,33 @@ class Records(Data):
                        gfactors=gfactors,
                        weights=weights,
                        adjust_ratios=Records.CPS_RATIOS_FILENAME,
-                       exact_calculations=exact_calculations)
+                       exact_calculations=exact_calculations,
+                       sample_frac=sample_frac,
+                       sample_seed=sample_seed,
+                       compact_dtypes=compact_dtypes)
+
+    @staticmethod
+    def stratified_sample(data, frac, seed=0, num_weight_bins=4):
+        """
+        Static method returns a stratified random sub-sample of the
+        records in the specified data DataFrame, which is expected to
+        have the default (zero-based) integer index so that the rows of
+        a weights file can be matched to the sub-sample records.
+        Records are grouped into strata defined by filing status (MARS),
+        historical AGI category (agi_bin, if in data) and quantile bins
+        of the sample weight (s006, if in data), and the same fraction of
+        the records in each stratum is drawn without replacement, with at
+        least one record drawn from every stratum.  The s006 value of each
+        sub-sample record is scaled up by N/n, where N is the number of
+        records in its stratum and n is the number drawn from the stratum,
+        so weighted totals of the sub-sample are unbiased estimates of
+        those of data even for strata whose one record is more than frac
+        of the stratum.  The sub-sample records keep their index values
+        and their original order.
+        """
+        positions, _, factors = Records._stratified_sample(data, frac, seed,
+                                                           num_weight_bins)
+        return Records._sample_rows(data, positions, factors)
 
     def increment_year(self):
         """
@@ -242,6 +273,137 @@ class Records(Data):
 
     # ----- begin private methods of Records class -----
 
+    @staticmethod
+    def _data_fingerprint(data, compact_dtypes, sample_frac, sample_seed):
+        """
+        Return tuple that identifies the contents of the data file named
+        by data (using its path, size and modification time), the
+        sub-sample of its records that is used and the way their values
+        are stored, or None if data does not name a local file.
+        """
+        if not isinstance(data, str) or not os.path.isfile(data):
+            return None
+        stat = os.stat(data)
+        return (os.path.realpath(data), stat.st_size, stat.st_mtime_ns,
+                sample_frac, sample_seed, compact_dtypes)
+
+    @staticmethod
+    def _stratified_sample(data, frac, seed=0, num_weight_bins=4):
+        """
+        Return (positions, strata, factors) tuple of arrays that describe
+        the sub-sample drawn by the stratified_sample method: the sorted
+        row positions in data of the sub-sample records, the stratum
+        number of each sub-sample record, and the N/n factor that scales
+        up the weight of each sub-sample record.
+        """
+        if not isinstance(data, pd.DataFrame):
+            raise ValueError('data is not a Pandas DataFrame')
+        if not 0. < frac <= 1.:
+            raise ValueError('frac={} is not in (0,1] range'.format(frac))
+        strata = [data['MARS'].values]
+        if 'agi_bin' in data.columns:
+            strata.append(data['agi_bin'].values)
+        if 's006' in data.columns:
+            strata.append(pd.qcut(data['s006'].values, num_weight_bins,
+                                  labels=False, duplicates='drop'))
+        # records with a missing stratum value, which include all records
+        # when the s006 values are too few to make quantile bins, are put
+        # in a stratum of their own rather than being dropped by groupby
+        groups = pd.DataFrame(dict(enumerate(strata))).fillna(-1).groupby(
+            list(range(len(strata)))).indices
+        rng = np.random.RandomState(seed)
+        chosen = list()
+        stratum = list()
+        factor = list()
+        for num, key in enumerate(sorted(groups)):
+            ixs = groups[key]
+            size = max(1, int(round(frac * len(ixs))))
+            chosen.append(rng.choice(ixs, size=size, replace=False))
+            stratum.append(np.full(size, num, dtype=np.int32))
+            factor.append(np.full(size, len(ixs) / size))
+        chosen = np.concatenate(chosen)
+        order = np.argsort(chosen)
+        return (chosen[order], np.concatenate(stratum)[order],
+                np.concatenate(factor)[order])
+
+    @staticmethod
+    def _sample_rows(data, positions, factors):
+        """
+        Return copy of the data rows at the specified positions with each
+        s006 value (if in data) multiplied by the corresponding factor.
+        """
+        sample = data.iloc[positions].copy()
+        if 's006' in sample.columns:
+            sample['s006'] *= factors
+        return sample
+
+    def _check_values(self):
+        """
+        Raise ValueError if input variable values are not valid.
+        The checks are first done in a single pass through the records
+        that stops at the first record that fails any check, and only
+        when there is such a record are the checks done again variable
+        by variable to find the one whose values are not valid.
+        """
+        # pylint: disable=no-member
+        tol = 0.020001  # handles "%.2f" rounding errors
+        if _first_invalid_record(self.MARS, self.EIC, self.PT_SSTB_income,
+                                 self.e00200, self.e00200p, self.e00200s,
+                                 self.e00900, self.e00900p, self.e00900s,
+                                 self.e02100, self.e02100p, self.e02100s,
+                                 self.k1bx14s, self.e00600, self.e00650,
+                                 self.e01500, self.e01700, tol) < 0:
+            return
+        # check for valid MARS values
+        if not np.all(np.logical_and(np.greater_equal(self.MARS, 1),
+                                     np.less_equal(self.MARS, 5))):
+            raise ValueError('not all MARS values in [1,5] range')
+        # check for valid EIC values
+        if not np.all(np.logical_and(np.greater_equal(self.EIC, 0),
+                                     np.less_equal(self.EIC, 3))):
+            raise ValueError('not all EIC values in [0,3] range')
+        # check that three sets of split-earnings variables have valid values
+        msg = 'expression "{0} == {0}p + {0}s" is not true for every record'
+        if not np.allclose(self.e00200, (self.e00200p + self.e00200s),
+                           rtol=0.0, atol=tol):
+            raise ValueError(msg.format('e00200'))
+        if not np.allclose(self.e00900, (self.e00900p + self.e00900s),
+                           rtol=0.0, atol=tol):
+            raise ValueError(msg.format('e00900'))
+        if not np.allclose(self.e02100, (self.e02100p + self.e02100s),
+                           rtol=0.0, atol=tol):
+            raise ValueError(msg.format('e02100'))
+        # check that spouse income variables have valid values
+        nospouse = self.MARS != 2
+        zeros = np.zeros_like(self.MARS[nospouse])
+        msg = '{} is not always zero for non-married filing unit'
+        if not np.allclose(self.e00200s[nospouse], zeros):
+            raise ValueError(msg.format('e00200s'))
+        if not np.allclose(self.e00900s[nospouse], zeros):
+            raise ValueError(msg.format('e00900s'))
+        if not np.allclose(self.e02100s[nospouse], zeros):
+            raise ValueError(msg.format('e02100s'))
+        if not np.allclose(self.k1bx14s[nospouse], zeros):
+            raise ValueError(msg.format('k1bx14s'))
+        # check that ordinary dividends are no less than qualified dividends
+        other_dividends = np.maximum(0., self.e00600 - self.e00650)
+        if not np.allclose(self.e00600, self.e00650 + other_dividends,
+                           rtol=0.0, atol=tol):
+            msg = 'expression "e00600 >= e00650" is not true for every record'
+            raise ValueError(msg)
+        del other_dividends
+        # check that total pension income is no less than taxable pension inc
+        nontaxable_pensions = np.maximum(0., self.e01500 - self.e01700)
+        if not np.allclose(self.e01500, self.e01700 + nontaxable_pensions,
+                           rtol=0.0, atol=tol):
+            msg = 'expression "e01500 >= e01700" is not true for every record'
+            raise ValueError(msg)
+        del nontaxable_pensions
+        # check that PT_SSTB_income has valid value
+        if not np.all(np.logical_and(np.greater_equal(self.PT_SSTB_income, 0),
+                                     np.less_equal(self.PT_SSTB_income, 1))):
+            raise ValueError('not all PT_SSTB_income values are 0 or 1')
+
     def _extrapolate(self, year):
         """
         Apply to variables the grow factor values for specified calendar year.
@@ -598,3 +760,43 @@ class Records(Data):
         self.ADJ = pd.DataFrame()
         setattr(self, 'ADJ', ADJ.astype(np.float32))
         del ADJ
+
+
+@JIT(nopython=True, cache=True)
+def _first_invalid_record(MARS, EIC, PT_SSTB_income,
+                          e00200, e00200p, e00200s,
+                          e00900, e00900p, e00900s,
+                          e02100, e02100p, e02100s,
+                          k1bx14s, e00600, e00650, e01500, e01700, tol):
+    """
+    Return index of first record that fails any of the checks done in
+    the Records._check_values method, or -1 if all records pass them.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals,invalid-name
+    for idx in range(len(MARS)):
+        if MARS[idx] < 1 or MARS[idx] > 5:
+            return idx
+        if EIC[idx] < 0 or EIC[idx] > 3:
+            return idx
+        if not abs(e00200[idx] - (e00200p[idx] + e00200s[idx])) <= tol:
+            return idx
+        if not abs(e00900[idx] - (e00900p[idx] + e00900s[idx])) <= tol:
+            return idx
+        if not abs(e02100[idx] - (e02100p[idx] + e02100s[idx])) <= tol:
+            return idx
+        if MARS[idx] != 2:
+            if not (abs(e00200s[idx]) <= 1e-8 and
+                    abs(e00900s[idx]) <= 1e-8 and
+                    abs(e02100s[idx]) <= 1e-8 and
+                    abs(k1bx14s[idx]) <= 1e-8):
+                return idx
+        other_dividends = max(0., e00600[idx] - e00650[idx])
+        if not abs(e00600[idx] - (e00650[idx] + other_dividends)) <= tol:
+            return idx
+        nontaxable_pensions = max(0., e01500[idx] - e01700[idx])
+        if not abs(e01500[idx] -
+                   (e01700[idx] + nontaxable_pensions)) <= tol:
+            return idx
+        if PT_SSTB_income[idx] < 0 or PT_SSTB_income[idx] > 1:
+            return idx
+    return -1
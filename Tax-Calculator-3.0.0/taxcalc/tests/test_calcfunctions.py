@@ -8,7 +8,9 @@ Tests for Tax-Calculator calcfunctions.py logic.
 import os
 import re
 import ast
-from taxcalc import Records  # pylint: disable=import-error
+import numpy as np
+from taxcalc import Policy, Records  # pylint: disable=import-error
+from taxcalc.calcfunctions import Taxes, ScheduleTax
 
 
 class GetFuncDefs(ast.NodeVisitor):
@@ -161,3 +163,28 @@ def test_function_args_usage(tests_path):
                 msg += 'FUNCTION,ARGUMENT= {} {}\n'.format(fname, arg)
     if found_error:
         raise ValueError(msg)
+
+
+def test_schedule_tax_matches_taxes():
+    """
+    Checks that ScheduleTax returns exactly the same tax amounts as Taxes
+    with a zero tbrk_base, including incomes at and next to bracket tops.
+    """
+    pol = Policy()
+    pol.implement_reform({'II_rt3': {2021: 0.2717}, 'PT_rt7': {2021: 0.3333}})
+    pol.set_year(2021)
+    incomes = np.concatenate([np.linspace(1., 1e6, 1001),
+                              np.geomspace(1e-3, 1e9, 1001)])
+    for prefix in ['II', 'PT']:
+        rates = [getattr(pol, '{}_rt{}'.format(prefix, num))[0]
+                 for num in range(1, 9)]
+        brks = [getattr(pol, '{}_brk{}'.format(prefix, num))[0]
+                for num in range(1, 8)]
+        schedule = getattr(pol, '{}_schedule'.format(prefix))[0]
+        for mars in range(1, 6):
+            tops = np.array([brk[mars - 1] for brk in brks[:6]])
+            for income in np.concatenate([incomes, tops,
+                                          np.nextafter(tops, 0.),
+                                          np.nextafter(tops, np.inf)]):
+                assert (ScheduleTax(income, mars, schedule) ==
+                        Taxes(income, mars, 0., *(rates + brks)))
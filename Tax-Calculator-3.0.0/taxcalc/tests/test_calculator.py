@@ -13,7 +13,9 @@ import copy
 import pytest
 import numpy as np
 import pandas as pd
+import taxcalc
 from taxcalc import Policy, Records, Calculator, Consumption
+from taxcalc import DIST_VARIABLES, create_diagnostic_table
 
 
 def test_make_calculator(cps_subsample):
@@ -384,6 +386,87 @@ def test_calculator_using_nonstd_input():
     assert np.allclose(mtr_ptax, exp_mtr_ptax)
 
 
+def test_dataframe_copy_and_types():
+    """
+    Test that dataframe columns have the one type of all the variables
+    and that copy=False columns of that type share memory with the
+    Records variables.
+    """
+    data = pd.DataFrame({'RECID': [1, 2, 3], 'MARS': [1, 2, 1],
+                         'e00200': [1e4, 5e4, 2e5],
+                         'e00200p': [1e4, 5e4, 2e5]})
+    recs = Records(data=data, start_year=2019, gfactors=None, weights=None)
+    calc = Calculator(policy=Policy(), records=recs, sync_years=False)
+    calc.calc_all()
+    varlist = ['MARS', 'e00200', 'iitax']
+    for copy_arg in [True, False]:
+        dframe = calc.dataframe(varlist, copy=copy_arg)
+        assert list(dframe.columns) == varlist
+        for var in varlist:
+            assert dframe[var].dtype == np.float64
+            assert np.array_equal(dframe[var].values, calc.array(var))
+            shared = np.shares_memory(dframe[var].values, calc.array(var))
+            assert shared == (not copy_arg and var != 'MARS')
+    assert calc.dataframe(['MARS', 'XTOT']).dtypes.tolist() == [np.int32] * 2
+    dframe = calc.dataframe(varlist)
+    calc.incarray('e00200', np.array([1e3, 1e3, 1e3]))
+    assert dframe['e00200'].values[0] == 1e4
+    adf = calc.dataframe([], all_vars=True, copy=False)
+    assert adf.shape[1] == len(recs.USABLE_READ_VARS | recs.CALCULATED_VARS)
+
+
+def test_dataframe_copy_false_users_do_not_change_records():
+    """
+    Test that the methods that use dataframe with copy=False do not
+    change the Records variables.
+    """
+    nrecs = 3000
+    rng = np.random.RandomState(112358)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'XTOT': rng.randint(1, 5, size=nrecs),
+        'age_head': rng.randint(20, 90, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1.2, size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data.loc[:99, 'e00200'] = 0.
+    data['e00200p'] = data['e00200']
+    data['e00900'] = np.where(data['RECID'] <= 50, -5000., 0.)
+    data['e00900p'] = data['e00900']
+    recs = Records(data=data, start_year=2019, gfactors=None, weights=None)
+    calc1 = Calculator(policy=Policy(), records=recs, sync_years=False)
+    calc1.calc_all()
+    calc2 = copy.deepcopy(calc1)
+    varlist = DIST_VARIABLES + ['MARS', 'age_head', 'combined']
+    before = calc1.dataframe(varlist)
+    calc1.distribution_tables(calc2, 'weighted_deciles')
+    calc1.difference_table(calc2, 'weighted_deciles', 'iitax')
+    calc1.ce_aftertax_income(calc2)
+    calc1.n65()
+    assert calc1.dataframe(varlist).equals(before)
+
+
+def test_arrow_table():
+    """
+    Test arrow_table method.
+    """
+    pyarrow = pytest.importorskip('pyarrow')
+    data = pd.DataFrame({'RECID': [1, 2], 'MARS': [1, 2],
+                         'e00200': [1e4, 5e4], 'e00200p': [1e4, 5e4]})
+    recs = Records(data=data, start_year=2019, gfactors=None, weights=None)
+    calc = Calculator(policy=Policy(), records=recs, sync_years=False)
+    calc.calc_all()
+    varlist = ['MARS', 'e00200', 'iitax']
+    table = calc.arrow_table(varlist)
+    assert isinstance(table, pyarrow.Table)
+    assert table.column_names == varlist
+    assert np.allclose(table.column('iitax').to_numpy(), calc.array('iitax'))
+    for var in varlist:
+        assert table.column(var).type == pyarrow.from_numpy_dtype(
+            calc.array(var).dtype)
+
+
 def test_bad_json_names(tests_path):
     """
     Test that ValueError raised with assump or reform do not end in '.json'
@@ -653,6 +736,72 @@ def test_difference_table(cps_subsample):
     assert isinstance(diff, pd.DataFrame)
 
 
+def test_table_rows_cache(monkeypatch):
+    """
+    Test that table methods reuse table rows until expanded_income changes.
+    """
+    nrecs = 3000
+    rng = np.random.RandomState(112358)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'XTOT': rng.randint(1, 5, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1.2, size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data.loc[:99, 'e00200'] = 0.
+    data['e00200p'] = data['e00200']
+    data['e00900'] = np.where(data['RECID'] <= 50, -5000., 0.)
+    data['e00900p'] = data['e00900']
+    cyr = 2019
+    recs = Records(data=data, start_year=cyr, gfactors=None, weights=None)
+    pol = Policy()
+    pol.set_year(cyr)
+    calc1 = Calculator(policy=pol, records=recs, sync_years=False)
+    pol.implement_reform({'II_rt4': {cyr: 0.30}})
+    calc2 = Calculator(policy=pol, records=recs, sync_years=False)
+    calc1.calc_all()
+    calc2.calc_all()
+    num_calls = [0]
+    original_table_row_index = taxcalc.calculator.table_row_index
+
+    def counting_table_row_index(*args, **kwargs):
+        num_calls[0] += 1
+        return original_table_row_index(*args, **kwargs)
+
+    monkeypatch.setattr(taxcalc.calculator, 'table_row_index',
+                        counting_table_row_index)
+    diff1 = calc1.difference_table(calc2, 'weighted_deciles', 'iitax')
+    dist1, _ = calc1.distribution_tables(calc2, 'weighted_deciles')
+    calc1.difference_table(calc2, 'weighted_deciles', 'combined')
+    assert num_calls[0] == 2  # one for calc1 and one for calc2
+    calc1.mtr(calc_all_already_called=True)
+    calc1.difference_table(calc2, 'standard_income_bins', 'iitax')
+    assert num_calls[0] == 3
+    # changing policy that does not affect expanded_income keeps cache
+    rt4 = calc1.policy_param('II_rt4')
+    calc1.policy_param('II_rt4', [0.29])
+    calc1.calc_all(partial=True)
+    calc1.difference_table(calc2, 'weighted_deciles', 'iitax')
+    assert num_calls[0] == 3
+    # changing expanded_income invalidates cache
+    raise_wages = np.where(calc1.array('e00200') > 0., 1000., 0.)
+    calc1.incarray('e00200', raise_wages)
+    calc1.incarray('e00200p', raise_wages)
+    calc1.calc_all()
+    calc1.difference_table(calc2, 'weighted_deciles', 'iitax')
+    assert num_calls[0] == 4
+    calc1.incarray('e00200', -raise_wages)
+    calc1.incarray('e00200p', -raise_wages)
+    calc1.policy_param('II_rt4', [rt4])
+    calc1.calc_all()
+    assert calc1.difference_table(calc2, 'weighted_deciles',
+                                  'iitax').equals(diff1)
+    assert calc1.distribution_tables(calc2,
+                                     'weighted_deciles')[0].equals(dist1)
+    assert num_calls[0] == 5
+
+
 def test_diagnostic_table(cps_subsample):
     """
     Test diagnostic_table method.
@@ -663,6 +812,100 @@ def test_diagnostic_table(cps_subsample):
     assert isinstance(adt, pd.DataFrame)
 
 
+def test_diagnostic_table_streaming():
+    """
+    Test that diagnostic_table computed from weighted reductions of the
+    variable arrays equals table computed from a DataFrame for each year.
+    """
+    nrecs = 2000
+    rng = np.random.RandomState(987654321)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1., size=nrecs).round(),
+        'e19200': rng.lognormal(8., 1.5, size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    cyr = 2019
+    nyrs = 3
+    recs = Records(data=data, start_year=cyr, gfactors=None, weights=None)
+    pol = Policy()
+    pol.set_year(cyr)
+    calc = Calculator(policy=pol, records=recs, sync_years=False)
+    calc.calc_all()
+    iitax = calc.array('iitax').copy()
+    adt = calc.diagnostic_table(nyrs)
+    assert calc.current_year == cyr
+    assert np.allclose(calc.array('iitax'), iitax)
+    # compute diagnostic table the old way from a DataFrame for each year
+    dcalc = copy.deepcopy(calc)
+    dflist = list()
+    for iyr in range(1, nyrs + 1):
+        dcalc.calc_all()
+        dflist.append(dcalc.dataframe(DIST_VARIABLES))
+        if iyr < nyrs:
+            dcalc.increment_year()
+    expect = create_diagnostic_table(dflist, list(range(cyr, cyr + nyrs)))
+    assert list(adt.columns) == list(expect.columns)
+    assert list(adt.index) == list(expect.index)
+    assert np.allclose(adt.values, expect.values)
+
+
+def test_average_mtrs():
+    """
+    Test average_mtrs method against income-weighted averages of rates
+    computed by separate mtr calls.
+    """
+    nrecs = 2000
+    rng = np.random.RandomState(24680)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1., size=nrecs).round(),
+        'e00300': rng.lognormal(7., 2., size=nrecs).round(),
+        'e00600': rng.lognormal(7., 2., size=nrecs).round(),
+        'p23250': rng.lognormal(8., 2., size=nrecs).round(),
+        'e00900': rng.normal(5e3, 2e4, size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    data['e00900p'] = data['e00900']
+    data['e00650'] = (0.5 * data['e00600']).round()
+    cyr = 2019
+    recs = Records(data=data, start_year=cyr, gfactors=None, weights=None)
+    pol = Policy()
+    pol.set_year(cyr)
+    calc1 = Calculator(policy=pol, records=recs, sync_years=False)
+    pol.implement_reform({'II_rt7': {cyr: 0.45}, 'CG_rt3': {cyr: 0.30}})
+    calc2 = Calculator(policy=pol, records=recs, sync_years=False)
+    sources = {'wages': {'e00200p': 1},
+               'interest': {'e00300': 1},
+               'ltcapgain': {'p23250': 1},
+               'businc': {'e00900p': 1, 'e26270': -1}}
+    table = calc1.average_mtrs(calc2, income_sources=sources)
+    assert list(table.index) == list(sources.keys())
+    assert list(table.columns) == ['base', 'reform']
+    assert table.at['ltcapgain', 'reform'] > table.at['ltcapgain', 'base']
+    # compare with rates computed the slow way
+    for label, calc in zip(['base', 'reform'], [calc1, calc2]):
+        calc.calc_all()
+        wght = calc.array('s006')
+        for name, source in sources.items():
+            income = 0.
+            rate = 0.
+            for var, sign in source.items():
+                income = income + sign * calc.array(var)
+                rate = rate + sign * calc.mtr(
+                    variable_str=var, wrt_full_compensation=False)[1]
+            mask = (calc.array('c04800') > 0.) & (income > 0.)
+            expect = ((rate * income * wght)[mask].sum() /
+                      (income * wght)[mask].sum())
+            assert np.allclose(table.at[name, label], expect)
+    with pytest.raises(ValueError):
+        calc1.average_mtrs(mtr_measure='nonsense')
+
+
 def test_mtr_graph(cps_subsample):
     """
     Test mtr_graph method.
@@ -894,3 +1137,219 @@ def test_calc_all_benefits_amounts(cps_subsample):
 
     assert np.allclose(ubi_diff, benefit_cost_diff)
     assert np.allclose(ubi_diff, benefit_value_diff)
+
+
+def test_revenue_difference(monkeypatch):
+    """
+    Test revenue_difference method using a sub-sample of synthetic records.
+    """
+    nrecs = 4000
+    rng = np.random.RandomState(123456789)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1., size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    cyr = 2019
+    reform = {'II_rt7': {cyr: 0.40}, 'II_rt6': {cyr: 0.37}}
+
+    def revenue(sample_frac):
+        """
+        Return revenue_difference dictionary for specified sample_frac.
+        """
+        recs = Records(data=data, start_year=cyr, gfactors=None,
+                       weights=None, sample_frac=sample_frac)
+        pol = Policy()
+        pol.set_year(cyr)
+        calc1 = Calculator(policy=pol, records=recs, sync_years=False)
+        pol.implement_reform(reform)
+        calc2 = Calculator(policy=pol, records=recs, sync_years=False)
+        calc1.calc_all()
+        calc2.calc_all()
+        return calc1.revenue_difference(calc2, 'iitax', num_samples=200)
+
+    full = revenue(None)
+    assert full['estimate'] > 0.
+    assert full['cilo'] <= full['estimate'] <= full['cihi']
+    preview = revenue(0.25)
+    assert preview['se'] > full['se']
+    assert abs(preview['estimate'] - full['estimate']) < 4. * preview['se']
+    # bootstrap samples of the sub-sample resample records within strata
+    recs = Records(data=data, start_year=cyr, gfactors=None,
+                   weights=None, sample_frac=0.25)
+    assert recs.sample_strata is not None
+    calls = list()
+
+    def bootstrap(*args, **kwargs):
+        """
+        Record strata passed to bootstrap_se_ci.
+        """
+        calls.append(kwargs.get('strata'))
+        return taxcalc.utils.bootstrap_se_ci(*args, **kwargs)
+
+    monkeypatch.setattr(taxcalc.calculator, 'bootstrap_se_ci', bootstrap)
+    calc = Calculator(policy=Policy(), records=recs, sync_years=False)
+    calc.calc_all()
+    calc.revenue_difference(calc, 'iitax', num_samples=10)
+    assert np.array_equal(calls[0], recs.sample_strata)
+
+
+def test_solve_parameter():
+    """
+    Test solve_parameter method using synthetic records.
+    """
+    nrecs = 2000
+    rng = np.random.RandomState(123456789)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'XTOT': rng.randint(1, 5, size=nrecs),
+        'n24': rng.randint(0, 3, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1., size=nrecs).round(),
+        'e19200': rng.lognormal(8., 1., size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    cyr = 2021
+    recs = Records(data=data, start_year=cyr, gfactors=None, weights=None)
+    pol = Policy()
+    pol.set_year(cyr)
+    calc1 = Calculator(policy=pol, records=recs, sync_years=False)
+    calc1.calc_all()
+    revenue1 = calc1.weighted_total('combined')
+    # find third-bracket rate that pays for a larger child tax credit
+    pol.implement_reform({'CTC_c': {cyr: 3000}})
+    calc2 = Calculator(policy=pol, records=recs, sync_years=False)
+    rate = calc2.solve_parameter('II_rt3', revenue1, (0.2, 0.6),
+                                 revenue_tol=1e3)
+    assert 0.22 < rate < 0.6
+    assert abs(calc2.weighted_total('combined') - revenue1) <= 1e3
+    # check that results of partial recalculations equal those of calc_all
+    iitax2 = calc2.array('iitax').copy()
+    calc2.calc_all()
+    assert np.allclose(calc2.array('iitax'), iitax2)
+    pol.implement_reform({'II_rt3': {cyr: rate}})
+    calc3 = Calculator(policy=pol, records=recs, sync_years=False)
+    calc3.calc_all()
+    assert np.allclose(calc3.array('aftertax_income'),
+                       calc2.array('aftertax_income'))
+    # check errors
+    with pytest.raises(ValueError):
+        calc2.solve_parameter('II_rt3', revenue1, (0.1, 0.2))
+    assert calc2.policy_param('II_rt3') == rate
+    with pytest.raises(ValueError):
+        calc2.solve_parameter('no_such_param', revenue1, (0.2, 0.6))
+    with pytest.raises(ValueError):
+        calc2.solve_parameter('CTC_new_refund_limited', revenue1, (0, 1))
+
+
+def test_calc_all_recalculates_only_changes():
+    """
+    Test that calc_all results after changes in Records variables and
+    Policy parameters equal results of calc_all with no earlier results.
+    """
+    nrecs = 1000
+    rng = np.random.RandomState(123456789)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'XTOT': rng.randint(1, 5, size=nrecs),
+        'n24': rng.randint(0, 3, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1., size=nrecs).round(),
+        'e19200': rng.lognormal(8., 1., size=nrecs).round(),
+        'p23250': rng.normal(0., 20000., size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    cyr = 2021
+    recs = Records(data=data, start_year=cyr, gfactors=None, weights=None)
+    pol = Policy()
+    pol.set_year(cyr)
+    calc1 = Calculator(policy=pol, records=recs, sync_years=False)
+    calc1.calc_all()
+    # make changes like those made by behresp and by stacked reforms
+    cg_change = rng.normal(0., 1000., size=nrecs)
+    calc1.incarray('p23250', cg_change)
+    calc1.calc_all(partial=True)
+    calc1.policy_param('CTC_new_c', [3000.])
+    calc1.calc_all(partial=True)
+    calc1.policy_param('ID_BenefitSurtax_crt', [0.5])
+    calc1.calc_all(partial=True)
+    calc1.policy_param('FST_AGI_trt', [0.3])
+    calc1.calc_all(partial=True)
+    calc1.policy_param('ID_BenefitSurtax_crt', [1.])
+    calc1.calc_all(partial=True)
+    mtr1 = calc1.mtr('e00200p', calc_all_already_called=True)
+    # compare with results when all functions are called
+    data['p23250'] += cg_change
+    recs = Records(data=data, start_year=cyr, gfactors=None, weights=None)
+    pol.implement_reform({'CTC_new_c': {cyr: 3000},
+                          'FST_AGI_trt': {cyr: 0.3}})
+    calc2 = Calculator(policy=pol, records=recs, sync_years=False)
+    calc2.calc_all()
+    for var in ['iitax', 'payrolltax', 'combined', 'aftertax_income']:
+        assert np.allclose(calc1.array(var), calc2.array(var))
+    mtr2 = calc2.mtr('e00200p', zero_out_calculated_vars=True)
+    for mtr1_array, mtr2_array in zip(mtr1, mtr2):
+        assert np.allclose(mtr1_array, mtr2_array)
+    assert np.allclose(calc1.array('iitax'), calc2.array('iitax'))
+    # check that calc_all without partial notices direct array changes
+    calc1.array('e00200')[:] *= 2.
+    calc1.array('e00200p')[:] *= 2.
+    calc1.calc_all()
+    data['e00200'] *= 2.
+    data['e00200p'] *= 2.
+    recs = Records(data=data, start_year=cyr, gfactors=None, weights=None)
+    calc3 = Calculator(policy=pol, records=recs, sync_years=False)
+    calc3.calc_all()
+    assert np.allclose(calc1.array('iitax'), calc3.array('iitax'))
+    assert not np.allclose(calc1.array('iitax'), calc2.array('iitax'))
+
+
+def test_calc_all_steps_order(monkeypatch):
+    """
+    Test that calc_all calls the functions in the list of calc_all steps
+    used by partial recalculation in the same order, and that each
+    function that is not an iterate_jit function changes only the
+    variables listed as its outputs.
+    """
+    nrecs = 100
+    rng = np.random.RandomState(123456789)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'XTOT': rng.randint(1, 5, size=nrecs),
+        'e00200': rng.lognormal(10.5, 1., size=nrecs).round(),
+        'e19200': rng.lognormal(9., 1., size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    recs = Records(data=data, start_year=2021, gfactors=None, weights=None)
+    pol = Policy()
+    pol.set_year(2021)
+    calc = Calculator(policy=pol, records=recs, sync_years=False)
+    varnames = sorted(recs.USABLE_READ_VARS | recs.CALCULATED_VARS)
+    steps = Calculator._calc_all_steps()
+    outputs = {func.__name__: outs for func, _, outs in steps}
+    called = list()
+    call_step = Calculator._call_step
+
+    def recording_call_step(calcobj, func):
+        called.append(func.__name__)
+        if hasattr(func, 'in_args'):
+            call_step(calcobj, func)
+            return
+        before = {var: calcobj.array(var).copy() for var in varnames}
+        call_step(calcobj, func)
+        for var in varnames:
+            if not np.array_equal(calcobj.array(var), before[var]):
+                assert var in outputs[func.__name__]
+
+    monkeypatch.setattr(Calculator, '_call_step', recording_call_step)
+    expected = [func.__name__ for func, _, _ in steps]
+    for zero_out_calc_vars in [False, True]:
+        del called[:]
+        calc.calc_all(zero_out_calc_vars=zero_out_calc_vars)
+        assert called == expected
@@ -5,6 +5,7 @@ import os
 import sys
 import pytest
 import importlib
+import numba
 import numpy as np
 from pandas import DataFrame
 from pandas.testing import assert_frame_equal
@@ -30,6 +31,16 @@ def test_create_apply_function_string_with_params():
     assert ans == exp
 
 
+def test_create_apply_function_string_parallel():
+    ans = create_apply_function_string(['a', 'b', 'c'], ['d', 'e'], ['d'],
+                                       parallel=True)
+    exp = ("def ap_func(x_0,x_1,x_2,x_3,x_4):\n"
+           "  for i in prange(len(x_0)):\n"
+           "    x_0[i],x_1[i],x_2[i] = jitted_f(x_3,x_4[i])\n"
+           "  return x_0,x_1,x_2\n")
+    assert ans == exp
+
+
 def test_create_toplevel_function_string_mult_outputs():
     ans = create_toplevel_function_string(['a', 'b'], ['d', 'e'],
                                           ['pm', 'pm', 'pf', 'pm'])
@@ -330,3 +341,53 @@ def test_force_no_jit():
     # restore normal JIT operation of decorators module
     del os.environ['NOTAXCALCJIT']
     importlib.reload(taxcalc.decorators)
+
+
+def test_parallel_iterate_jit(monkeypatch):
+    """
+    Check that apply-style functions that loop over the rows in parallel,
+    which are created when the TAXCALC_PARALLEL environment variable is
+    set, produce the same results as the usual apply-style functions.
+    """
+    num_threads = numba.get_num_threads()
+    monkeypatch.setenv('TAXCALC_PARALLEL', '2')
+    try:
+        importlib.reload(taxcalc.decorators)
+        assert taxcalc.decorators.DO_PARALLEL
+        Magic_calc6_ = taxcalc.decorators.iterate_jit(
+            parameters=['w'], nopython=True)(Magic_calc6)
+        pm = Foo()
+        pf = Foo()
+        pm.a = np.ones((1, 1000))
+        pm.b = np.ones((1, 1000))
+        pm.w = np.full((1, 5), 2.)
+        pf.x = np.arange(1000.)
+        pf.y = np.ones((1000,))
+        pf.z = np.ones((1000,))
+        ans = Magic_calc6_(pm, pf)
+        exp = DataFrame(data={'a': pf.x + 1., 'b': pf.x + 4.},
+                        columns=['a', 'b'])
+        assert_frame_equal(ans, exp)
+    finally:
+        # restore normal operation of decorators module
+        monkeypatch.delenv('TAXCALC_PARALLEL')
+        importlib.reload(taxcalc.decorators)
+        numba.set_num_threads(num_threads)
+    assert not taxcalc.decorators.DO_PARALLEL
+
+
+@pytest.mark.parametrize('setting', ['', '0', 'false', 'False'])
+def test_parallel_setting_off(setting, monkeypatch):
+    """
+    Check that TAXCALC_PARALLEL values that mean off leave loops serial.
+    """
+    num_threads = numba.get_num_threads()
+    monkeypatch.setenv('TAXCALC_PARALLEL', setting)
+    try:
+        importlib.reload(taxcalc.decorators)
+        assert not taxcalc.decorators.DO_PARALLEL
+        assert numba.get_num_threads() == num_threads
+    finally:
+        monkeypatch.delenv('TAXCALC_PARALLEL')
+        importlib.reload(taxcalc.decorators)
+        numba.set_num_threads(num_threads)
@@ -845,6 +845,29 @@ def test_reform_with_out_of_range_error():
     assert pol.parameter_errors
 
 
+def test_deepcopy_is_independent():
+    """
+    Check that a deep copy of a Policy object, which shares its defaults
+    with the original, is reformed and validated independently.
+    """
+    pol1 = Policy()
+    pol1.implement_reform({'II_rt7': {2021: 0.396}})
+    pol2 = copy.deepcopy(pol1)
+    cmp_policy_objs(pol1, pol2)
+    pol2.implement_reform({'SS_thd50': {2020: [20000, 28000, 0,
+                                               20000, 20000]}})
+    pol1.set_year(2020)
+    assert np.allclose(pol1.SS_thd50, [25000, 32000, 25000, 25000, 25000])
+    # SS_thd85 below SS_thd50 is an error in pol1 but not in pol2
+    reform = {'SS_thd85': {2020: [22000, 30000, 0, 22000, 22000]}}
+    pol1.implement_reform(reform, raise_errors=False)
+    assert pol1.parameter_errors
+    pol2.implement_reform(reform, raise_errors=False)
+    assert not pol2.parameter_errors
+    pol2.set_year(2020)
+    assert np.allclose(pol2.SS_thd85, [22000, 30000, 0, 22000, 22000])
+
+
 def test_reform_with_warning():
     """
     Try to use warned out-of-range parameter value in reform.
@@ -868,6 +891,23 @@ def test_reform_with_warning():
     assert pol.ID_Medical_frt == np.array([0.05])
 
 
+def test_reform_with_warning_and_indexing_changes():
+    """
+    Check that the values restored after a warning in a reform that changes
+    parameter indexing are the same as when the warning is ignored.
+    """
+    reform = {'ID_Medical_frt': {2020: 0.05},
+              'CTC_c-indexed': {2020: True},
+              'parameter_indexing_CPI_offset': {2020: -0.001}}
+    pol1 = Policy()
+    pol1.implement_reform(reform, print_warnings=True)
+    assert pol1.warnings
+    pol2 = Policy()
+    pol2.implement_reform(reform, print_warnings=False)
+    assert pol2.warnings == {}
+    cmp_policy_objs(pol1, pol2)
+
+
 def test_reform_with_scalar_vector_errors():
     """
     Test catching scalar-vector confusion.
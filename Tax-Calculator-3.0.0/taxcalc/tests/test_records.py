@@ -232,3 +232,184 @@ def test_csv_input_vars_md_contents(tests_path):
         for var in valid_less_civ:
             msg += 'VARIABLE= {}\n'.format(var)
         raise ValueError(msg)
+
+
+def test_stratified_sample():
+    """
+    Test Records.stratified_sample method and sample_frac argument.
+    """
+    nrecs = 2000
+    rng = np.random.RandomState(123456789)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 5, size=nrecs),
+        'e00200': rng.lognormal(10., 1., size=nrecs).round(),
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    with pytest.raises(ValueError):
+        Records.stratified_sample(list(), 0.1)
+    with pytest.raises(ValueError):
+        Records.stratified_sample(data, 0.)
+    with pytest.raises(ValueError):
+        Records.stratified_sample(data, 1.1)
+    sample = Records.stratified_sample(data, 0.1, seed=1)
+    assert abs(len(sample.index) - 0.1 * nrecs) < 20
+    assert np.all(np.diff(sample.index.values) > 0)
+    factors = sample['s006'] / data.loc[sample.index, 's006']
+    assert np.allclose(factors.sum(), nrecs)
+    assert abs(sample['s006'].sum() / data['s006'].sum() - 1.) < 0.02
+    assert set(sample['MARS']) == set(data['MARS'])
+    for mars in range(1, 5):
+        frac = (sample['MARS'] == mars).mean()
+        assert abs(frac - (data['MARS'] == mars).mean()) < 0.01
+    assert sample.equals(Records.stratified_sample(data, 0.1, seed=1))
+    assert not sample.equals(Records.stratified_sample(data, 0.1, seed=2))
+    # check sample_frac argument to Records ctor
+    recs = Records(data=data, start_year=2019, gfactors=None,
+                   weights=None, sample_frac=0.1, sample_seed=1)
+    assert recs.array_length == len(sample.index)
+    assert np.allclose(recs.s006, sample['s006'].values)
+    assert np.allclose(recs.e00200, sample['e00200'].values)
+    # check records with constant weights or missing stratum values
+    data['s006'] = 100.
+    data['agi_bin'] = np.where(data['RECID'] % 10 == 0, np.nan, 1.)
+    sample = Records.stratified_sample(data, 0.1, seed=1)
+    assert abs(len(sample.index) - 0.1 * nrecs) < 20
+    assert np.allclose(sample['s006'].sum(), data['s006'].sum())
+    assert sample['agi_bin'].isnull().any()
+
+
+def test_stratified_sample_small_stratum_weights():
+    """
+    Test that the weights of a stratified sub-sample are scaled up stratum
+    by stratum, so that a stratum whose one sampled record is more than
+    the sampled fraction of the stratum is not over-represented.
+    """
+    nrecs = 202
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': np.where(np.arange(nrecs) < 200, 1, 2),
+        's006': np.full(nrecs, 100.)
+    })
+    data['e00200'] = np.where(data['MARS'] == 1, 1e3, 1e6)
+    data['e00200p'] = data['e00200']
+    full_total = (data['s006'] * data['e00200']).sum()
+    for seed in range(3):
+        sample = Records.stratified_sample(data, 0.1, seed=seed)
+        assert (sample['MARS'] == 2).sum() == 1
+        assert np.allclose((sample['s006'] * sample['e00200']).sum(),
+                           full_total)
+    # check that weights read from a weights file are scaled the same way
+    wghts = pd.DataFrame({'WT2019': np.full(nrecs, 10000),
+                          'WT2020': np.arange(nrecs) + 10000})
+    recs = Records(data=data, start_year=2019, gfactors=GrowFactors(),
+                   weights=wghts, adjust_ratios=None,
+                   sample_frac=0.1, sample_seed=1)
+    sample = Records.stratified_sample(data, 0.1, seed=1)
+    factors = (sample['s006'] / data.loc[sample.index, 's006']).values
+    assert np.allclose(recs.s006, sample['s006'].values)
+    assert np.allclose(recs.WT['WT2020'],
+                       wghts.loc[sample.index, 'WT2020'].values * factors)
+    assert np.allclose(recs.sample_strata, np.where(sample['MARS'] == 1,
+                                                    0, 1))
+
+
+def test_compact_dtypes():
+    """
+    Test Records compact_dtypes argument.
+    """
+    nrecs = 1000
+    rng = np.random.RandomState(123456789)
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': rng.randint(1, 3, size=nrecs),
+        'XTOT': rng.randint(1, 6, size=nrecs),
+        'age_head': rng.randint(18, 90, size=nrecs),
+        'e00200': rng.lognormal(10., 1., size=nrecs).round(),
+        'e00300': rng.lognormal(6., 2., size=nrecs).round(2) + 1e6,
+        's006': rng.uniform(10., 500., size=nrecs)
+    })
+    data['e00200p'] = data['e00200']
+    recs1 = Records(data=data, start_year=2019, gfactors=None, weights=None)
+    recs2 = Records(data=data, start_year=2019, gfactors=None, weights=None,
+                    compact_dtypes=True)
+    assert recs1.MARS.dtype == np.int32
+    assert recs2.MARS.dtype == np.int8
+    assert recs2.age_head.dtype == np.int8
+    assert recs2.RECID.dtype == np.int16
+    assert recs2.FLPDYR.dtype == np.int32
+    assert recs1.e00200.dtype == np.float64
+    assert recs2.e00200.dtype == np.float32
+    assert recs2.e00600.dtype == np.float32  # variable not in data
+    assert recs2.e00300.dtype == np.float64  # cents lost in float32
+    assert recs2.iitax.dtype == np.float64
+    assert recs2.num.dtype == np.int32
+    assert_array_equal(recs2.e00200, recs1.e00200)
+    assert_array_equal(recs2.e00300, recs1.e00300)
+    # check tax results are essentially the same
+    calc1 = Calculator(policy=Policy(), records=recs1, sync_years=False)
+    calc2 = Calculator(policy=Policy(), records=recs2, sync_years=False)
+    calc1.calc_all()
+    calc2.calc_all()
+    for varname in ['c00100', 'iitax', 'payrolltax']:
+        assert np.allclose(calc2.weighted_total(varname),
+                           calc1.weighted_total(varname), rtol=1e-6)
+    mtr1, _, _ = calc1.mtr('e00200p', calc_all_already_called=True)
+    mtr2, _, _ = calc2.mtr('e00200p', calc_all_already_called=True)
+    assert np.allclose(mtr2, mtr1)
+
+
+def test_validated_data_file_not_checked_again(tmpdir, monkeypatch):
+    """
+    Test that records read again from a data file that has not changed
+    since its records passed the validity checks are not checked again.
+    """
+    num_checks = list()
+    check_values = Records._check_values
+
+    def counting_check_values(recs):
+        num_checks.append(1)
+        check_values(recs)
+
+    monkeypatch.setattr(Records, '_check_values', counting_check_values)
+    csvpath = os.path.join(str(tmpdir), 'data.csv')
+    with open(csvpath, 'w') as csvfile:
+        csvfile.write('RECID,MARS,e00200,e00200p\n1,1,1000,1000\n')
+    for _ in range(2):
+        recs = Records(data=csvpath, start_year=2019,
+                       gfactors=None, weights=None)
+        assert recs.num[0] == 1
+    assert len(num_checks) == 1
+    recs = Records(data=csvpath, start_year=2019, gfactors=None,
+                   weights=None, compact_dtypes=True)
+    assert len(num_checks) == 2
+    # changing the contents of the data file causes the checks to be done
+    with open(csvpath, 'w') as csvfile:
+        csvfile.write('RECID,MARS,e00200,e00200p\n1,1,1000,900\n')
+    with pytest.raises(ValueError):
+        Records(data=csvpath, start_year=2019, gfactors=None, weights=None)
+    assert len(num_checks) == 3
+
+
+def test_sampled_data_file_checked_again_in_full(tmpdir):
+    """
+    Test that records read in full from a data file are checked even
+    though a sub-sample of its records has passed the validity checks.
+    """
+    nrecs = 50
+    data = pd.DataFrame({
+        'RECID': np.arange(1, nrecs + 1),
+        'MARS': np.ones(nrecs, dtype=np.int64),
+        'EIC': np.zeros(nrecs, dtype=np.int64)
+    })
+    data.loc[nrecs - 1, 'EIC'] = 7
+    csvpath = os.path.join(str(tmpdir), 'data.csv')
+    data.to_csv(csvpath, index=False)
+    sample = Records.stratified_sample(data, 0.1, seed=1)
+    assert nrecs - 1 not in sample.index
+    recs = Records(data=csvpath, start_year=2019, gfactors=None,
+                   weights=None, sample_frac=0.1, sample_seed=1)
+    assert recs.array_length == len(sample.index)
+    with pytest.raises(ValueError):
+        Records(data=csvpath, start_year=2019, gfactors=None, weights=None)
@@ -21,6 +21,7 @@ from taxcalc.utils import (DIST_VARIABLES,
                            DIFF_TABLE_COLUMNS, DIFF_TABLE_LABELS,
                            SOI_AGI_BINS,
                            create_difference_table,
+                           additive_table_row_sums,
                            weighted_sum, weighted_mean,
                            wage_weighted, agi_weighted,
                            expanded_income_weighted,
@@ -536,6 +537,59 @@ def test_add_quantile_trow_var():
                                               100, decile_details=True)
 
 
+def test_additive_table_row_sums():
+    table_row = np.array([0, 2, 0, 1, -1, 2])
+    count = np.array([1., 2., 3., 4., 5., 6.])
+    weight = np.array([10., 20., 30., 40., 50., 60.])
+    tax_diff = np.array([-5., 0., 5., -0.0001, 9., 2.])
+    sums = additive_table_row_sums(table_row, 4, count, weight, tax_diff,
+                                   {'tot_change': tax_diff})
+    assert list(sums.keys()) == ['count', 'tax_cut', 'tax_inc', 'tot_change']
+    assert np.allclose(sums['count'], [4., 4., 8., 0.])
+    assert np.allclose(sums['tax_cut'], [1., 0., 0., 0.])
+    assert np.allclose(sums['tax_inc'], [3., 0., 6., 0.])
+    assert np.allclose(sums['tot_change'], [100., -0.004, 120., 0.])
+
+
+def test_diff_table_groupby_sums():
+    """
+    Test that create_difference_table statistics equal pandas groupby sums.
+    """
+    nobs = 5000
+    rng = np.random.RandomState(13579)
+    vdf1 = pd.DataFrame(data=np.zeros((nobs, len(DIFF_VARIABLES))),
+                        columns=DIFF_VARIABLES)
+    vdf1['expanded_income'] = rng.lognormal(10.5, 1.2, size=nobs).round()
+    vdf1.loc[:199, 'expanded_income'] = 0.
+    vdf1['s006'] = rng.uniform(10., 500., size=nobs)
+    vdf1['XTOT'] = rng.randint(1, 5, size=nobs)
+    vdf1['combined'] = 0.2 * vdf1['expanded_income']
+    vdf1['aftertax_income'] = vdf1['expanded_income'] - vdf1['combined']
+    vdf2 = vdf1.copy()
+    vdf2['combined'] += rng.normal(0., 1000., size=nobs).round()
+    vdf2['aftertax_income'] = vdf2['expanded_income'] - vdf2['combined']
+    vdf1_copy = vdf1.copy()
+    diff = create_difference_table(vdf1, vdf2, 'soi_agi_bins', 'combined')
+    assert vdf1.equals(vdf1_copy)
+    gdf = add_income_table_row_variable(vdf1.copy(), 'expanded_income',
+                                        SOI_AGI_BINS)
+    gdf['tax_diff'] = vdf2['combined'] - vdf1['combined']
+    gdf['wdiff'] = gdf['tax_diff'] * gdf['s006']
+    gdf['cut'] = np.where(gdf['tax_diff'] < -0.001, gdf['s006'], 0.)
+    grouped = gdf.groupby('table_row')
+    expect_count = grouped['s006'].sum().values
+    expect_cut = grouped['cut'].sum().values
+    expect_change = grouped['wdiff'].sum().values
+    assert np.allclose(diff['count'].values[:-1],
+                       np.round(expect_count * 1e-6, 2))
+    assert np.allclose(diff['tax_cut'].values[:-1],
+                       np.round(expect_cut * 1e-6, 2))
+    assert np.allclose(diff['tot_change'].values[:-1],
+                       np.round(expect_change * 1e-9, 3))
+    assert np.allclose(diff.loc['ALL', 'tot_change'],
+                       np.round(gdf['wdiff'].sum() * 1e-9, 3))
+
+
 def test_dist_table_sum_row(cps_subsample):
     rec = Records.cps_constructor(data=cps_subsample)
     calc = Calculator(policy=Policy(), records=rec)
@@ -786,6 +840,56 @@ def test_bootstrap_se_ci():
     assert abs(bsd['cihi'] / 135.4 - 1) < 0.03
 
 
+def test_bootstrap_se_ci_blocks_and_weights():
+    data = np.random.RandomState(1).lognormal(size=500)
+    wght = np.random.RandomState(2).uniform(10., 100., size=500)
+    bsd = bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025)
+    # results do not depend on the size of the blocks of bootstrap samples
+    for block_size in [1, 7, 100]:
+        bsd_blk = bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025,
+                                  block_size=block_size)
+        assert bsd_blk == bsd
+    # weighted statistics resample weights along with data
+    bsd_wgt = bootstrap_se_ci(data, 1, 100, np.average, alpha=0.025,
+                              weights=np.ones_like(data))
+    bsd_avg = bootstrap_se_ci(data, 1, 100, np.mean, alpha=0.025)
+    assert np.allclose([bsd_wgt['se'], bsd_wgt['cilo'], bsd_wgt['cihi']],
+                       [bsd_avg['se'], bsd_avg['cilo'], bsd_avg['cihi']])
+    bsd_wgt = bootstrap_se_ci(data, 1, 100, np.average, alpha=0.025,
+                              weights=wght)
+    wavg = np.average(data, weights=wght)
+    assert bsd_wgt['cilo'] < wavg < bsd_wgt['cihi']
+    # process pool results are reproducible
+    bsd_pool = bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025,
+                               block_size=25, num_workers=2)
+    assert bsd_pool == bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025,
+                                       block_size=25, num_workers=3)
+    assert abs(bsd_pool['se'] / bsd['se'] - 1) < 0.3
+
+
+def test_bootstrap_se_ci_strata():
+    data = np.concatenate([np.full(50, 1.), np.full(450, 1000.)])
+    strata = np.concatenate([np.zeros(50, dtype=np.int32),
+                             np.ones(450, dtype=np.int32)])
+    # resampling within strata keeps the number of values in each stratum,
+    # so there is no sampling error when values are constant in each stratum
+    bsd = bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025, strata=strata)
+    assert bsd['se'] == 0.
+    assert bsd['cilo'] == bsd['cihi'] == data.sum()
+    assert bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025)['se'] > 0.
+    # results do not depend on the size of the blocks of bootstrap samples
+    data = np.random.RandomState(1).lognormal(size=500)
+    np.random.RandomState(2).shuffle(strata)
+    bsd = bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025, strata=strata)
+    for block_size in [1, 7, 100]:
+        bsd_blk = bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025,
+                                  block_size=block_size, strata=strata)
+        assert bsd_blk == bsd
+    bsd_pool = bootstrap_se_ci(data, 1, 100, np.sum, alpha=0.025,
+                               block_size=25, num_workers=2, strata=strata)
+    assert abs(bsd_pool['se'] / bsd['se'] - 1) < 0.3
+
+
 def test_table_columns_labels():
     # check that length of two lists are the same
     assert len(DIST_TABLE_COLUMNS) == len(DIST_TABLE_LABELS)
@@ -12,6 +12,7 @@ import math
 import json
 import copy
 import collections
+import concurrent.futures
 import pkg_resources
 import numpy as np
 import pandas as pd
@@ -133,6 +134,9 @@ STANDARD_INCOME_BINS = [-9e99, -1e-9, 1e-9, 10e3, 20e3, 30e3, 40e3, 50e3,
 SOI_AGI_BINS = [-9e99, 1.0, 5e3, 10e3, 15e3, 20e3, 25e3, 30e3, 40e3, 50e3,
                 75e3, 100e3, 200e3, 500e3, 1e6, 1.5e6, 2e6, 5e6, 10e6, 9e99]
 
+# maximum number of resampled data values held at once by bootstrap_se_ci
+BOOTSTRAP_BLOCK_ELEMENTS = 2**22
+
 
 def unweighted_sum(dframe, col_name):
     """
@@ -264,6 +268,75 @@ def add_income_table_row_variable(dframe, income_measure, bin_edges):
     return dframe
 
 
+def table_row_index(income, weight, groupby, pop_quantiles=False,
+                    xtot=None):
+    """
+    Return the table row of each filing unit given the groupby and
+    pop_quantiles arguments of the create_distribution_table and
+    create_difference_table functions.
+
+    Parameters
+    ----------
+    income : numpy array
+        income measure used to construct the table rows
+
+    weight : numpy array
+        sampling weight (s006) of each filing unit
+
+    groupby : String object
+        options for input: 'weighted_deciles' or
+                           'standard_income_bins' or 'soi_agi_bins'
+
+    pop_quantiles : boolean
+        specifies whether or not weighted_deciles contain an equal number
+        of people (True) or an equal number of filing units (False)
+
+    xtot : numpy array or None
+        number of exemptions (XTOT) of each filing unit, which must be
+        specified when pop_quantiles is True
+
+    Returns
+    -------
+    tuple containing numpy array of zero-based table row codes (which are
+    the codes of the add_quantile_table_row_variable or
+    add_income_table_row_variable table_row) and the number of table rows
+    """
+    assert groupby in ('weighted_deciles',
+                       'standard_income_bins',
+                       'soi_agi_bins')
+    rdf = pd.DataFrame({'income': np.asarray(income),
+                        's006': np.asarray(weight)})
+    if pop_quantiles:
+        assert groupby == 'weighted_deciles'
+        assert xtot is not None
+        rdf['XTOT'] = np.asarray(xtot)
+    if groupby == 'weighted_deciles':
+        rdf = add_quantile_table_row_variable(rdf, 'income', 10,
+                                              pop_quantiles=pop_quantiles,
+                                              decile_details=True)
+    elif groupby == 'standard_income_bins':
+        rdf = add_income_table_row_variable(rdf, 'income',
+                                            STANDARD_INCOME_BINS)
+    elif groupby == 'soi_agi_bins':
+        rdf = add_income_table_row_variable(rdf, 'income', SOI_AGI_BINS)
+    # put the table_row codes back in the original filing-unit order
+    table_row = np.empty(len(rdf.index), dtype=np.int64)
+    table_row[rdf.index.values] = rdf['table_row'].cat.codes.values
+    num_rows = len(rdf['table_row'].cat.categories)
+    del rdf
+    return (table_row, num_rows)
+
+
+def _table_row_sums(table_row, num_rows, values):
+    """
+    Return numpy array containing the sum of values in each table row,
+    excluding the values with negative table_row codes.
+    """
+    included = table_row >= 0
+    return np.bincount(table_row[included], weights=values[included],
+                       minlength=num_rows)[:num_rows]
+
+
 def get_sums(dframe):
     """
     Compute unweighted sum of items in each column of Pandas DataFrame, dframe.
@@ -280,7 +353,8 @@ def get_sums(dframe):
 
 
 def create_distribution_table(vdf, groupby, income_measure,
-                              pop_quantiles=False, scaling=True):
+                              pop_quantiles=False, scaling=True,
+                              table_row=None):
     """
     Get results from vdf, sort them by expanded_income based on groupby,
     and return them as a table.
@@ -307,6 +381,10 @@ def create_distribution_table(vdf, groupby, income_measure,
     scaling : boolean
         specifies whether or not table entry values are scaled
 
+    table_row : tuple or None
+        if not None, tuple returned from a table_row_index call for the
+        income_measure and groupby, which is then not repeated
+
     Returns
     -------
     distribution table as a Pandas DataFrame with DIST_TABLE_COLUMNS and
@@ -323,21 +401,7 @@ def create_distribution_table(vdf, groupby, income_measure,
           specified income_measure.
     """
     # pylint: disable=too-many-statements,too-many-branches
-    # nested function that returns calculated column statistics as a DataFrame
-    def stat_dataframe(gdf):
-        """
-        Returns calculated distribution table column statistics derived from
-        the specified grouped Dataframe object, gdf.
-        """
-        unweighted_columns = ['count', 'count_StandardDed',
-                              'count_ItemDed', 'count_AMT']
-        sdf = pd.DataFrame()
-        for col in DIST_TABLE_COLUMNS:
-            if col in unweighted_columns:
-                sdf[col] = gdf.apply(unweighted_sum, col)
-            else:
-                sdf[col] = gdf.apply(weighted_sum, col)
-        return sdf
+    # pylint: disable=too-many-arguments,too-many-locals
     # main logic of create_distribution_table
     assert isinstance(vdf, pd.DataFrame)
     assert groupby in ('weighted_deciles',
@@ -348,21 +412,27 @@ def create_distribution_table(vdf, groupby, income_measure,
     assert 'table_row' not in vdf
     if pop_quantiles:
         assert groupby == 'weighted_deciles'
-    # sort the data given specified groupby and income_measure
-    if groupby == 'weighted_deciles':
-        dframe = add_quantile_table_row_variable(vdf, income_measure, 10,
-                                                 pop_quantiles=pop_quantiles,
-                                                 decile_details=True)
-    elif groupby == 'standard_income_bins':
-        dframe = add_income_table_row_variable(vdf, income_measure,
-                                               STANDARD_INCOME_BINS)
-    elif groupby == 'soi_agi_bins':
-        dframe = add_income_table_row_variable(vdf, income_measure,
-                                               SOI_AGI_BINS)
-    # construct grouped DataFrame
-    gdf = dframe.groupby('table_row', as_index=False)
-    dist_table = stat_dataframe(gdf)
-    del dframe['table_row']
+    # assign table rows given specified groupby and income_measure
+    if table_row is None:
+        xtot = vdf['XTOT'].values if pop_quantiles else None
+        table_row = table_row_index(vdf[income_measure].values,
+                                    vdf['s006'].values, groupby,
+                                    pop_quantiles=pop_quantiles, xtot=xtot)
+    rows, num_rows = table_row
+    assert len(rows) == len(vdf.index)
+    # compute table column statistics in each table row
+    unweighted_columns = ['count', 'count_StandardDed',
+                          'count_ItemDed', 'count_AMT']
+    s006 = vdf['s006'].values
+    sums = collections.OrderedDict()
+    for col in DIST_TABLE_COLUMNS:
+        if col in unweighted_columns:
+            values = vdf[col].values
+        else:
+            values = vdf[col].values * s006
+        sums[col] = _table_row_sums(rows, num_rows, values)
+    dist_table = pd.DataFrame(data=sums)
+    del sums
     # compute sum row
     sum_row = get_sums(dist_table)[dist_table.columns]
     # handle placement of sum_row in table
@@ -395,9 +465,6 @@ def create_distribution_table(vdf, groupby, income_measure,
         assert len(dist_table.index) == len(rownames)
         dist_table.index = rownames
         del rownames
-    # delete intermediate Pandas DataFrame objects
-    del gdf
-    del dframe
     # scale table elements
     if scaling:
         count_vars = ['count',
@@ -410,12 +477,61 @@ def create_distribution_table(vdf, groupby, income_measure,
             else:
                 dist_table[col] = np.round(dist_table[col] * 1e-9, 3)
     # return table as Pandas DataFrame
-    vdf.sort_index(inplace=True)
     return dist_table
 
 
+def additive_table_row_sums(table_row, num_rows, count, weight,
+                            tax_diff, weighted_vars, tolerance=0.001):
+    """
+    Return ordered dictionary of additive difference table statistics,
+    each of which is a numpy array containing num_rows table-row sums.
+
+    Parameters
+    ----------
+    table_row : numpy integer array
+        zero-based table row of each filing unit (a negative table_row
+        value excludes a filing unit from every table row)
+
+    num_rows : integer
+        number of table rows
+
+    count : numpy array
+        count of people or filing units represented by each filing unit
+
+    weight : numpy array
+        sampling weight (s006) of each filing unit
+
+    tax_diff : numpy array
+        reform-minus-baseline tax difference of each filing unit, which
+        determines whether the filing unit has a tax cut or tax increase
+
+    weighted_vars : dictionary of numpy arrays
+        variables whose weighted sums are returned using the dictionary keys
+
+    tolerance : float
+        smallest absolute tax_diff considered to be a tax cut or increase
+
+    Returns
+    -------
+    ordered dictionary containing count, tax_cut, tax_inc, and the
+    weighted_vars statistics
+    """
+    # pylint: disable=too-many-arguments
+    sums = collections.OrderedDict()
+    sums['count'] = _table_row_sums(table_row, num_rows, count)
+    sums['tax_cut'] = _table_row_sums(table_row, num_rows,
+                                      np.where(tax_diff < -tolerance,
+                                               count, 0.))
+    sums['tax_inc'] = _table_row_sums(table_row, num_rows,
+                                      np.where(tax_diff > tolerance,
+                                               count, 0.))
+    for name, values in weighted_vars.items():
+        sums[name] = _table_row_sums(table_row, num_rows, values * weight)
+    return sums
+
+
 def create_difference_table(vdf1, vdf2, groupby, tax_to_diff,
-                            pop_quantiles=False):
+                            pop_quantiles=False, table_row=None):
     """
     Get results from two different vdf, construct tax difference results,
     and return the difference statistics as a table.
@@ -443,6 +559,10 @@ def create_difference_table(vdf1, vdf2, groupby, tax_to_diff,
         specifies whether or not weighted_deciles contain an equal number
         of people (True) or an equal number of filing units (False)
 
+    table_row : tuple or None
+        if not None, tuple returned from a table_row_index call for the
+        vdf1 expanded_income and groupby, which is then not repeated
+
     Returns
     -------
     difference table as a Pandas DataFrame with DIFF_TABLE_COLUMNS and
@@ -459,36 +579,6 @@ def create_difference_table(vdf1, vdf2, groupby, tax_to_diff,
           specified income_measure.
     """
     # pylint: disable=too-many-statements,too-many-locals,too-many-branches
-    # nested function that creates dataframe containing additive statistics
-    def additive_stats_dataframe(gdf):
-        """
-        Nested function that returns additive stats DataFrame derived from gdf
-        """
-        def count_lt_zero(dframe, col_name, tolerance=-0.001):
-            """
-            Return count sum of negative Pandas DataFrame col_name items.
-            """
-            return dframe[dframe[col_name] < tolerance]['count'].sum()
-
-        def count_gt_zero(dframe, col_name, tolerance=0.001):
-            """
-            Return count sum of positive Pandas DataFrame col_name items.
-            """
-            return dframe[dframe[col_name] > tolerance]['count'].sum()
-        # start of additive_stats_dataframe code
-        sdf = pd.DataFrame()
-        sdf['count'] = gdf.apply(unweighted_sum, 'count')
-        sdf['tax_cut'] = gdf.apply(count_lt_zero, 'tax_diff')
-        sdf['tax_inc'] = gdf.apply(count_gt_zero, 'tax_diff')
-        sdf['tot_change'] = gdf.apply(weighted_sum, 'tax_diff')
-        sdf['ubi'] = gdf.apply(weighted_sum, 'ubi')
-        sdf['benefit_cost_total'] = gdf.apply(weighted_sum,
-                                              'benefit_cost_total')
-        sdf['benefit_value_total'] = gdf.apply(weighted_sum,
-                                               'benefit_value_total')
-        sdf['atinc1'] = gdf.apply(weighted_sum, 'atinc1')
-        sdf['atinc2'] = gdf.apply(weighted_sum, 'atinc2')
-        return sdf
     # main logic of create_difference_table
     assert groupby in ('weighted_deciles',
                        'standard_income_bins',
@@ -503,40 +593,31 @@ def create_difference_table(vdf1, vdf2, groupby, tax_to_diff,
     assert isinstance(vdf2, pd.DataFrame)
     assert np.allclose(vdf1['XTOT'], vdf2['XTOT'])  # check rows are the same
     assert np.allclose(vdf1['s006'], vdf2['s006'])  # units and in same order
-    baseline_expanded_income = 'expanded_income_baseline'
-    df2 = copy.deepcopy(vdf2)
-    df2[baseline_expanded_income] = vdf1['expanded_income']
-    df2['tax_diff'] = df2[tax_to_diff] - vdf1[tax_to_diff]
-    for col in ['ubi', 'benefit_cost_total', 'benefit_value_total']:
-        df2[col] = df2[col] - vdf1[col]
-    df2['atinc1'] = vdf1['aftertax_income']
-    df2['atinc2'] = vdf2['aftertax_income']
-    # specify count variable in df2
+    # assign table rows given specified groupby and baseline expanded_income
+    if table_row is None:
+        xtot = vdf2['XTOT'].values if pop_quantiles else None
+        table_row = table_row_index(vdf1['expanded_income'].values,
+                                    vdf2['s006'].values, groupby,
+                                    pop_quantiles=pop_quantiles, xtot=xtot)
+    rows, num_rows = table_row
+    assert len(rows) == len(vdf1.index)
+    # create additive difference table statistics in one pass over the data
+    s006 = vdf2['s006'].values
     if pop_quantiles:
-        df2['count'] = np.multiply(df2['s006'], df2['XTOT'])
-
+        count = np.multiply(s006, vdf2['XTOT'].values)
     else:
-        df2['count'] = df2['s006']
-    # add table_row column to df2 given specified groupby and income_measure
-    if groupby == 'weighted_deciles':
-        dframe = add_quantile_table_row_variable(df2,
-                                                 baseline_expanded_income, 10,
-                                                 pop_quantiles=pop_quantiles,
-                                                 decile_details=True)
-    elif groupby == 'standard_income_bins':
-        dframe = add_income_table_row_variable(df2,
-                                               baseline_expanded_income,
-                                               STANDARD_INCOME_BINS)
-    elif groupby == 'soi_agi_bins':
-        dframe = add_income_table_row_variable(df2,
-                                               baseline_expanded_income,
-                                               SOI_AGI_BINS)
-    del df2
-    # create grouped Pandas DataFrame
-    gdf = dframe.groupby('table_row', as_index=False)
-    del dframe['table_row']
-    # create additive difference table statistics from gdf
-    diff_table = additive_stats_dataframe(gdf)
+        count = s006
+    wvars = collections.OrderedDict()
+    wvars['tot_change'] = vdf2[tax_to_diff].values - vdf1[tax_to_diff].values
+    for col in ['ubi', 'benefit_cost_total', 'benefit_value_total']:
+        wvars[col] = vdf2[col].values - vdf1[col].values
+    wvars['atinc1'] = vdf1['aftertax_income'].values
+    wvars['atinc2'] = vdf2['aftertax_income'].values
+    diff_table = pd.DataFrame(
+        data=additive_table_row_sums(rows, num_rows, count, s006,
+                                     wvars['tot_change'], wvars)
+    )
+    del wvars
     # calculate additive statistics on sums row
     sum_row = get_sums(diff_table)[diff_table.columns]
     # handle placement of sum_row in table
@@ -555,9 +636,6 @@ def create_difference_table(vdf1, vdf2, groupby, tax_to_diff,
         del topdec_row
     else:
         diff_table = diff_table.append(sum_row)
-    # delete intermediate Pandas DataFrame objects
-    del gdf
-    del dframe
     # compute non-additive stats in each table cell
     count = diff_table['count']
     diff_table['perc_cut'] = np.where(count > 0.,
@@ -611,6 +689,97 @@ def create_difference_table(vdf1, vdf2, groupby, tax_to_diff,
     return diff_table
 
 
+def diagnostic_table_odict(vdf):
+    """
+    Extract diagnostic table dictionary from the specified variables, vdf,
+    using weighted reductions that do not construct any new DataFrame.
+
+    Parameters
+    ----------
+    vdf : Pandas DataFrame object or dictionary containing the variables,
+        which are those in DIST_VARIABLES (for example, a dictionary of
+        the arrays returned from a Calculator array call for each variable)
+
+    Returns
+    -------
+    ordered dictionary of variable names and aggregate weighted values
+    """
+    # aggregate weighted values expressed in millions or billions
+    in_millions = 1.0e-6
+    in_billions = 1.0e-9
+
+    def var(name):
+        """
+        Nested function that returns the named variable as a numpy array.
+        """
+        return np.asarray(vdf[name])
+
+    def wsum(name):
+        """
+        Nested function that returns the weighted sum of named variable.
+        """
+        return np.dot(var(name), wghts)
+
+    odict = collections.OrderedDict()
+    # total number of filing units
+    wghts = np.asarray(var('s006'), dtype=np.float64)
+    odict['Returns (#m)'] = round(wghts.sum() * in_millions, 2)
+    # adjusted gross income
+    odict['AGI ($b)'] = round(wsum('c00100') * in_billions, 3)
+    # number of itemizers
+    ided = var('c04470')
+    val = wghts[ided > 0.].sum()
+    odict['Itemizers (#m)'] = round(val * in_millions, 2)
+    # itemized deduction
+    val = np.dot(ided[ided > 0.], wghts[ided > 0.])
+    odict['Itemized Deduction ($b)'] = round(val * in_billions, 3)
+    # number of standard deductions
+    sded = var('standard')
+    val = wghts[sded > 0.].sum()
+    odict['Standard Deduction Filers (#m)'] = round(val * in_millions, 2)
+    # standard deduction
+    val = np.dot(sded[sded > 0.], wghts[sded > 0.])
+    odict['Standard Deduction ($b)'] = round(val * in_billions, 3)
+    # personal exemption
+    odict['Personal Exemption ($b)'] = round(wsum('c04600') * in_billions, 3)
+    # taxable income
+    odict['Taxable Income ($b)'] = round(wsum('c04800') * in_billions, 3)
+    # regular tax liability
+    odict['Regular Tax ($b)'] = round(wsum('taxbc') * in_billions, 3)
+    # AMT taxable income
+    odict['AMT Income ($b)'] = round(wsum('c62100') * in_billions, 3)
+    # total AMT liability
+    odict['AMT Liability ($b)'] = round(wsum('c09600') * in_billions, 3)
+    # number of people paying AMT
+    val = wghts[var('c09600') > 0.].sum()
+    odict['AMT Filers (#m)'] = round(val * in_millions, 2)
+    # tax before credits
+    odict['Tax before Credits ($b)'] = round(wsum('c05800') * in_billions, 3)
+    # refundable credits
+    odict['Refundable Credits ($b)'] = round(wsum('refund') * in_billions, 3)
+    # nonrefundable credits
+    val = wsum('c07100')
+    odict['Nonrefundable Credits ($b)'] = round(val * in_billions, 3)
+    # reform surtaxes (part of federal individual income tax liability)
+    odict['Reform Surtaxes ($b)'] = round(wsum('surtax') * in_billions, 3)
+    # other taxes on Form 1040
+    odict['Other Taxes ($b)'] = round(wsum('othertaxes') * in_billions, 3)
+    # federal individual income tax liability
+    odict['Ind Income Tax ($b)'] = round(wsum('iitax') * in_billions, 3)
+    # OASDI+HI payroll tax liability (including employer share)
+    odict['Payroll Taxes ($b)'] = round(wsum('payrolltax') * in_billions, 3)
+    # combined income and payroll tax liability
+    val = wsum('combined')
+    odict['Combined Liability ($b)'] = round(val * in_billions, 3)
+    # number of tax units with non-positive income tax liability
+    val = wghts[var('iitax') <= 0].sum()
+    odict['With Income Tax <= 0 (#m)'] = round(val * in_millions, 2)
+    # number of tax units with non-positive combined tax liability
+    val = wghts[var('combined') <= 0].sum()
+    odict['With Combined Tax <= 0 (#m)'] = round(val * in_millions, 2)
+    return odict
+
+
 def create_diagnostic_table(dframe_list, year_list):
     """
     Extract diagnostic table from list of Pandas DataFrame objects
@@ -620,6 +789,7 @@ def create_diagnostic_table(dframe_list, year_list):
     Parameters
     ----------
     dframe_list : list of Pandas DataFrame objects containing the variables
+        or of ordered dictionaries returned from diagnostic_table_odict
 
     year_list : list of calendar years corresponding to the dframe_list
 
@@ -627,93 +797,6 @@ def create_diagnostic_table(dframe_list, year_list):
     -------
     Pandas DataFrame object containing the diagnostic table
     """
-    # pylint: disable=too-many-statements
-    def diagnostic_table_odict(vdf):
-        """
-        Nested function that extracts diagnostic table dictionary from
-        the specified Pandas DataFrame object, vdf.
-
-        Parameters
-        ----------
-        vdf : Pandas DataFrame object containing the variables
-
-        Returns
-        -------
-        ordered dictionary of variable names and aggregate weighted values
-        """
-        # aggregate weighted values expressed in millions or billions
-        in_millions = 1.0e-6
-        in_billions = 1.0e-9
-        odict = collections.OrderedDict()
-        # total number of filing units
-        wghts = vdf['s006']
-        odict['Returns (#m)'] = round(wghts.sum() * in_millions, 2)
-        # adjusted gross income
-        agi = vdf['c00100']
-        odict['AGI ($b)'] = round((agi * wghts).sum() * in_billions, 3)
-        # number of itemizers
-        val = (wghts[vdf['c04470'] > 0.].sum())
-        odict['Itemizers (#m)'] = round(val * in_millions, 2)
-        # itemized deduction
-        ided1 = vdf['c04470'] * wghts
-        val = ided1[vdf['c04470'] > 0.].sum()
-        odict['Itemized Deduction ($b)'] = round(val * in_billions, 3)
-        # number of standard deductions
-        val = wghts[vdf['standard'] > 0.].sum()
-        odict['Standard Deduction Filers (#m)'] = round(val * in_millions, 2)
-        # standard deduction
-        sded1 = vdf['standard'] * wghts
-        val = sded1[vdf['standard'] > 0.].sum()
-        odict['Standard Deduction ($b)'] = round(val * in_billions, 3)
-        # personal exemption
-        val = (vdf['c04600'] * wghts).sum()
-        odict['Personal Exemption ($b)'] = round(val * in_billions, 3)
-        # taxable income
-        val = (vdf['c04800'] * wghts).sum()
-        odict['Taxable Income ($b)'] = round(val * in_billions, 3)
-        # regular tax liability
-        val = (vdf['taxbc'] * wghts).sum()
-        odict['Regular Tax ($b)'] = round(val * in_billions, 3)
-        # AMT taxable income
-        val = (vdf['c62100'] * wghts).sum()
-        odict['AMT Income ($b)'] = round(val * in_billions, 3)
-        # total AMT liability
-        val = (vdf['c09600'] * wghts).sum()
-        odict['AMT Liability ($b)'] = round(val * in_billions, 3)
-        # number of people paying AMT
-        val = wghts[vdf['c09600'] > 0.].sum()
-        odict['AMT Filers (#m)'] = round(val * in_millions, 2)
-        # tax before credits
-        val = (vdf['c05800'] * wghts).sum()
-        odict['Tax before Credits ($b)'] = round(val * in_billions, 3)
-        # refundable credits
-        val = (vdf['refund'] * wghts).sum()
-        odict['Refundable Credits ($b)'] = round(val * in_billions, 3)
-        # nonrefundable credits
-        val = (vdf['c07100'] * wghts).sum()
-        odict['Nonrefundable Credits ($b)'] = round(val * in_billions, 3)
-        # reform surtaxes (part of federal individual income tax liability)
-        val = (vdf['surtax'] * wghts).sum()
-        odict['Reform Surtaxes ($b)'] = round(val * in_billions, 3)
-        # other taxes on Form 1040
-        val = (vdf['othertaxes'] * wghts).sum()
-        odict['Other Taxes ($b)'] = round(val * in_billions, 3)
-        # federal individual income tax liability
-        val = (vdf['iitax'] * wghts).sum()
-        odict['Ind Income Tax ($b)'] = round(val * in_billions, 3)
-        # OASDI+HI payroll tax liability (including employer share)
-        val = (vdf['payrolltax'] * wghts).sum()
-        odict['Payroll Taxes ($b)'] = round(val * in_billions, 3)
-        # combined income and payroll tax liability
-        val = (vdf['combined'] * wghts).sum()
-        odict['Combined Liability ($b)'] = round(val * in_billions, 3)
-        # number of tax units with non-positive income tax liability
-        val = (wghts[vdf['iitax'] <= 0]).sum()
-        odict['With Income Tax <= 0 (#m)'] = round(val * in_millions, 2)
-        # number of tax units with non-positive combined tax liability
-        val = (wghts[vdf['combined'] <= 0]).sum()
-        odict['With Combined Tax <= 0 (#m)'] = round(val * in_millions, 2)
-        return odict
     # check function arguments
     assert isinstance(dframe_list, list)
     assert dframe_list
@@ -721,11 +804,14 @@ def create_diagnostic_table(dframe_list, year_list):
     assert year_list
     assert len(dframe_list) == len(year_list)
     assert isinstance(year_list[0], int)
-    assert isinstance(dframe_list[0], pd.DataFrame)
+    assert isinstance(dframe_list[0], (pd.DataFrame, collections.OrderedDict))
     # construct diagnostic table
     tlist = list()
     for year, vardf in zip(year_list, dframe_list):
-        odict = diagnostic_table_odict(vardf)
+        if isinstance(vardf, pd.DataFrame):
+            odict = diagnostic_table_odict(vardf)
+        else:
+            odict = vardf
         ddf = pd.DataFrame(data=odict, index=[year], columns=odict.keys())
         ddf = ddf.transpose()
         tlist.append(ddf)
@@ -1418,8 +1504,8 @@ def ce_aftertax_expanded_income(df1, df2,
             msg += '\n            taxes1= {:9.3f}'
             msg += '\n            taxes2= {:9.3f}'
             msg += '\n            txdiff= {:9.3f}'
-            msg += ('\n(adjust _LST or other parameter to bracket txdiff=0 '
-                    'and then interpolate)')
+            msg += ('\n(use Calculator.solve_parameter to find value of LST '
+                    'or other parameter that makes txdiff=0)')
             raise ValueError(msg.format(cedict['tax1'], cedict['tax2'], diff))
     cedict['inc1'] = weighted_sum(df1, 'expanded_income') * billion
     cedict['inc2'] = weighted_sum(df2, 'expanded_income') * billion
@@ -1491,24 +1577,73 @@ def delete_file(filename):
         os.remove(filename)
 
 
-def bootstrap_se_ci(data, seed, num_samples, statistic, alpha):
+def bootstrap_se_ci(data, seed, num_samples, statistic, alpha,
+                    weights=None, block_size=None, num_workers=1,
+                    strata=None):
     """
     Return bootstrap estimate of standard error of statistic and
     bootstrap estimate of 100*(1-2*alpha)% confidence interval for statistic
     in a dictionary along with specified seed and nun_samples (B) and alpha.
+
+    The bootstrap samples are drawn and summarized block_size samples at a
+    time, so memory use is bounded by the size of one block rather than by
+    num_samples times the length of data.  When block_size is None, it is
+    set so that each block contains no more than BOOTSTRAP_BLOCK_ELEMENTS
+    resampled data values.  The blocks are drawn in sequence from a single
+    random number stream seeded by seed, so results do not depend on
+    block_size and are the same as those of drawing all the bootstrap
+    samples at once.
+
+    When weights (for example, s006 values) is not None, each bootstrap
+    sample resamples the weights along with the data and the statistic is
+    called as statistic(samples, axis=1, weights=sample_weights), so
+    np.average can be used for a weighted mean.  (The weighted total of
+    data is np.sum applied to the product of data and weights.)
+
+    When strata (for example, the sample_strata of a sub-sample Records
+    object) is not None, it contains the stratum of each data value and
+    each bootstrap sample resamples the data values of every stratum from
+    that stratum only, so that the bootstrap samples have the same number
+    of values in each stratum as data.
+
+    When num_workers is greater than one, the blocks are summarized in a
+    pool of that many processes, which requires statistic to be picklable.
+    In this case, each block is drawn from its own random number stream
+    seeded by seed and the block number, so results are reproducible for
+    given seed and block_size but differ from those when num_workers is one.
     """
     assert isinstance(data, np.ndarray)
     assert isinstance(seed, int)
     assert isinstance(num_samples, int)
     assert callable(statistic)  # function that computes statistic from data
     assert isinstance(alpha, float)
+    assert weights is None or (isinstance(weights, np.ndarray) and
+                               weights.shape == data.shape)
+    assert isinstance(num_workers, int) and num_workers >= 1
+    assert strata is None or (isinstance(strata, np.ndarray) and
+                              strata.shape == data.shape)
+    dlen = len(data)
+    if block_size is None:
+        block_size = max(1, BOOTSTRAP_BLOCK_ELEMENTS // max(1, dlen))
+    assert isinstance(block_size, int) and block_size >= 1
+    blocks = [(iblock, min(block_size, num_samples - first))
+              for iblock, first in enumerate(range(0, num_samples,
+                                                   block_size))]
+    if num_workers == 1:
+        rng = np.random.RandomState(seed)
+        _bootstrap_init(data, weights, seed, statistic, strata)
+        try:
+            stats = [_bootstrap_block(block, rng) for block in blocks]
+        finally:
+            _bootstrap_init(None, None, None, None)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=num_workers, initializer=_bootstrap_init,
+                initargs=(data, weights, seed, statistic, strata)) as pool:
+            stats = list(pool.map(_bootstrap_block, blocks))
+    stat = np.concatenate(stats)
     bsest = dict()
     bsest['seed'] = seed
-    np.random.seed(seed)
-    dlen = len(data)
-    idx = np.random.randint(low=0, high=dlen, size=(num_samples, dlen))
-    samples = data[idx]
-    stat = statistic(samples, axis=1)
     bsest['B'] = num_samples
     bsest['se'] = np.std(stat, ddof=1)
     stat = np.sort(stat)
@@ -1518,6 +1653,59 @@ def bootstrap_se_ci(data, seed, num_samples, statistic, alpha):
     return bsest
 
 
+_BOOTSTRAP_ARGS = dict()
+
+
+def _bootstrap_init(data, weights, seed, statistic, strata=None):
+    """
+    Store bootstrap_se_ci arguments used by _bootstrap_block function
+    (in each worker process when bootstrap_se_ci uses a process pool).
+    When strata is not None, also store the positions of the data values
+    sorted by stratum and, for each data value, the start of its stratum
+    in those positions and the size of its stratum.
+    """
+    _BOOTSTRAP_ARGS['data'] = data
+    _BOOTSTRAP_ARGS['weights'] = weights
+    _BOOTSTRAP_ARGS['seed'] = seed
+    _BOOTSTRAP_ARGS['statistic'] = statistic
+    if strata is None:
+        _BOOTSTRAP_ARGS['strata'] = None
+    else:
+        _, inverse, counts = np.unique(strata, return_inverse=True,
+                                       return_counts=True)
+        members = np.argsort(inverse, kind='stable')
+        starts = np.cumsum(counts) - counts
+        _BOOTSTRAP_ARGS['strata'] = (members, starts[inverse],
+                                     counts[inverse])
+
+
+def _bootstrap_block(block, rng=None):
+    """
+    Return statistic for each bootstrap sample in specified block, which
+    is a (block_number, number_of_samples_in_block) tuple, using the
+    specified random number generator or, if rng is None, a generator
+    seeded by the bootstrap seed and the block number.
+    """
+    iblock, nsamples = block
+    data = _BOOTSTRAP_ARGS['data']
+    weights = _BOOTSTRAP_ARGS['weights']
+    statistic = _BOOTSTRAP_ARGS['statistic']
+    if rng is None:
+        rng = np.random.RandomState([_BOOTSTRAP_ARGS['seed'], iblock])
+    if _BOOTSTRAP_ARGS['strata'] is None:
+        idx = rng.randint(low=0, high=len(data), size=(nsamples, len(data)))
+    else:
+        # draw each value of a sample from the stratum of the value it
+        # replaces, using one uniform draw per value so that results do
+        # not depend on the size of the blocks
+        members, start, size = _BOOTSTRAP_ARGS['strata']
+        draw = rng.random_sample(size=(nsamples, len(data)))
+        idx = members[start + (draw * size).astype(np.intp)]
+    if weights is None:
+        return statistic(data[idx], axis=1)
+    return statistic(data[idx], axis=1, weights=weights[idx])
+
+
 def json_to_dict(json_text):
     """
     Convert specified JSON text into an ordered Python dictionary.